@@ -0,0 +1,224 @@
+import os
+import sys
+import json
+from datetime import datetime
+from typing import Optional
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from config.sqlite_storage import to_sql_timestamp
+
+# Tabelas com arquivo colunar (partições fechadas em .npy por coluna)
+ARCHIVE_TABLES = ('sensor_readings', 'weather_data')
+
+# Chave (nome do diretório) de cada partição do arquivo colunar: um mês
+ARCHIVE_KEY_FORMAT = '%Y%m'
+
+def is_archive_key(name: str) -> bool:
+    """Nome de diretório é uma chave de partição? (<chave>.tmp/.old de escrita interrompida não são)"""
+    try:
+        return datetime.strptime(name, ARCHIVE_KEY_FORMAT).strftime(ARCHIVE_KEY_FORMAT) == name
+    except ValueError:
+        return False
+
+class ColumnarArchive:
+    """Arquivo frio colunar: um diretório por partição, um .npy de largura fixa por coluna
+    
+    Layout: <root>/<tabela>/<chave>/{timestamp.npy, <coluna>.npy, meta.json}.
+    Linhas ordenadas por timestamp (datetime64[s]), que serve de índice de tempo;
+    texto vira códigos int32 com dicionário no meta.json (-1 = NULL). A leitura
+    usa np.load(mmap_mode='r'): o recorte de um intervalo dentro de uma partição
+    é uma fatia do memmap, sem cópia.
+    """
+    
+    def __init__(self, root: str):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+    
+    def _partition_dir(self, table: str, key: str) -> str:
+        return os.path.join(self.root, table, key)
+    
+    def partitions(self, table: str, start=None, end=None) -> list:
+        """meta.json das partições que cobrem [start, end), em ordem cronológica"""
+        table_dir = os.path.join(self.root, table)
+        if not os.path.isdir(table_dir):
+            return []
+        
+        start = to_sql_timestamp(start) if start is not None else None
+        end = to_sql_timestamp(end) if end is not None else None
+        metas = []
+        for key in os.listdir(table_dir):
+            if not is_archive_key(key):
+                continue  # sobras de write_partition (.tmp/.old) duplicariam linhas
+            meta_path = os.path.join(table_dir, key, 'meta.json')
+            if not os.path.exists(meta_path):
+                continue  # escrita interrompida
+            with open(meta_path, encoding='utf-8') as f:
+                meta = json.load(f)
+            if start is not None and meta['period_end'] <= start:
+                continue
+            if end is not None and meta['period_start'] >= end:
+                continue
+            metas.append(meta)
+        return sorted(metas, key=lambda meta: meta['period_start'])
+    
+    def get_partition(self, table: str, key: str) -> Optional[dict]:
+        meta_path = os.path.join(self._partition_dir(table, key), 'meta.json')
+        if not os.path.exists(meta_path):
+            return None
+        with open(meta_path, encoding='utf-8') as f:
+            return json.load(f)
+    
+    def write_partition(self, table: str, key: str, period_start: str, period_end: str,
+                        columns: dict) -> int:
+        """Grava (ou substitui) uma partição a partir de colunas NumPy (fetch_columns)
+        
+        A partição é montada em um diretório temporário e trocada com os.replace,
+        então leitores nunca veem arquivos pela metade. key segue ARCHIVE_KEY_FORMAT.
+        """
+        import numpy as np
+        import shutil
+        
+        if not is_archive_key(key):
+            raise ValueError(f"Chave de partição inválida: {key} (formato {ARCHIVE_KEY_FORMAT})")
+        
+        timestamps = np.array([str(value)[:19] for value in columns['timestamp']],
+                              dtype='datetime64[s]')
+        order = np.argsort(timestamps, kind='stable')
+        meta = {
+            'table': table,
+            'key': key,
+            'period_start': period_start,
+            'period_end': period_end,
+            'rows': int(len(timestamps)),
+            'columns': {}
+        }
+        
+        final_dir = self._partition_dir(table, key)
+        tmp_dir = final_dir + '.tmp'
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        
+        for name, values in columns.items():
+            values = np.asarray(values)
+            info = {}
+            if name == 'timestamp':
+                values = timestamps
+            elif values.dtype == object and (name.endswith('_at') or 'time' in name):
+                values = np.array([None if value is None else str(value)[:19] for value in values],
+                                  dtype='datetime64[s]')  # None -> NaT
+            elif values.dtype == object:
+                codes, categories = _dictionary_encode(np, values)
+                values, info['dictionary'] = codes, categories
+            values = values[order]
+            info['dtype'] = values.dtype.str
+            meta['columns'][name] = info
+            np.save(os.path.join(tmp_dir, f'{name}.npy'), values)
+        
+        if len(timestamps):
+            meta['min_timestamp'] = str(timestamps[order[0]]).replace('T', ' ')
+            meta['max_timestamp'] = str(timestamps[order[-1]]).replace('T', ' ')
+        with open(os.path.join(tmp_dir, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False, indent=1)
+        
+        old_dir = final_dir + '.old'
+        if os.path.exists(final_dir):
+            os.replace(final_dir, old_dir)
+        os.replace(tmp_dir, final_dir)
+        shutil.rmtree(old_dir, ignore_errors=True)
+        return meta['rows']
+    
+    def iter_ranges(self, table: str, start=None, end=None, columns: list = None):
+        """Por partição: (meta, {coluna: fatia do memmap}) das linhas em [start, end)"""
+        import numpy as np
+        
+        for meta in self.partitions(table, start, end):
+            partition_dir = self._partition_dir(table, meta['key'])
+            index = np.load(os.path.join(partition_dir, 'timestamp.npy'), mmap_mode='r')
+            low, high = 0, len(index)
+            if start is not None:
+                low = int(np.searchsorted(index, np.datetime64(to_sql_timestamp(start).replace(' ', 'T')),
+                                          side='left'))
+            if end is not None:
+                high = int(np.searchsorted(index, np.datetime64(to_sql_timestamp(end).replace(' ', 'T')),
+                                           side='left'))
+            if high <= low:
+                continue
+            
+            names = columns or list(meta['columns'])
+            yield meta, {name: (index if name == 'timestamp' else
+                                np.load(os.path.join(partition_dir, f'{name}.npy'), mmap_mode='r')
+                                )[low:high]
+                         for name in names}
+    
+    def read(self, table: str, start=None, end=None, columns: list = None,
+             decode: bool = True) -> dict:
+        """Colunas do intervalo; dentro de uma única partição sem decode, tudo é zero-copy
+        
+        decode=True converte os códigos de texto de volta em strings (cópia);
+        decode=False devolve os códigos int32 e '<coluna>__dictionary'.
+        """
+        import numpy as np
+        
+        parts = list(self.iter_ranges(table, start, end, columns))
+        if not parts:
+            return {}
+        
+        result = {}
+        for name, info in parts[0][0]['columns'].items():
+            if columns and name not in columns:
+                continue
+            if 'dictionary' in info:
+                # Dicionários variam por partição: unifica antes de juntar
+                categories = sorted({value for meta, _ in parts
+                                     for value in meta['columns'][name]['dictionary']})
+                lookup = {value: code for code, value in enumerate(categories)}
+                codes = []
+                for meta, arrays in parts:
+                    remap = np.array([lookup[value] for value in meta['columns'][name]['dictionary']]
+                                     + [-1], dtype=np.int32)
+                    codes.append(remap[arrays[name]] if len(parts) > 1 else arrays[name])
+                codes = codes[0] if len(codes) == 1 else np.concatenate(codes)
+                if decode:
+                    values = np.array(categories + [None], dtype=object)
+                    result[name] = values[codes]
+                else:
+                    result[name] = codes
+                    result[f'{name}__dictionary'] = categories
+            else:
+                arrays = [arrays[name] for _, arrays in parts]
+                result[name] = arrays[0] if len(arrays) == 1 else np.concatenate(arrays)
+        return result
+    
+    def read_frame(self, table: str, start=None, end=None, columns: list = None):
+        """Intervalo como DataFrame (texto como pandas.Categorical sobre os códigos)"""
+        import pandas as pd
+        
+        data = self.read(table, start, end, columns, decode=False)
+        frame = {}
+        for name, values in data.items():
+            if name.endswith('__dictionary'):
+                continue
+            if f'{name}__dictionary' in data:
+                values = pd.Categorical.from_codes(values, data[f'{name}__dictionary'])
+            frame[name] = values
+        return pd.DataFrame(frame)
+    
+    def get_stats(self) -> dict:
+        stats = {}
+        for table in ARCHIVE_TABLES:
+            metas = self.partitions(table)
+            stats[table] = {
+                'partitions': len(metas),
+                'rows': sum(meta['rows'] for meta in metas),
+                'archived_until': metas[-1]['period_end'] if metas else None
+            }
+        return stats
+
+def _dictionary_encode(np, values):
+    """Texto -> (códigos int32, dicionário ordenado); None vira -1"""
+    present = [value for value in values if value is not None]
+    categories = sorted(set(present))
+    lookup = {value: code for code, value in enumerate(categories)}
+    codes = np.fromiter((lookup[value] if value is not None else -1 for value in values),
+                        dtype=np.int32, count=len(values))
+    return codes, categories
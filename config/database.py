@@ -2,6 +2,23 @@ import os
 from dataclasses import dataclass
 from typing import Optional
 
+# Perfis de armazenamento SQLite (PRAGMAs aplicados a cada conexão)
+STORAGE_PROFILES = {
+    # Comportamento padrão do SQLite: rollback journal e fsync completo
+    'legacy': {
+        'journal_mode': 'DELETE',
+        'synchronous': 'FULL'
+    },
+    # Leitores concorrentes com um único escritor, fsync apenas no checkpoint
+    'wal': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'mmap_size': 268435456,   # 256 MB
+        'cache_size': -65536,     # negativo = KiB (64 MB)
+        'temp_store': 'MEMORY'
+    }
+}
+
 @dataclass
 class DatabaseConfig:
     """Configurações do banco de dados"""
@@ -10,6 +27,12 @@ class DatabaseConfig:
     retention_days: int = 90
     max_connections: int = 10
     timeout: int = 30
+    storage_profile: str = "wal"
+    statement_cache_size: int = 256  # statements compilados mantidos por conexão (LRU)
+    partition_period: str = "none"  # none/day/week/month: um arquivo de leituras por período
+    shard_dir: str = ""  # vazio = '<banco>_shards/' ao lado do arquivo principal
+    archive_dir: str = ""  # arquivo colunar de meses fechados; vazio = retenção só apaga
+    storage_engine: str = "sqlite"  # motor de open_storage: sqlite/memory/archive
     
     @classmethod
     def from_env(cls):
@@ -19,7 +42,13 @@ class DatabaseConfig:
             backup_path=os.getenv('DB_BACKUP_PATH', 'backups/'),
             retention_days=int(os.getenv('DB_RETENTION_DAYS', '90')),
             max_connections=int(os.getenv('DB_MAX_CONNECTIONS', '10')),
-            timeout=int(os.getenv('DB_TIMEOUT', '30'))
+            timeout=int(os.getenv('DB_TIMEOUT', '30')),
+            storage_profile=os.getenv('DB_STORAGE_PROFILE', 'wal'),
+            statement_cache_size=int(os.getenv('DB_STATEMENT_CACHE_SIZE', '256')),
+            partition_period=os.getenv('DB_PARTITION_PERIOD', 'none'),
+            shard_dir=os.getenv('DB_SHARD_DIR', ''),
+            archive_dir=os.getenv('DB_ARCHIVE_DIR', ''),
+            storage_engine=os.getenv('DB_STORAGE_ENGINE', 'sqlite')
         )
 
 @dataclass
@@ -77,6 +106,7 @@ class MLConfig:
     retrain_interval_days: int = 7
     min_training_samples: int = 100
     confidence_threshold: float = 0.7
+    n_jobs: int = -1  # processos do treino/validação cruzada (-1 = todos os núcleos)
     features: list = None
     
     def __post_init__(self):
@@ -92,7 +122,8 @@ class MLConfig:
             model_path=os.getenv('ML_MODEL_PATH', 'models/farmtech_irrigation_model.pkl'),
             retrain_interval_days=int(os.getenv('ML_RETRAIN_DAYS', '7')),
             min_training_samples=int(os.getenv('ML_MIN_SAMPLES', '100')),
-            confidence_threshold=float(os.getenv('ML_CONFIDENCE_THRESHOLD', '0.7'))
+            confidence_threshold=float(os.getenv('ML_CONFIDENCE_THRESHOLD', '0.7')),
+            n_jobs=int(os.getenv('ML_N_JOBS', '-1'))
         )
 
 @dataclass
@@ -132,6 +163,9 @@ class ConfigManager:
         if not os.path.dirname(self.database.path):
             issues.append("Caminho do banco de dados inválido")
         
+        if self.database.storage_profile not in STORAGE_PROFILES:
+            issues.append(f"Perfil de armazenamento desconhecido: {self.database.storage_profile}")
+        
         # Validar configurações dos sensores
         if self.sensor.humidity_min >= self.sensor.humidity_max:
             issues.append("Limites de umidade inválidos")
@@ -13,6 +13,7 @@ ENVIRONMENT = os.getenv('ENVIRONMENT', 'development')
 DEBUG = ENVIRONMENT == 'development'
 
 # Configurações do banco de dados
+# backup_enabled/backup_interval_hours também agendam a retenção (RetentionScheduler)
 DATABASE_CONFIG = {
     'development': {
         'path': str(DATA_DIR / "farmtech_dev.db"),
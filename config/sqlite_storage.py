@@ -0,0 +1,383 @@
+import os
+import sys
+import csv
+import json
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from config.database import STORAGE_PROFILES
+
+# PRAGMAs que o SQLite devolve como inteiros
+_PRAGMA_CODES = {
+    'synchronous': {'OFF': 0, 'NORMAL': 1, 'FULL': 2, 'EXTRA': 3},
+    'temp_store': {'DEFAULT': 0, 'FILE': 1, 'MEMORY': 2}
+}
+
+def apply_storage_profile(conn, profile: str = 'wal'):
+    """Aplica os PRAGMAs do perfil de armazenamento a uma conexão SQLite"""
+    for pragma, value in STORAGE_PROFILES[profile].items():
+        conn.execute(f"PRAGMA {pragma} = {value}")
+
+def check_storage_profile(conn, profile: str = 'wal') -> dict:
+    """Lê os PRAGMAs efetivos da conexão e compara com o perfil esperado"""
+    expected = STORAGE_PROFILES[profile]
+    actual = {}
+    mismatches = []
+    
+    for pragma, value in expected.items():
+        row = conn.execute(f"PRAGMA {pragma}").fetchone()
+        current = row[0] if row else None  # ex.: mmap_size em banco :memory:
+        actual[pragma] = current
+        
+        wanted = _PRAGMA_CODES.get(pragma, {}).get(str(value).upper(), value)
+        if isinstance(current, str):
+            matches = current.upper() == str(wanted).upper()
+        else:
+            matches = current == wanted
+        if not matches:
+            mismatches.append(pragma)
+    
+    return {
+        'profile': profile,
+        'ok': len(mismatches) == 0,
+        'pragmas': actual,
+        'mismatches': mismatches
+    }
+
+def apply_migrations(conn, migrations: list) -> list:
+    """Aplica migrações versionadas (PRAGMA user_version) ainda não executadas"""
+    current = conn.execute("PRAGMA user_version").fetchone()[0]
+    applied = []
+    
+    for version, description, statements in sorted(migrations, key=lambda m: m[0]):
+        if version <= current:
+            continue
+        for statement in statements:
+            conn.execute(statement)
+        # PRAGMA não aceita parâmetros; version vem da lista de migrações do código
+        conn.execute(f"PRAGMA user_version = {int(version)}")
+        conn.commit()
+        applied.append((version, description))
+    
+    return applied
+
+def incremental_vacuum_enabled(conn) -> bool:
+    return conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+
+def enable_incremental_vacuum(conn) -> bool:
+    """Garante auto_vacuum=INCREMENTAL; em banco existente exige um VACUUM único
+
+    Manutenção explícita: o VACUUM reescreve o arquivo inteiro sob lock
+    exclusivo, então não deve rodar dentro da retenção.
+    """
+    if incremental_vacuum_enabled(conn):
+        return False
+
+    if conn.in_transaction:
+        conn.commit()
+    conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+    # Só um VACUUM completo converte um arquivo que já tem tabelas
+    conn.execute("VACUUM")
+    return True
+
+def find_full_scans(conn, queries: dict) -> dict:
+    """Roda EXPLAIN QUERY PLAN e retorna as consultas que varrem tabelas sem índice"""
+    offenders = {}
+    # EXPLAIN não revalida o schema: a leitura de sqlite_master recarrega o schema
+    # da conexão e a versão no texto evita reaproveitar planos do cache de statements
+    conn.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+    schema_version = conn.execute("PRAGMA schema_version").fetchone()[0]
+    
+    for name, (sql, params) in queries.items():
+        plan = conn.execute(f"EXPLAIN QUERY PLAN {sql} /* schema {schema_version} */",
+                            params).fetchall()
+        details = [row[-1] for row in plan]
+        full_scans = [detail for detail in details
+                      if detail.startswith('SCAN ') and 'INDEX' not in detail
+                      and 'CONSTANT ROW' not in detail]
+        if full_scans:
+            offenders[name] = details
+    
+    return offenders
+
+def build_update_sql(table: str, columns, allowed: tuple, where: str = 'id = ?') -> tuple:
+    """Monta UPDATE só com colunas da whitelist; os valores sempre vão por parâmetro
+    
+    Retorna (sql, colunas na ordem dos placeholders). A ordem segue allowed, então o
+    mesmo conjunto de colunas gera sempre o mesmo texto SQL e reaproveita o statement
+    já compilado no cache da conexão.
+    """
+    columns = set(columns)
+    if not columns:
+        raise ValueError("Nenhuma coluna informada para atualização")
+    invalid = columns.difference(allowed)
+    if invalid:
+        raise ValueError(f"Colunas não atualizáveis em {table}: {', '.join(sorted(invalid))}")
+    
+    ordered = [col for col in allowed if col in columns]
+    set_clause = ", ".join(f"{col} = ?" for col in ordered)
+    return f"UPDATE {table} SET {set_clause} WHERE {where}", ordered
+
+def to_sql_timestamp(value):
+    """Converte datetime/Timestamp para o formato do CURRENT_TIMESTAMP; strings passam direto"""
+    if value is None or isinstance(value, str):
+        return value
+    return value.strftime('%Y-%m-%d %H:%M:%S')
+
+def build_keyset_query(table: str, start=None, end=None, location: str = None,
+                       after: tuple = None, descending: bool = True, limit: int = None,
+                       time_column: str = 'timestamp') -> tuple:
+    """Monta SELECT por período/local paginado por keyset em (time_column, id)
+    
+    after é o cursor (time_column, id) da última linha da página anterior.
+    A ordem (time_column, rowid) é a própria ordem dos índices por timestamp,
+    então nenhuma página exige ordenação temporária nem OFFSET.
+    """
+    conditions = []
+    params = []
+    
+    if location is not None:
+        conditions.append("location = ?")
+        params.append(location)
+    if start is not None:
+        conditions.append(f"{time_column} >= ?")
+        params.append(to_sql_timestamp(start))
+    if end is not None:
+        conditions.append(f"{time_column} < ?")
+        params.append(to_sql_timestamp(end))
+    if after is not None:
+        conditions.append(f"({time_column}, id) {'<' if descending else '>'} (?, ?)")
+        params.extend([to_sql_timestamp(after[0]), after[1]])
+    
+    direction = 'DESC' if descending else 'ASC'
+    sql = f"SELECT * FROM {table}"
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    sql += f" ORDER BY {time_column} {direction}, id {direction}"
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(int(limit))
+    
+    return sql, tuple(params)
+
+# Formatos aceitos por stream_table_export
+EXPORT_FORMATS = ('csv', 'jsonl', 'parquet')
+
+def _arrow_type(pa, declared: str):
+    declared = (declared or '').upper()
+    if 'BOOL' in declared:
+        return pa.bool_()
+    if 'INT' in declared:
+        return pa.int64()
+    if any(name in declared for name in ('REAL', 'FLOA', 'DOUB')):
+        return pa.float64()
+    return pa.string()
+
+def _arrow_column(pa, values, arrow_type):
+    # SQLite guarda BOOLEAN como 0/1; o pyarrow só converte int -> bool via cast
+    if pa.types.is_boolean(arrow_type):
+        return pa.array(values, type=pa.int64()).cast(arrow_type)
+    return pa.array(values, type=arrow_type)
+
+def _numpy_column(np, values, declared: str):
+    declared = (declared or '').upper()
+    if 'BOOL' in declared or 'INT' in declared:
+        try:
+            return np.array(values, dtype=np.int64)
+        except TypeError:  # NULL em coluna inteira
+            return np.array(values, dtype=np.float64)
+    if any(name in declared for name in ('REAL', 'FLOA', 'DOUB')):
+        return np.array(values, dtype=np.float64)  # NULL vira NaN
+    return np.array(values, dtype=object)
+
+def table_columns(conn, table: str) -> list:
+    """Pares (coluna, tipo declarado) da tabela; ValueError se ela não existir"""
+    table_info = conn.execute("SELECT name, type FROM pragma_table_info(?)", (table,)).fetchall()
+    if not table_info:
+        raise ValueError(f"Tabela inexistente: {table}")
+    return table_info
+
+def iter_query_chunks(conn, sql: str, params: tuple = (), chunk_size: int = 5000):
+    """Lotes de fetchmany de uma consulta; o cursor fecha mesmo se o consumidor parar antes"""
+    cursor = conn.execute(sql, params)
+    try:
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield rows
+    finally:
+        cursor.close()
+
+def write_export(filepath: str, fmt: str, table_info: list, chunks) -> int:
+    """Grava lotes de linhas (na ordem de table_info) em CSV, JSON Lines ou Parquet
+    
+    chunks pode encadear várias consultas (ex.: uma por partição). Em Parquet
+    cada lote vira um row group. Retorna o total de linhas escritas.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Formato de exportação inválido: {fmt} (use {', '.join(EXPORT_FORMATS)})")
+    columns = [name for name, _ in table_info]
+    
+    total = 0
+    if fmt == 'parquet':
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Exportação Parquet requer pyarrow (pip install pyarrow)")
+        
+        schema = pa.schema([(name, _arrow_type(pa, declared)) for name, declared in table_info])
+        with pq.ParquetWriter(filepath, schema) as writer:
+            for rows in chunks:
+                arrays = [_arrow_column(pa, values, field.type)
+                          for values, field in zip(zip(*rows), schema)]
+                writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+                total += len(rows)
+        return total
+    
+    with open(filepath, 'w', encoding='utf-8', newline='') as f:
+        if fmt == 'csv':
+            writer = csv.writer(f)
+            writer.writerow(columns)
+        for rows in chunks:
+            if fmt == 'csv':
+                writer.writerows(rows)
+            else:
+                f.writelines(json.dumps(dict(zip(columns, row)), default=str, ensure_ascii=False) + '\n'
+                             for row in rows)
+            total += len(rows)
+    
+    return total
+
+def stream_table_export(conn, table: str, filepath: str, fmt: str = 'csv',
+                        where: str = '', params: tuple = (), order_by: str = 'id',
+                        chunk_size: int = 5000) -> int:
+    """Exporta uma tabela em lotes de fetchmany, sem carregar tudo em memória
+    
+    where/order_by vêm do código chamador; valores sempre por params.
+    Em Parquet cada lote vira um row group. Retorna o total de linhas escritas.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Formato de exportação inválido: {fmt} (use {', '.join(EXPORT_FORMATS)})")
+    
+    table_info = table_columns(conn, table)
+    columns = [name for name, _ in table_info]
+    
+    sql = f"SELECT {', '.join(columns)} FROM {table}"
+    if where:
+        sql += f" WHERE {where}"
+    if order_by:
+        sql += f" ORDER BY {order_by}"
+    return write_export(filepath, fmt, table_info, iter_query_chunks(conn, sql, params, chunk_size))
+
+# Formatos aceitos por fetch_columns
+COLUMN_FORMATS = ('list', 'numpy', 'arrow')
+
+def fetch_columns(conn, sql: str, params: tuple = (), table: str = None,
+                  fmt: str = 'numpy', chunk_size: int = 65536):
+    """Lê o resultado direto do cursor em arrays por coluna, sem um dict por linha
+    
+    fmt='numpy' devolve {coluna: ndarray} com dtypes pelos tipos declarados em table
+    (REAL -> float64 com NaN, INTEGER/BOOLEAN -> int64, demais -> object);
+    fmt='arrow' devolve um pyarrow.Table; fmt='list' devolve listas Python.
+    """
+    if fmt not in COLUMN_FORMATS:
+        raise ValueError(f"Formato de colunas inválido: {fmt} (use {', '.join(COLUMN_FORMATS)})")
+    
+    declared = {}
+    if table:
+        declared = dict(conn.execute("SELECT name, type FROM pragma_table_info(?)",
+                                     (table,)).fetchall())
+    
+    if fmt == 'numpy':
+        import numpy as np
+        convert = lambda values, name: _numpy_column(np, values, declared.get(name))
+    elif fmt == 'arrow':
+        try:
+            import pyarrow as pa
+        except ImportError:
+            raise ImportError("Leitura em Arrow requer pyarrow (pip install pyarrow)")
+        convert = lambda values, name: _arrow_column(pa, values, _arrow_type(pa, declared.get(name)))
+    else:
+        convert = lambda values, name: list(values)
+    
+    cursor = conn.execute(sql, params)
+    columns = [desc[0] for desc in cursor.description]
+    parts = {name: [] for name in columns}
+    
+    # Transpõe cada lote com zip (em C) e converte antes de buscar o próximo
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        if not rows:
+            break
+        for name, values in zip(columns, zip(*rows)):
+            parts[name].append(convert(values, name))
+    
+    if fmt == 'arrow':
+        arrays = [pa.chunked_array(parts[name], type=_arrow_type(pa, declared.get(name)))
+                  for name in columns]
+        return pa.Table.from_arrays(arrays, names=columns)
+    
+    result = {}
+    for name in columns:
+        if fmt == 'numpy':
+            if parts[name]:
+                result[name] = np.concatenate(parts[name])
+            else:
+                result[name] = convert((), name)
+        else:
+            result[name] = [value for part in parts[name] for value in part]
+    return result
+
+def _to_float(value):
+    return None if value is None else float(value)
+
+def _to_bool(value):
+    return int(bool(value))
+
+def _to_text(value):
+    return None if value is None or value != value else str(value)
+
+def _to_timestamp(value):
+    """Como to_sql_timestamp, mas NaT/NaN (vindos de DataFrame) viram None"""
+    if value is not None and value != value:
+        return None
+    return to_sql_timestamp(value)
+
+# Conversão por coluna dos lotes de insert/update (superconjunto das fases 3 e 4)
+BATCH_CONVERTERS = {
+    'humidity': _to_float,
+    'ph_level': _to_float,
+    'phosphorus': _to_bool,
+    'potassium': _to_bool,
+    'pump_status': _to_bool,
+    'temperature': _to_float,
+    'light_intensity': _to_float,
+    'soil_conductivity': _to_float,
+    'weather_condition': _to_text,
+    'location': _to_text,
+    'timestamp': _to_timestamp
+}
+
+def rows_to_columns(rows, columns: list, aliases: dict = None) -> dict:
+    """Converte DataFrame, dicts ou tuplas em listas por coluna"""
+    aliases = aliases or {}
+    
+    if hasattr(rows, 'columns') and hasattr(rows, 'index'):
+        # DataFrame: uma conversão por coluna, sem iterar linha a linha
+        df = rows.rename(columns=aliases)
+        size = len(df)
+        return {col: df[col].tolist() if col in df.columns else [None] * size
+                for col in columns}
+    
+    data = {col: [] for col in columns}
+    for row in rows:
+        if isinstance(row, dict):
+            row = {aliases.get(key, key): value for key, value in row.items()}
+            for col in columns:
+                data[col].append(row.get(col))
+        else:
+            row = tuple(row)
+            for i, col in enumerate(columns):
+                data[col].append(row[i] if i < len(row) else None)
+    return data
@@ -0,0 +1,499 @@
+import os
+import sys
+import time
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Iterator, List, Optional, Protocol, Tuple, runtime_checkable
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from config.sqlite_storage import COLUMN_FORMATS, to_sql_timestamp
+from config.columnar_archive import ColumnarArchive, ARCHIVE_KEY_FORMAT
+
+# Motores disponíveis em open_storage (DB_STORAGE_ENGINE)
+STORAGE_ENGINES = ('sqlite', 'memory', 'archive')
+
+# Colunas de sensor_readings no schema aprimorado (Fase 4)
+SENSOR_COLUMNS = ['id', 'timestamp', 'humidity', 'ph_level', 'phosphorus', 'potassium',
+                  'pump_status', 'location', 'temperature', 'light_intensity',
+                  'soil_conductivity', 'weather_condition', 'created_at']
+
+# Ordem das tuplas aceitas pelo motor em memória (a mesma do EnhancedFarmTechDatabase)
+MEMORY_BATCH_COLUMNS = ['humidity', 'ph_level', 'phosphorus', 'potassium', 'pump_status',
+                        'temperature', 'light_intensity', 'soil_conductivity',
+                        'weather_condition', 'location', 'timestamp']
+
+_REAL_COLUMNS = ('humidity', 'ph_level', 'temperature', 'light_intensity', 'soil_conductivity')
+_BOOL_COLUMNS = ('phosphorus', 'potassium', 'pump_status')
+
+@runtime_checkable
+class SensorStorageReader(Protocol):
+    """Parte de leitura do contrato dos motores de leituras de sensores
+
+    Leitura colunar e paginada por janela de tempo [start, end) em UTC, iteração
+    em streaming e séries para gráfico. Quem só consome dados de sensores
+    depende deste protocolo, não de uma classe de banco específica.
+    """
+
+    alert_engine: object
+
+    def get_sensor_columns(self, start=None, end=None, location: str = None,
+                           descending: bool = False, limit: int = None, fmt: str = 'list'): ...
+
+    def query_sensor_page(self, start=None, end=None, location: str = None,
+                          after: tuple = None, limit: int = 100,
+                          descending: bool = True) -> Tuple[List[Dict], Optional[tuple]]: ...
+
+    def iter_sensor_data(self, start=None, end=None, location: str = None,
+                         descending: bool = False, page_size: int = 1000) -> Iterator[Dict]: ...
+
+    def get_sensor_data(self, limit: int = 100) -> List[Dict]: ...
+
+    def get_sensor_series(self, metric: str = 'humidity', start=None, end=None,
+                          pixels: int = 1000, location: str = None) -> Dict: ...
+
+    def close(self): ...
+
+@runtime_checkable
+class SensorStorageWriter(Protocol):
+    """Parte de escrita: gravação de lotes de leituras"""
+
+    def insert_sensor_batch(self, rows: Iterable) -> range: ...
+
+@runtime_checkable
+class SensorStorage(SensorStorageReader, SensorStorageWriter, Protocol):
+    """Contrato completo (leitura e escrita) dos motores graváveis: sqlite e memory"""
+
+class SensorStorageMixin:
+    """Implementações padrão do protocolo sobre query_sensor_page/get_sensor_columns
+
+    Motores sobrescrevem o que fazem melhor (ex.: séries pelos rollups no SQLite).
+    """
+
+    # Regras de alerta compiladas do motor (None = o chamador monta as suas)
+    alert_engine = None
+
+    def get_sensor_data(self, limit: int = 100) -> List[Dict]:
+        """Recupera as leituras mais recentes"""
+        return self.query_sensor_page(limit=limit)[0]
+
+    def iter_sensor_data(self, start=None, end=None, location: str = None,
+                         descending: bool = False, page_size: int = 1000) -> Iterator[Dict]:
+        """Itera leituras do período página a página (memória limitada a page_size)"""
+        after = None
+        while True:
+            rows, after = self.query_sensor_page(start, end, location, after,
+                                                 page_size, descending)
+            yield from rows
+            if after is None:
+                break
+
+    def get_sensor_series(self, metric: str = 'humidity', start=None, end=None,
+                          pixels: int = 1000, location: str = None) -> Dict:
+        """Série para gráfico a partir das leituras cruas, reduzida por LTTB a ~pixels pontos"""
+        if metric not in _REAL_COLUMNS:
+            raise ValueError(f"Métrica inválida: {metric} (use {', '.join(_REAL_COLUMNS)})")
+        end = end if end is not None else datetime.utcnow()
+        start = start if start is not None else _to_datetime(end) - timedelta(days=1)
+
+        columns = self.get_sensor_columns(start, end, location, fmt='numpy')
+        series = downsample_series(series_from_raw(columns, metric), pixels)
+        series['tier'] = 'raw'
+        return series
+
+    def close(self):
+        pass
+
+def _to_datetime(value) -> datetime:
+    if isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(str(value)[:19])
+
+# Séries e LTTB ----------------------------------------------------------------
+
+def lttb_indices(x, y, threshold: int):
+    """Largest-Triangle-Three-Buckets: índices dos pontos que preservam a forma da série
+
+    Mantém o primeiro e o último ponto; em cada bucket intermediário escolhe o
+    ponto que forma o maior triângulo com o escolhido anterior e a média do
+    próximo bucket.
+    """
+    import numpy as np
+
+    size = len(x)
+    if threshold >= size or threshold < 3:
+        return np.arange(size)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    edges = np.linspace(1, size - 1, threshold - 1).astype(np.int64)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, size - 1
+
+    previous = 0
+    for bucket in range(threshold - 2):
+        low, high = edges[bucket], edges[bucket + 1]
+        next_high = edges[bucket + 2] if bucket + 2 < len(edges) else size
+        if next_high <= high:
+            next_high = high + 1
+        next_x = x[high:next_high].mean()
+        next_y = y[high:next_high].mean()
+        area = np.abs((x[previous] - next_x) * (y[low:high] - y[previous])
+                      - (x[previous] - x[low:high]) * (next_y - y[previous]))
+        previous = low + int(np.argmax(area))
+        selected[bucket + 1] = previous
+    return selected
+
+def downsample_series(series: Dict, pixels: int) -> Dict:
+    """Reduz a série a ~pixels pontos por LTTB na média, sem perder picos
+
+    min/max de cada ponto escolhido cobrem todos os buckets até o próximo ponto,
+    então o envelope continua mostrando os extremos descartados.
+    """
+    import numpy as np
+
+    size = len(series['timestamp'])
+    if size <= pixels:
+        return series
+
+    seconds = series['timestamp'].astype('datetime64[s]').astype(np.int64)
+    average = series['avg']
+    valid = ~np.isnan(average)
+    indices = lttb_indices(seconds[valid], average[valid], pixels)
+    indices = np.flatnonzero(valid)[indices]
+
+    result = {name: values[indices] for name, values in series.items()}
+    result['min'] = np.fmin.reduceat(series['min'], indices)
+    result['max'] = np.fmax.reduceat(series['max'], indices)
+    result['count'] = np.add.reduceat(series['count'], indices)
+    return result
+
+def empty_series() -> Dict:
+    import numpy as np
+
+    return {
+        'timestamp': np.array([], dtype='datetime64[s]'),
+        'avg': np.array([], dtype=np.float64),
+        'min': np.array([], dtype=np.float64),
+        'max': np.array([], dtype=np.float64),
+        'count': np.array([], dtype=np.int64)
+    }
+
+def series_from_raw(columns: Dict, metric: str) -> Dict:
+    """Leituras cruas (get_sensor_columns) como série: min = max = média = valor"""
+    import numpy as np
+
+    if not len(columns.get('id', ())):
+        return empty_series()
+    values = np.asarray(columns[metric], dtype=np.float64)
+    return {
+        'timestamp': _datetime64(columns['timestamp']),
+        'avg': values,
+        'min': values.copy(),
+        'max': values.copy(),
+        'count': np.ones(len(values), dtype=np.int64)
+    }
+
+def _datetime64(values):
+    import numpy as np
+
+    values = np.asarray(values)
+    if values.dtype.kind == 'M':
+        return values.astype('datetime64[s]')
+    return np.array([str(value)[:19] for value in values], dtype='datetime64[s]')
+
+# Motores sobre arrays NumPy ----------------------------------------------------
+
+def _select_window(columns: Dict, times, start=None, end=None, location: str = None,
+                   after: tuple = None, descending: bool = False, limit: int = None) -> Dict:
+    """Aplica janela/local/keyset/ordem/limite a colunas ordenadas por (timestamp, id)
+
+    A janela de tempo é um recorte por busca binária (sem cópia); filtros por
+    local ou cursor usam máscara.
+    """
+    import numpy as np
+
+    low, high = 0, len(times)
+    if start is not None:
+        low = int(np.searchsorted(times, _datetime64([to_sql_timestamp(start)])[0], side='left'))
+    if end is not None:
+        high = int(np.searchsorted(times, _datetime64([to_sql_timestamp(end)])[0], side='left'))
+    selection = slice(low, max(low, high))
+    selected = {name: values[selection] for name, values in columns.items()}
+    selected_times = times[selection]
+
+    mask = None
+    if location is not None:
+        mask = np.asarray(selected['location'] == location, dtype=bool)
+    if after is not None:
+        after_time = _datetime64([to_sql_timestamp(after[0])])[0]
+        ids = selected['id']
+        if descending:
+            keep = (selected_times < after_time) | ((selected_times == after_time) & (ids < after[1]))
+        else:
+            keep = (selected_times > after_time) | ((selected_times == after_time) & (ids > after[1]))
+        mask = keep if mask is None else mask & keep
+    if mask is not None:
+        selected = {name: values[mask] for name, values in selected.items()}
+
+    if descending:
+        selected = {name: values[::-1] for name, values in selected.items()}
+    if limit is not None:
+        selected = {name: values[:limit] for name, values in selected.items()}
+    return selected
+
+def _format_columns(columns: Dict, fmt: str):
+    if fmt not in COLUMN_FORMATS:
+        raise ValueError(f"Formato de colunas inválido: {fmt} (use {', '.join(COLUMN_FORMATS)})")
+    if fmt == 'numpy':
+        return columns
+
+    lists = {}
+    for name, values in columns.items():
+        if values.dtype.kind == 'M':
+            # Mesmo texto que o SQLite devolve para DATETIME
+            lists[name] = [None if value is None else value.strftime('%Y-%m-%d %H:%M:%S')
+                           for value in values.astype('datetime64[s]').tolist()]
+        else:
+            lists[name] = values.tolist()
+    if fmt == 'list':
+        return lists
+    try:
+        import pyarrow as pa
+    except ImportError:
+        raise ImportError("Leitura em Arrow requer pyarrow (pip install pyarrow)")
+    return pa.table(lists)
+
+def _page_from_columns(columns: Dict, limit: int) -> Tuple[List[Dict], Optional[tuple]]:
+    lists = _format_columns(columns, 'list')
+    names = list(lists)
+    rows = [dict(zip(names, values)) for values in zip(*(lists[name] for name in names))]
+    next_cursor = None
+    if rows and len(rows) == limit:
+        next_cursor = (rows[-1]['timestamp'], rows[-1]['id'])
+    return rows, next_cursor
+
+class InMemorySensorStorage(SensorStorageMixin):
+    """Motor em memória (testes e benchmarks): colunas NumPy ordenadas por (timestamp, id)
+
+    Lotes novos ficam pendentes em listas e são consolidados na próxima leitura.
+    Timestamps seguem o texto do SQLite ('YYYY-MM-DD HH:MM:SS').
+    """
+
+    def __init__(self):
+        self._pending = {name: [] for name in SENSOR_COLUMNS}
+        self._columns = None
+        self._times = None
+        self._next_id = 1
+        self._lock = threading.Lock()
+
+    def insert_sensor_batch(self, rows: Iterable) -> range:
+        """Insere lote (dicts ou tuplas na ordem de MEMORY_BATCH_COLUMNS) e retorna a faixa de IDs"""
+        if hasattr(rows, 'to_dict'):  # DataFrame
+            rows = rows.to_dict('records')
+        now = datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')
+
+        with self._lock:
+            first_id = self._next_id
+            for row in rows:
+                if not isinstance(row, dict):
+                    row = dict(zip(MEMORY_BATCH_COLUMNS, row))
+                elif 'ph' in row and 'ph_level' not in row:
+                    row = {**row, 'ph_level': row['ph']}
+                for name in SENSOR_COLUMNS[2:-1]:
+                    value = row.get(name)
+                    if name in _BOOL_COLUMNS:
+                        value = int(bool(value))
+                    elif name in _REAL_COLUMNS:
+                        value = float('nan') if value is None else float(value)
+                    self._pending[name].append(value)
+                self._pending['id'].append(self._next_id)
+                self._pending['timestamp'].append(to_sql_timestamp(row.get('timestamp')) or now)
+                self._pending['created_at'].append(now)
+                self._next_id += 1
+            if self._pending['location']:
+                self._pending['location'] = [value or 'Campo_Principal'
+                                             for value in self._pending['location']]
+            return range(first_id, self._next_id)
+
+    def _consolidate(self) -> Tuple[Dict, object]:
+        import numpy as np
+
+        with self._lock:
+            if self._pending['id'] or self._columns is None:
+                new = {}
+                for name in SENSOR_COLUMNS:
+                    values = self._pending[name]
+                    if name in _REAL_COLUMNS:
+                        new[name] = np.array(values, dtype=np.float64)
+                    elif name == 'id' or name in _BOOL_COLUMNS:
+                        new[name] = np.array(values, dtype=np.int64)
+                    else:
+                        new[name] = np.array(values, dtype=object)
+                    self._pending[name] = []
+                if self._columns is not None:
+                    new = {name: np.concatenate([self._columns[name], new[name]]) for name in SENSOR_COLUMNS}
+                times = _datetime64(new['timestamp'])
+                order = np.lexsort((new['id'], times))
+                self._columns = {name: values[order] for name, values in new.items()}
+                self._times = times[order]
+            return self._columns, self._times
+
+    def __len__(self) -> int:
+        return len(self._consolidate()[1])
+
+    def get_sensor_columns(self, start=None, end=None, location: str = None,
+                           descending: bool = False, limit: int = None, fmt: str = 'list'):
+        columns, times = self._consolidate()
+        return _format_columns(_select_window(columns, times, start, end, location,
+                                              descending=descending, limit=limit), fmt)
+
+    def query_sensor_page(self, start=None, end=None, location: str = None,
+                          after: tuple = None, limit: int = 100,
+                          descending: bool = True) -> Tuple[List[Dict], Optional[tuple]]:
+        columns, times = self._consolidate()
+        return _page_from_columns(_select_window(columns, times, start, end, location,
+                                                 after, descending, limit), limit)
+
+class ArchiveSensorStorage(SensorStorageMixin):
+    """Motor somente leitura (SensorStorageReader) sobre o arquivo colunar
+
+    Os meses fechados são lidos por memmap e gravados só por
+    archive_closed_partitions no banco SQLite. Com fmt='numpy', janelas de uma única partição saem como fatias do memmap e
+    timestamps como datetime64[s]; 'list'/'arrow' e as páginas usam o texto do SQLite.
+    """
+
+    def __init__(self, archive):
+        self.archive = archive if isinstance(archive, ColumnarArchive) else ColumnarArchive(archive)
+
+    def _window(self, start, end, location, after, descending, limit) -> Dict:
+        columns = self.archive.read('sensor_readings', start, end)
+        if not columns:
+            return {}
+        # read() já recortou [start, end); partições vêm em ordem cronológica
+        return _select_window(columns, columns['timestamp'], location=location, after=after,
+                              descending=descending, limit=limit)
+
+    def get_sensor_columns(self, start=None, end=None, location: str = None,
+                           descending: bool = False, limit: int = None, fmt: str = 'list'):
+        columns = self._window(start, end, location, None, descending, limit)
+        if not columns:
+            columns = {name: _empty_column(name) for name in SENSOR_COLUMNS}
+        return _format_columns(columns, fmt)
+
+    def query_sensor_page(self, start=None, end=None, location: str = None,
+                          after: tuple = None, limit: int = 100,
+                          descending: bool = True) -> Tuple[List[Dict], Optional[tuple]]:
+        columns = self._window(start, end, location, after, descending, limit)
+        return _page_from_columns(columns, limit) if columns else ([], None)
+
+def _empty_column(name: str):
+    import numpy as np
+
+    if name in _REAL_COLUMNS:
+        return np.array([], dtype=np.float64)
+    if name == 'id' or name in _BOOL_COLUMNS:
+        return np.array([], dtype=np.int64)
+    if name in ('timestamp', 'created_at'):
+        return np.array([], dtype='datetime64[s]')
+    return np.array([], dtype=object)
+
+def open_storage(engine: str = None, **options) -> SensorStorageReader:
+    """Abre o motor de armazenamento configurado (DB_STORAGE_ENGINE se engine for None)
+
+    'sqlite': EnhancedFarmTechDatabase (pool de conexões; options repassadas);
+    'memory': InMemorySensorStorage; 'archive': ArchiveSensorStorage(options['archive_dir']
+    ou DB_ARCHIVE_DIR). Só 'sqlite' e 'memory' são SensorStorage (graváveis);
+    teste com isinstance(storage, SensorStorageWriter) antes de gravar.
+    """
+    from config.database import DatabaseConfig
+
+    db_config = options.pop('db_config', None) or DatabaseConfig.from_env()
+    engine = engine or db_config.storage_engine
+    if engine not in STORAGE_ENGINES:
+        raise ValueError(f"Motor de armazenamento inválido: {engine} (use {', '.join(STORAGE_ENGINES)})")
+
+    if engine == 'memory':
+        return InMemorySensorStorage()
+    if engine == 'archive':
+        archive_dir = options.get('archive_dir') or db_config.archive_dir
+        if not archive_dir:
+            raise ValueError("Motor 'archive' requer archive_dir (ou DB_ARCHIVE_DIR)")
+        return ArchiveSensorStorage(archive_dir)
+
+    sys.path.append(os.path.join(os.path.dirname(__file__), '../src/fase4/integration'))
+    from database_enhanced import EnhancedFarmTechDatabase
+    return EnhancedFarmTechDatabase(db_config=db_config, **options)
+
+def benchmark_storage(storages: Dict[str, SensorStorageReader], days: int = 30) -> Dict[str, Dict]:
+    """Mesmas operações do protocolo em cada motor (segundos), para comparar motores
+
+    Os motores já devem conter os mesmos dados; mede janela colunar, paginação
+    completa por keyset, série para gráfico e a última página.
+    """
+    report = {}
+    for name, storage in storages.items():
+        end = datetime.utcnow()
+        start = end - timedelta(days=days)
+        timings = {}
+
+        started = time.perf_counter()
+        columns = storage.get_sensor_columns(start, end, fmt='numpy')
+        timings['window_columns'] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        streamed = sum(1 for _ in storage.iter_sensor_data(start, end, page_size=5000))
+        timings['iterate_window'] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        storage.get_sensor_series('humidity', start, end, pixels=800)
+        timings['series_800px'] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        storage.get_sensor_data(100)
+        timings['latest_page'] = time.perf_counter() - started
+
+        report[name] = {key: round(value, 4) for key, value in timings.items()}
+        report[name]['rows'] = len(columns['id'])
+        report[name]['streamed'] = streamed
+    return report
+
+if __name__ == "__main__":
+    import tempfile
+    import logging
+    import numpy as np
+
+    logging.basicConfig(level=logging.WARNING)
+
+    # 60 dias de leituras a cada 5 minutos, idênticas em todos os motores
+    now = datetime.utcnow().replace(microsecond=0)
+    size = 60 * 24 * 12
+    rng = np.random.default_rng(42)
+    humidity = 45 + 15 * np.sin(np.arange(size) / 288) + rng.normal(0, 2, size)
+    rows = [(float(humidity[i]), 6.5, True, True, bool(humidity[i] < 30), 24.0, None, None, None,
+             'Campo_Principal', (now - timedelta(minutes=5 * (size - i))).strftime('%Y-%m-%d %H:%M:%S'))
+            for i in range(size)]
+
+    with tempfile.TemporaryDirectory() as workdir:
+        memory = open_storage('memory')
+        started = time.perf_counter()
+        memory.insert_sensor_batch(rows)
+        print(f"💾 memory: {size} leituras inseridas em {time.perf_counter() - started:.3f}s")
+
+        from config.database import DatabaseConfig
+        sqlite = open_storage('sqlite', db_path=os.path.join(workdir, 'bench.db'),
+                              db_config=DatabaseConfig(path=os.path.join(workdir, 'bench.db')))
+        started = time.perf_counter()
+        for offset in range(0, size, 5000):
+            sqlite.insert_sensor_batch(rows[offset:offset + 5000])
+        print(f"💾 sqlite: {size} leituras inseridas em {time.perf_counter() - started:.3f}s")
+
+        archive = ColumnarArchive(os.path.join(workdir, 'archive'))
+        archive.write_partition('sensor_readings', now.strftime(ARCHIVE_KEY_FORMAT),
+                                rows[0][-1], now.strftime('%Y-%m-%d %H:%M:%S'),
+                                memory.get_sensor_columns(fmt='numpy'))
+
+        report = benchmark_storage({'sqlite': sqlite, 'memory': memory,
+                                    'archive': open_storage('archive', archive_dir=archive.root)})
+        for name, timings in report.items():
+            print(f"⚡ {name}: {timings}")
+        sqlite.close()
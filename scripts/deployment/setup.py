@@ -55,6 +55,9 @@ class FarmTechSetup:
             from database_enhanced import EnhancedFarmTechDatabase
             
             db = EnhancedFarmTechDatabase()
+            
+            # Falha o setup se alguma consulta crítica ficar sem índice
+            db.check_query_plans()
             print("✅ Banco de dados configurado com sucesso!")
             return True
             
@@ -74,8 +77,9 @@ class FarmTechSetup:
             
             db = EnhancedFarmTechDatabase()
             
-            # Gerar 200 registros de exemplo
+            # Gerar 200 registros de exemplo (gravados em um único lote)
             base_time = datetime.now() - timedelta(days=7)
+            readings = []
             
             for i in range(200):
                 timestamp = base_time + timedelta(minutes=i*30)
@@ -89,9 +93,17 @@ class FarmTechSetup:
                 pump_status = (humidity < 35) or (ph < 6.0 or ph > 7.5) or (not phosphorus or not potassium)
                 temperature = 25 + 8 * np.sin(2 * np.pi * hour / 24) + np.random.normal(0, 2)
                 
-                db.insert_enhanced_sensor_data(
-                    humidity, ph, phosphorus, potassium, pump_status, temperature
-                )
+                readings.append({
+                    'humidity': humidity,
+                    'ph_level': ph,
+                    'phosphorus': phosphorus,
+                    'potassium': potassium,
+                    'pump_status': pump_status,
+                    'temperature': temperature,
+                    'timestamp': timestamp
+                })
+            
+            db.insert_sensor_batch(readings)
             
             print("✅ Dados de exemplo criados com sucesso!")
             return True
@@ -139,6 +151,11 @@ class FarmTechSetup:
 DB_PATH=data/farmtech_production.db
 DB_BACKUP_PATH=backups/
 DB_RETENTION_DAYS=90
+DB_STORAGE_PROFILE=wal
+DB_STATEMENT_CACHE_SIZE=256
+DB_PARTITION_PERIOD=none
+DB_ARCHIVE_DIR=
+DB_STORAGE_ENGINE=sqlite
 
 # Sensores
 SENSOR_HUMIDITY_MIN=30.0
@@ -156,6 +173,7 @@ OPENWEATHER_COUNTRY=BR
 ML_MODEL_PATH=models/farmtech_irrigation_model.pkl
 ML_RETRAIN_DAYS=7
 ML_CONFIDENCE_THRESHOLD=0.7
+ML_N_JOBS=-1
 
 # Sistema
 ENVIRONMENT=production
@@ -1,6 +1,6 @@
 from database_manager import FarmTechDatabase
 from datetime import datetime, timedelta
-import json
+import os
 
 class FarmTechCRUD:
     def __init__(self):
@@ -102,7 +102,7 @@ class FarmTechCRUD:
             elif opcao == "2":
                 dados = self.db.get_sensor_data(50)
             elif opcao == "3":
-                dados = self.db.get_sensor_data(1000)
+                dados = list(self.db.iter_sensor_data(descending=True))
             elif opcao == "4":
                 record_id = int(input("Digite o ID do registro: "))
                 dados = [self.buscar_por_id(record_id)]
@@ -249,17 +249,29 @@ class FarmTechCRUD:
         
         opcao = input("Digite sua opção: ").strip()
         
-        # Implementação simplificada - poderia ser expandida
+        # Timestamps do banco estão em UTC (CURRENT_TIMESTAMP do SQLite)
+        agora = datetime.utcnow()
+        fim = None
         if opcao == "1":
-            dados = self.db.get_sensor_data(50)  # Aproximadamente 24h com leituras a cada 30min
+            inicio = agora - timedelta(hours=24)
         elif opcao == "2":
-            dados = self.db.get_sensor_data(336)  # 7 dias * 48 leituras/dia
+            inicio = agora - timedelta(days=7)
         elif opcao == "3":
-            dados = self.db.get_sensor_data(1440)  # 30 dias * 48 leituras/dia
+            inicio = agora - timedelta(days=30)
+        elif opcao == "4":
+            try:
+                inicio = datetime.strptime(input("Data inicial (AAAA-MM-DD): ").strip(), "%Y-%m-%d")
+                fim = datetime.strptime(input("Data final (AAAA-MM-DD): ").strip(), "%Y-%m-%d")
+                fim += timedelta(days=1)  # inclui o dia final inteiro
+            except ValueError:
+                print("❌ Data inválida!")
+                return
         else:
-            print("⚠️ Funcionalidade em desenvolvimento")
+            print("❌ Opção inválida!")
             return
         
+        dados = list(self.db.iter_sensor_data(start=inicio, end=fim, descending=True))
+        
         if dados:
             self.exibir_tabela_dados(dados)
             print(f"\n📊 Total de registros encontrados: {len(dados)}")
@@ -267,36 +279,33 @@ class FarmTechCRUD:
             print("📭 Nenhum registro encontrado para o período especificado!")
     
     def exportar_dados(self):
-        """Exporta dados para arquivo JSON"""
+        """Exporta dados para arquivo (JSON Lines, CSV ou Parquet)"""
         print("\n💾 EXPORTAR DADOS")
         print("-" * 15)
         
         try:
-            dados = self.db.get_sensor_data(1000)
-            
-            if not dados:
-                print("📭 Nenhum dado para exportar!")
-                return
+            formato = input("Formato (jsonl/csv/parquet) [jsonl]: ").strip().lower() or 'jsonl'
             
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"farmtech_export_{timestamp}.json"
+            filename = f"farmtech_export_{timestamp}.{formato}"
             
-            with open(filename, 'w', encoding='utf-8') as f:
-                json.dump(dados, f, indent=2, default=str, ensure_ascii=False)
+            # Grava em lotes direto do cursor; não carrega a tabela em memória
+            total = self.db.export_sensor_data(filename, formato)
+            
+            if not total:
+                os.remove(filename)
+                print("📭 Nenhum dado para exportar!")
+                return
             
             print(f"✅ Dados exportados para: {filename}")
-            print(f"📊 Total de registros exportados: {len(dados)}")
+            print(f"📊 Total de registros exportados: {total}")
             
         except Exception as e:
             print(f"❌ Erro ao exportar dados: {e}")
     
     def buscar_por_id(self, record_id: int):
         """Busca um registro específico por ID"""
-        dados = self.db.get_sensor_data(1000)
-        for registro in dados:
-            if registro['id'] == record_id:
-                return registro
-        return None
+        return self.db.get_sensor_by_id(record_id)
     
     def mostrar_registro(self, record_id: int):
         """Mostra um registro específico"""
@@ -3,17 +3,25 @@ import matplotlib.pyplot as plt
 import pandas as pd
 import numpy as np
 from database_manager import FarmTechDatabase
+from config.storage import ArchiveSensorStorage
 from datetime import datetime, timedelta
 
 class FarmTechAnalysis:
-    def __init__(self):
-        self.db = FarmTechDatabase()
+    def __init__(self, storage=None, archive_dir=None, start=None, end=None):
+        # Qualquer motor do protocolo SensorStorage; archive_dir lê o histórico do arquivo colunar
+        if archive_dir:
+            storage = ArchiveSensorStorage(archive_dir)
+        self.db = storage or FarmTechDatabase()
+        self.period = (start, end)
+        # Período explícito ou arquivo colunar: analisa a janela inteira, não só as últimas leituras
+        self.full_window = archive_dir is not None or start is not None or end is not None
     
     def generate_sample_data(self, num_records=100):
         """Gera dados de exemplo para análise"""
         print(f"📊 Gerando {num_records} registros de exemplo...")
         
         np.random.seed(42)  # Para reprodutibilidade
+        readings = []
         
         for i in range(num_records):
             # Simular variações realistas
@@ -33,22 +41,31 @@ class FarmTechAnalysis:
                               not phosphorus or not potassium)
             pump_status = needs_irrigation and np.random.random() > 0.1
             
-            self.db.insert_sensor_data(humidity, ph, phosphorus, potassium, pump_status)
+            readings.append((humidity, ph, phosphorus, potassium, pump_status))
+        
+        # Uma única transação para todo o lote
+        self.db.insert_sensor_batch(readings)
         
         print("✅ Dados de exemplo gerados com sucesso!")
     
+    def _load_columns(self, limit=200):
+        """Últimas leituras como arrays NumPy por coluna (None se não houver dados)"""
+        data = self.db.get_sensor_columns(*self.period, descending=True,
+                                          limit=None if self.full_window else limit, fmt='numpy')
+        return data if len(data['id']) else None
+    
     def analyze_humidity_trends(self):
         """Analisa tendências de umidade"""
         print("\n💧 ANÁLISE DE UMIDADE")
         print("-" * 20)
         
         # Buscar dados
-        data = self.db.get_sensor_data(200)
-        if not data:
+        data = self._load_columns()
+        if data is None:
             print("❌ Sem dados para análise!")
             return
         
-        humidades = [record['humidity'] for record in data]
+        humidades = data['humidity']
         
         # Estatísticas
         media = np.mean(humidades)
@@ -65,10 +82,10 @@ class FarmTechAnalysis:
         print(f"   • Máximo: {maximo:.2f}%")
         
         # Classificação
-        umidade_critica = sum(1 for h in humidades if h < 30)
-        umidade_baixa = sum(1 for h in humidades if 30 <= h < 40)
-        umidade_ideal = sum(1 for h in humidades if 40 <= h <= 60)
-        umidade_alta = sum(1 for h in humidades if h > 60)
+        umidade_critica = int(np.sum(humidades < 30))
+        umidade_baixa = int(np.sum((humidades >= 30) & (humidades < 40)))
+        umidade_ideal = int(np.sum((humidades >= 40) & (humidades <= 60)))
+        umidade_alta = int(np.sum(humidades > 60))
         
         total = len(humidades)
         print(f"\n🎯 Classificação da Umidade:")
@@ -94,12 +111,12 @@ class FarmTechAnalysis:
         print("\n🧪 ANÁLISE DE pH")
         print("-" * 13)
         
-        data = self.db.get_sensor_data(200)
-        if not data:
+        data = self._load_columns()
+        if data is None:
             print("❌ Sem dados para análise!")
             return
         
-        ph_values = [record['ph_level'] for record in data]
+        ph_values = data['ph_level']
         
         # Estatísticas
         media = np.mean(ph_values)
@@ -116,9 +133,9 @@ class FarmTechAnalysis:
         print(f"   • Máximo: {maximo:.2f}")
         
         # Classificação do pH
-        acido = sum(1 for ph in ph_values if ph < 6.0)
-        ideal = sum(1 for ph in ph_values if 6.0 <= ph <= 7.5)
-        alcalino = sum(1 for ph in ph_values if ph > 7.5)
+        acido = int(np.sum(ph_values < 6.0))
+        ideal = int(np.sum((ph_values >= 6.0) & (ph_values <= 7.5)))
+        alcalino = int(np.sum(ph_values > 7.5))
         
         total = len(ph_values)
         print(f"\n⚖️ Classificação do pH:")
@@ -142,17 +159,19 @@ class FarmTechAnalysis:
         print("\n🌱 ANÁLISE DE NUTRIENTES")
         print("-" * 21)
         
-        data = self.db.get_sensor_data(200)
-        if not data:
+        data = self._load_columns()
+        if data is None:
             print("❌ Sem dados para análise!")
             return
         
-        fosforo_presente = sum(1 for record in data if record['phosphorus'])
-        potassio_presente = sum(1 for record in data if record['potassium'])
-        ambos_presentes = sum(1 for record in data if record['phosphorus'] and record['potassium'])
-        nenhum_presente = sum(1 for record in data if not record['phosphorus'] and not record['potassium'])
+        fosforo = data['phosphorus'] != 0
+        potassio = data['potassium'] != 0
+        fosforo_presente = int(fosforo.sum())
+        potassio_presente = int(potassio.sum())
+        ambos_presentes = int((fosforo & potassio).sum())
+        nenhum_presente = int((~fosforo & ~potassio).sum())
         
-        total = len(data)
+        total = len(fosforo)
         
         print(f"📊 Disponibilidade de Nutrientes:")
         print(f"   • Fósforo presente: {fosforo_presente}/{total} ({100*fosforo_presente/total:.1f}%)")
@@ -180,28 +199,21 @@ class FarmTechAnalysis:
         print("\n💦 ANÁLISE DE IRRIGAÇÃO")
         print("-" * 21)
         
-        data = self.db.get_sensor_data(200)
-        if not data:
+        data = self._load_columns()
+        if data is None:
             print("❌ Sem dados para análise!")
             return
         
-        total_readings = len(data)
-        irrigacao_ativa = sum(1 for record in data if record['pump_status'])
+        bomba = data['pump_status'] != 0
+        total_readings = len(bomba)
+        irrigacao_ativa = int(bomba.sum())
         
         # Analisar contexto da irrigação
-        irrigacao_necessaria = 0
-        irrigacao_desnecessaria = 0
-        
-        for record in data:
-            needs_water = (record['humidity'] < 35 or 
-                          record['ph_level'] < 6.0 or record['ph_level'] > 7.5 or
-                          not record['phosphorus'] or not record['potassium'])
-            
-            if record['pump_status']:
-                if needs_water:
-                    irrigacao_necessaria += 1
-                else:
-                    irrigacao_desnecessaria += 1
+        needs_water = ((data['humidity'] < 35) |
+                       (data['ph_level'] < 6.0) | (data['ph_level'] > 7.5) |
+                       (data['phosphorus'] == 0) | (data['potassium'] == 0))
+        irrigacao_necessaria = int((bomba & needs_water).sum())
+        irrigacao_desnecessaria = int((bomba & ~needs_water).sum())
         
         eficiencia = (irrigacao_necessaria / irrigacao_ativa) * 100 if irrigacao_ativa > 0 else 0
         
@@ -1,15 +1,95 @@
 import sqlite3
 import datetime
-from typing import List, Dict, Optional
+import sys
+import os
+import threading
+from typing import List, Dict, Optional, Iterable, Tuple
 
-class FarmTechDatabase:
-    def __init__(self, db_path: str = "farmtech_sensors.db"):
+# Adicionar a raiz do projeto para importar o pacote config/
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../..'))
+from config.database import DatabaseConfig
+from config.sqlite_storage import (apply_storage_profile, check_storage_profile,
+                                   apply_migrations, find_full_scans, stream_table_export,
+                                   build_keyset_query, fetch_columns,
+                                   BATCH_CONVERTERS, rows_to_columns,
+                                   build_update_sql, to_sql_timestamp)
+from config.storage import SensorStorageMixin
+
+# Colunas aceitas por insert_sensor_batch (tuplas seguem esta ordem)
+SENSOR_BATCH_COLUMNS = ['humidity', 'ph_level', 'phosphorus', 'potassium',
+                        'pump_status', 'location', 'timestamp']
+
+# Colunas que update_sensor_data/update_sensor_batch aceitam (whitelist)
+SENSOR_UPDATABLE_COLUMNS = ('humidity', 'ph_level', 'phosphorus', 'potassium',
+                            'pump_status', 'location', 'timestamp')
+
+# Colunas numéricas corrigíveis por recalibrate_sensor_range
+SENSOR_CALIBRATABLE_COLUMNS = ('humidity', 'ph_level')
+
+# Migrações versionadas do schema (PRAGMA user_version)
+SCHEMA_MIGRATIONS = [
+    (1, 'Índices por timestamp e (location, timestamp)', [
+        'CREATE INDEX IF NOT EXISTS idx_sensor_timestamp ON sensor_readings(timestamp)',
+        'CREATE INDEX IF NOT EXISTS idx_sensor_location_timestamp ON sensor_readings(location, timestamp)',
+        'CREATE INDEX IF NOT EXISTS idx_irrigation_timestamp ON irrigation_history(timestamp)'
+    ])
+]
+
+# Consultas verificadas com EXPLAIN QUERY PLAN (nenhuma pode varrer a tabela inteira)
+QUERY_PLAN_CHECKS = {
+    'latest_readings': ("SELECT * FROM sensor_readings ORDER BY timestamp DESC LIMIT ?", (100,)),
+    'location_window': (
+        "SELECT * FROM sensor_readings WHERE location = ? AND timestamp >= ? ORDER BY timestamp",
+        ('Campo_Principal', '2000-01-01')),
+    'irrigation_window': (
+        "SELECT * FROM irrigation_history WHERE timestamp >= ?", ('2000-01-01',)),
+    'keyset_page': build_keyset_query('sensor_readings', start='2000-01-01',
+                                      after=('2000-01-02 00:00:00', 1), limit=100),
+    'location_keyset_page': build_keyset_query('sensor_readings', location='Campo_Principal',
+                                               after=('2000-01-02 00:00:00', 1), limit=100)
+}
+
+class FarmTechDatabase(SensorStorageMixin):
+    """Banco da Fase 3 (uma conexão persistente por thread); segue o protocolo SensorStorage"""
+    
+    def __init__(self, db_path: str = "farmtech_sensors.db", storage_profile: str = None):
         self.db_path = db_path
+        db_config = DatabaseConfig.from_env()
+        self.storage_profile = storage_profile or db_config.storage_profile
+        self.statement_cache_size = db_config.statement_cache_size
+        self.storage_status = None
+        self._local = threading.local()
         self.init_database()
     
+    def _connect(self) -> sqlite3.Connection:
+        """Conexão da thread atual, aberta uma vez com os PRAGMAs do perfil aplicados
+        
+        Reaproveitada entre operações para que o cache de statements compilados
+        (cached_statements) tenha acertos; use 'with' para commit/rollback.
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, cached_statements=self.statement_cache_size)
+            apply_storage_profile(conn, self.storage_profile)
+            self._local.conn = conn
+        return conn
+    
+    def close(self):
+        """Fecha a conexão da thread atual (a próxima operação abre outra)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+    
     def init_database(self):
         """Inicializa o banco de dados com as tabelas necessárias"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
+        
+        # Conferir se o perfil de armazenamento foi aplicado de fato
+        self.storage_status = check_storage_profile(conn, self.storage_profile)
+        if not self.storage_status['ok']:
+            print(f"⚠️ PRAGMAs fora do perfil '{self.storage_profile}': {self.storage_status['mismatches']}")
+        
         cursor = conn.cursor()
         
         # Tabela para dados dos sensores
@@ -49,82 +129,181 @@ class FarmTechDatabase:
         ''')
         
         conn.commit()
-        conn.close()
+        
+        # Migrações versionadas (índices)
+        for version, description in apply_migrations(conn, SCHEMA_MIGRATIONS):
+            print(f"🔧 Migração {version} aplicada: {description}")
+        
+        offenders = find_full_scans(conn, QUERY_PLAN_CHECKS)
+        if offenders:
+            print(f"⚠️ Consultas sem índice adequado: {', '.join(offenders)}")
+        
         print("✅ Banco de dados inicializado com sucesso!")
     
+    def check_query_plans(self) -> Dict[str, str]:
+        """Verifica com EXPLAIN QUERY PLAN que nenhuma consulta faz varredura completa"""
+        offenders = find_full_scans(self._connect(), QUERY_PLAN_CHECKS)
+        
+        if offenders:
+            details = '; '.join(f"{name}: {' | '.join(plan)}" for name, plan in offenders.items())
+            raise RuntimeError(f"Consultas com varredura completa de tabela: {details}")
+        
+        return {name: 'OK' for name in QUERY_PLAN_CHECKS}
+    
     def insert_sensor_data(self, humidity: float, ph: float, 
                           phosphorus: bool, potassium: bool, pump_status: bool) -> int:
         """Insere dados dos sensores no banco"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        with self._connect() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                INSERT INTO sensor_readings 
+                (humidity, ph_level, phosphorus, potassium, pump_status)
+                VALUES (?, ?, ?, ?, ?)
+            ''', (humidity, ph, phosphorus, potassium, pump_status))
+            record_id = cursor.lastrowid
         
-        cursor.execute('''
-            INSERT INTO sensor_readings 
-            (humidity, ph_level, phosphorus, potassium, pump_status)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (humidity, ph, phosphorus, potassium, pump_status))
+        return record_id
+    
+    def insert_sensor_batch(self, rows: Iterable) -> range:
+        """Insere lote de leituras em uma única transação e retorna a faixa de IDs"""
+        data = rows_to_columns(rows, SENSOR_BATCH_COLUMNS, {'ph': 'ph_level'})
+        size = len(data['humidity'])
+        if size == 0:
+            return range(0)
         
-        record_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
+        converted = [[BATCH_CONVERTERS[col](value) for value in data[col]]
+                     for col in SENSOR_BATCH_COLUMNS]
+        converted[SENSOR_BATCH_COLUMNS.index('location')] = [
+            value or 'Campo_Principal' for value in converted[SENSOR_BATCH_COLUMNS.index('location')]
+        ]
         
-        return record_id
+        with self._connect() as conn:
+            cursor = conn.cursor()
+            cursor.executemany('''
+                INSERT INTO sensor_readings 
+                (humidity, ph_level, phosphorus, potassium, pump_status, location, timestamp)
+                VALUES (?, ?, ?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP))
+            ''', zip(*converted))
+            
+            # A transação mantém o lock de escrita, então os IDs são contíguos
+            last_id = cursor.execute('SELECT last_insert_rowid()').fetchone()[0]
+        
+        return range(last_id - size + 1, last_id + 1)
     
-    def get_sensor_data(self, limit: int = 100) -> List[Dict]:
-        """Recupera dados dos sensores"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
+    def get_sensor_by_id(self, record_id: int) -> Optional[Dict]:
+        """Busca uma leitura pela chave primária"""
+        cursor = self._connect().cursor()
+        cursor.row_factory = sqlite3.Row
+        row = cursor.execute('SELECT * FROM sensor_readings WHERE id = ?', (record_id,)).fetchone()
         
-        cursor.execute('''
-            SELECT * FROM sensor_readings 
-            ORDER BY timestamp DESC 
-            LIMIT ?
-        ''', (limit,))
+        return dict(row) if row else None
+    
+    def query_sensor_page(self, start=None, end=None, location: str = None,
+                          after: tuple = None, limit: int = 100,
+                          descending: bool = True) -> Tuple[List[Dict], Optional[tuple]]:
+        """Retorna uma página de leituras e o cursor (timestamp, id) da próxima
         
-        rows = cursor.fetchall()
-        conn.close()
+        start/end delimitam [start, end) em UTC, como o CURRENT_TIMESTAMP do SQLite.
+        O cursor é None quando não há mais páginas.
+        """
+        sql, params = build_keyset_query('sensor_readings', start, end, location,
+                                         after, descending, limit)
+        cursor = self._connect().cursor()
+        cursor.row_factory = sqlite3.Row
+        rows = [dict(row) for row in cursor.execute(sql, params)]
         
-        return [dict(row) for row in rows]
+        next_cursor = None
+        if rows and len(rows) == limit:
+            next_cursor = (rows[-1]['timestamp'], rows[-1]['id'])
+        return rows, next_cursor
+    
+    def get_sensor_columns(self, start=None, end=None, location: str = None,
+                           descending: bool = False, limit: int = None, fmt: str = 'list'):
+        """Retorna as leituras do período por coluna, lidas direto do cursor
+        
+        fmt: 'list' (listas), 'numpy' ({coluna: ndarray}) ou 'arrow' (pyarrow.Table).
+        """
+        sql, params = build_keyset_query('sensor_readings', start, end, location,
+                                         descending=descending, limit=limit)
+        return fetch_columns(self._connect(), sql, params, 'sensor_readings', fmt)
     
     def update_sensor_data(self, record_id: int, **kwargs) -> bool:
         """Atualiza dados de um registro específico"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        sql, columns = build_update_sql('sensor_readings', kwargs, SENSOR_UPDATABLE_COLUMNS)
+        values = [BATCH_CONVERTERS[col](kwargs[col]) for col in columns] + [record_id]
         
-        # Construir query dinâmica
-        set_clause = ", ".join([f"{key} = ?" for key in kwargs.keys()])
-        values = list(kwargs.values()) + [record_id]
+        with self._connect() as conn:
+            rows_affected = conn.execute(sql, values).rowcount
         
-        cursor.execute(f'''
-            UPDATE sensor_readings 
-            SET {set_clause}
-            WHERE id = ?
-        ''', values)
+        return rows_affected > 0
+    
+    def update_sensor_batch(self, updates: Iterable[Dict]) -> int:
+        """Aplica correções por ID em uma única transação
         
-        rows_affected = cursor.rowcount
-        conn.commit()
-        conn.close()
+        Cada item é um dict com 'id' e as colunas a alterar. Itens com o mesmo
+        conjunto de colunas compartilham um único executemany.
+        Retorna o total de linhas alteradas.
+        """
+        groups = {}
+        for update in updates:
+            update = dict(update)
+            record_id = update.pop('id')
+            sql, columns = build_update_sql('sensor_readings', update, SENSOR_UPDATABLE_COLUMNS)
+            groups.setdefault(sql, (columns, []))[1].append(
+                [BATCH_CONVERTERS[col](update[col]) for col in columns] + [record_id]
+            )
         
-        return rows_affected > 0
+        if not groups:
+            return 0
+        
+        rows_affected = 0
+        with self._connect() as conn:
+            for sql, (columns, params) in groups.items():
+                rows_affected += conn.executemany(sql, params).rowcount
+        
+        return rows_affected
     
-    def delete_sensor_data(self, record_id: int) -> bool:
-        """Remove um registro específico"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+    def recalibrate_sensor_range(self, column: str, scale: float = 1.0, offset: float = 0.0,
+                                 start=None, end=None, location: str = None) -> int:
+        """Corrige leituras de um período: column = column * scale + offset
         
-        cursor.execute('DELETE FROM sensor_readings WHERE id = ?', (record_id,))
+        Ex.: recalibrate_sensor_range('ph_level', offset=-0.3, start='2024-05-01')
+        """
+        if column not in SENSOR_CALIBRATABLE_COLUMNS:
+            raise ValueError(f"Coluna não recalibrável: {column}")
         
-        rows_affected = cursor.rowcount
-        conn.commit()
-        conn.close()
+        conditions = []
+        params = [float(scale), float(offset)]
+        if start is not None:
+            conditions.append("timestamp >= ?")
+            params.append(to_sql_timestamp(start))
+        if end is not None:
+            conditions.append("timestamp < ?")
+            params.append(to_sql_timestamp(end))
+        if location is not None:
+            conditions.append("location = ?")
+            params.append(location)
+        
+        sql = f"UPDATE sensor_readings SET {column} = {column} * ? + ?"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        
+        with self._connect() as conn:
+            rows_affected = conn.execute(sql, params).rowcount
+        
+        return rows_affected
+    
+    def delete_sensor_data(self, record_id: int) -> bool:
+        """Remove um registro específico"""
+        with self._connect() as conn:
+            rows_affected = conn.execute('DELETE FROM sensor_readings WHERE id = ?',
+                                         (record_id,)).rowcount
         
         return rows_affected > 0
     
     def get_statistics(self) -> Dict:
         """Calcula estatísticas dos dados"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        cursor = self._connect().cursor()
         
         cursor.execute('''
             SELECT 
@@ -140,7 +319,6 @@ class FarmTechDatabase:
         ''')
         
         stats = cursor.fetchone()
-        conn.close()
         
         return {
             'total_readings': stats[0] or 0,
@@ -153,6 +331,12 @@ class FarmTechDatabase:
             'pump_activations': stats[7] or 0
         }
 
+    def export_sensor_data(self, filepath: str, fmt: str = 'jsonl',
+                           chunk_size: int = 1000) -> int:
+        """Exporta todas as leituras em streaming (CSV, JSON Lines ou Parquet)"""
+        return stream_table_export(self._connect(), 'sensor_readings', filepath, fmt,
+                                   order_by='timestamp DESC', chunk_size=chunk_size)
+
 # Exemplo de uso
 if __name__ == "__main__":
     db = FarmTechDatabase()
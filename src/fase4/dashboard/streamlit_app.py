@@ -23,19 +23,31 @@ st.set_page_config(
 sys.path.append(os.path.join(os.path.dirname(__file__), '../machine_learning'))
 sys.path.append(os.path.join(os.path.dirname(__file__), '../integration'))
 sys.path.append(os.path.join(os.path.dirname(__file__), '../../fase3/python'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../..'))
+
+# Janelas de tempo dos gráficos (em dias)
+CHART_WINDOWS = {
+    '6 horas': 0.25,
+    '24 horas': 1,
+    '7 dias': 7,
+    '30 dias': 30,
+    '90 dias': 90
+}
 
 class FarmTechDashboard:
     def __init__(self):
         self.db = None
         self.predictor = None
+        self.alert_engine = None
         self.init_database()
+        self.init_alert_engine()
         self.init_ml_model()
         
     def init_database(self):
-        """Inicializa conexão com banco de dados"""
+        """Abre o motor de armazenamento configurado (DB_STORAGE_ENGINE, protocolo SensorStorage)"""
         try:
-            from database_enhanced import EnhancedFarmTechDatabase
-            self.db = EnhancedFarmTechDatabase()
+            from config.storage import open_storage
+            self.db = open_storage()
         except ImportError:
             try:
                 from database_manager import FarmTechDatabase
@@ -44,22 +56,17 @@ class FarmTechDashboard:
                 st.warning("⚠️ Usando dados mock (banco de dados não disponível)")
                 self.db = None
     
+    def init_alert_engine(self):
+        """Usa as mesmas regras de alerta da ingestão (limites de system_config)"""
+        from alert_rules import AlertRuleEngine
+        self.alert_engine = (self.db.alert_engine if self.db else None) or AlertRuleEngine.from_config()
+    
     def init_ml_model(self):
-        """Inicializa modelo de ML (opcional)"""
+        """Modelo de ML (opcional) do registry do processo: carregado uma vez, nunca treinado aqui"""
         try:
-            from irrigation_predictor import IrrigationPredictor
-            self.predictor = IrrigationPredictor()
-            
-            # Tentar carregar modelo existente
-            model_path = 'farmtech_irrigation_model.pkl'
-            if os.path.exists(model_path):
-                self.predictor.load_model(model_path)
-            else:
-                # Treinar modelo básico se não existir
-                with st.spinner("🤖 Treinando modelo de ML pela primeira vez..."):
-                    self.predictor.train_model()
-                    self.predictor.save_model(model_path)
-                st.success("✅ Modelo ML treinado com sucesso!")
+            from model_registry import get_predictor
+            # Reruns só fazem um stat do arquivo (MLConfig.model_path / ML_MODEL_PATH)
+            self.predictor = get_predictor()
                 
         except Exception as e:
             st.info(f"ℹ️ ML não disponível: Usando sistema básico")
@@ -102,18 +109,15 @@ class FarmTechDashboard:
             return self.create_mock_data()
             
         try:
-            if hasattr(self.db, 'get_sensor_data'):
-                data = self.db.get_sensor_data(limit=500)
-            else:
-                data = []
+            # Leitura colunar (arrays NumPy direto do motor, sem dicts por linha)
+            data = self.db.get_sensor_columns(descending=True, limit=500, fmt='numpy')
                 
-            if not data:
+            if len(data['id']) == 0:
                 # Gerar dados de exemplo se não houver dados
                 self.generate_sample_data()
-                if hasattr(self.db, 'get_sensor_data'):
-                    data = self.db.get_sensor_data(limit=500)
+                data = self.db.get_sensor_columns(descending=True, limit=500, fmt='numpy')
             
-            if data:
+            if len(data['id']) > 0:
                 df = pd.DataFrame(data)
                 return self.safe_convert_data(df)
             else:
@@ -169,11 +173,14 @@ class FarmTechDashboard:
     
     def generate_sample_data(self, n_samples=50):
         """Gera dados de exemplo para o banco"""
-        if not self.db:
+        from config.storage import SensorStorageWriter
+        # Motor somente leitura (arquivo colunar) não recebe dados de exemplo
+        if not isinstance(self.db, SensorStorageWriter):
             return
             
         try:
             base_time = datetime.now() - timedelta(hours=24)
+            readings = []
             
             for i in range(n_samples):
                 timestamp = base_time + timedelta(minutes=i*30)
@@ -187,11 +194,18 @@ class FarmTechDashboard:
                 
                 pump_active = (humidity < 35) or (ph < 6.0 or ph > 7.5) or (not phosphorus or not potassium)
                 
-                if hasattr(self.db, 'insert_enhanced_sensor_data'):
-                    self.db.insert_enhanced_sensor_data(humidity, ph, phosphorus, potassium, pump_active)
-                elif hasattr(self.db, 'insert_sensor_data'):
-                    self.db.insert_sensor_data(humidity, ph, phosphorus, potassium, pump_active)
-                    
+                readings.append({
+                    'humidity': humidity,
+                    'ph_level': ph,
+                    'phosphorus': phosphorus,
+                    'potassium': potassium,
+                    'pump_status': pump_active,
+                    'timestamp': timestamp
+                })
+            
+            # Todos os motores graváveis aceitam o mesmo formato de lote
+            self.db.insert_sensor_batch(readings)
+            
         except Exception as e:
             st.warning(f"⚠️ Erro ao gerar dados: {e}")
     
@@ -241,7 +255,31 @@ class FarmTechDashboard:
                 value=pump_status
             )
     
-    def create_safe_charts(self, df):
+    def load_series(self, metric, days, pixels=800):
+        """Série multirresolução do motor de armazenamento (None sem banco ou sem dados)"""
+        if not self.db:
+            return None
+        
+        end = datetime.utcnow()
+        series = self.db.get_sensor_series(metric, end - timedelta(days=days), end, pixels=pixels)
+        return series if len(series['timestamp']) else None
+    
+    def create_series_chart(self, series, title, label):
+        """Linha da média com faixa min/max de cada ponto"""
+        timestamps = pd.to_datetime(series['timestamp'])
+        fig = go.Figure()
+        fig.add_trace(go.Scatter(x=timestamps, y=series['max'], mode='lines',
+                                 line=dict(width=0), showlegend=False, hoverinfo='skip'))
+        fig.add_trace(go.Scatter(x=timestamps, y=series['min'], mode='lines',
+                                 line=dict(width=0), fill='tonexty',
+                                 fillcolor='rgba(31, 119, 180, 0.2)', name='Mín/Máx'))
+        fig.add_trace(go.Scatter(x=timestamps, y=series['avg'], mode='lines',
+                                 line=dict(color='#1f77b4'), name='Média'))
+        fig.update_layout(title=f"{title} · resolução {series['tier']}",
+                          xaxis_title='Data/Hora', yaxis_title=label)
+        return fig
+    
+    def create_safe_charts(self, df, days=1):
         """Cria gráficos seguros usando plotly express"""
         if df.empty:
             st.warning("📭 Sem dados para gráficos")
@@ -255,6 +293,10 @@ class FarmTechDashboard:
             chart_data['time_str'] = chart_data['timestamp'].dt.strftime('%H:%M')
             chart_data['date_str'] = chart_data['timestamp'].dt.strftime('%m-%d %H:%M')
             
+            # Séries longas vêm dos tiers de rollup (nunca mais que ~800 pontos)
+            humidity_series = self.load_series('humidity', days)
+            ph_series = self.load_series('ph_level', days)
+            
             # Limitar dados para performance
             if len(chart_data) > 50:
                 chart_data = chart_data.tail(50)
@@ -263,13 +305,17 @@ class FarmTechDashboard:
             
             with col1:
                 st.subheader("💧 Umidade do Solo")
-                fig_humidity = px.line(
-                    chart_data, 
-                    x='date_str', 
-                    y='humidity',
-                    title="Variação da Umidade (%)",
-                    labels={'humidity': 'Umidade (%)', 'date_str': 'Data/Hora'}
-                )
+                if humidity_series is not None:
+                    fig_humidity = self.create_series_chart(humidity_series, "Variação da Umidade (%)",
+                                                            'Umidade (%)')
+                else:
+                    fig_humidity = px.line(
+                        chart_data, 
+                        x='date_str', 
+                        y='humidity',
+                        title="Variação da Umidade (%)",
+                        labels={'humidity': 'Umidade (%)', 'date_str': 'Data/Hora'}
+                    )
                 fig_humidity.add_hline(y=30, line_dash="dash", line_color="red", 
                                      annotation_text="Crítico")
                 fig_humidity.add_hline(y=70, line_dash="dash", line_color="green", 
@@ -279,13 +325,16 @@ class FarmTechDashboard:
             
             with col2:
                 st.subheader("🧪 Nível de pH")
-                fig_ph = px.line(
-                    chart_data, 
-                    x='date_str', 
-                    y='ph_level',
-                    title="Variação do pH",
-                    labels={'ph_level': 'pH', 'date_str': 'Data/Hora'}
-                )
+                if ph_series is not None:
+                    fig_ph = self.create_series_chart(ph_series, "Variação do pH", 'pH')
+                else:
+                    fig_ph = px.line(
+                        chart_data, 
+                        x='date_str', 
+                        y='ph_level',
+                        title="Variação do pH",
+                        labels={'ph_level': 'pH', 'date_str': 'Data/Hora'}
+                    )
                 fig_ph.add_hrect(y0=6.0, y1=7.5, fillcolor="green", opacity=0.2,
                                annotation_text="Faixa Ideal")
                 fig_ph.update_xaxes(tickangle=45)
@@ -357,46 +406,50 @@ class FarmTechDashboard:
         try:
             latest = df.iloc[-1]
             
+            # Todas as leituras da janela pontuadas em um único predict_batch
+            scores = self.predictor.predict_batch(df)
+            
             col1, col2 = st.columns([1, 1])
             
             with col1:
                 st.subheader("🔮 Predição Atual")
                 
-                prediction = self.predictor.predict_irrigation(
-                    humidity=float(latest['humidity']),
-                    ph_level=float(latest['ph_level']),
-                    phosphorus=bool(latest['phosphorus']),
-                    potassium=bool(latest['potassium'])
-                )
-                
-                if prediction['irrigation_needed']:
+                if scores['irrigation_needed'][-1]:
                     st.error(f"🚨 IRRIGAÇÃO RECOMENDADA")
-                    st.write(f"**Confiança:** {prediction['confidence']:.1%}")
+                    st.write(f"**Confiança:** {scores['confidence'][-1]:.1%}")
                 else:
                     st.success(f"✅ IRRIGAÇÃO NÃO NECESSÁRIA")
-                    st.write(f"**Confiança:** {prediction['confidence']:.1%}")
+                    st.write(f"**Confiança:** {scores['confidence'][-1]:.1%}")
                 
                 # Mostrar probabilidades
                 st.write("**Probabilidades:**")
-                st.write(f"- Não irrigar: {prediction['probability_no']:.1%}")
-                st.write(f"- Irrigar: {prediction['probability_yes']:.1%}")
+                st.write(f"- Não irrigar: {scores['probability_no'][-1]:.1%}")
+                st.write(f"- Irrigar: {scores['probability_yes'][-1]:.1%}")
+                st.write(f"**Janela:** irrigação indicada em {scores['irrigation_needed'].mean():.1%} "
+                         f"das {len(df)} leituras")
             
             with col2:
                 st.subheader("⏰ Predições Futuras")
                 
-                future_predictions = self.predictor.predict_next_hours(
-                    current_humidity=float(latest['humidity']),
-                    current_ph=float(latest['ph_level']),
-                    current_phosphorus=bool(latest['phosphorus']),
-                    current_potassium=bool(latest['potassium']),
-                    hours_ahead=6
+                # Última leitura de cada local; horizonte inteiro em uma chamada ao modelo
+                current = (df.sort_values('timestamp').groupby('location').tail(1)
+                           if 'location' in df.columns else df.tail(1))
+                forecast_temperatures = getattr(self.db, 'get_forecast_temperatures', None)
+                horizon = self.predictor.forecast_horizon(
+                    current, hours_ahead=6,
+                    temperatures=forecast_temperatures(6) if forecast_temperatures else None
                 )
                 
-                for pred in future_predictions:
-                    hour = (datetime.now().hour + pred['hour_offset']) % 24
-                    status = "🔴 IRRIGAR" if pred['irrigation_needed'] else "🟢 OK"
-                    st.write(f"**Em {pred['hour_offset']}h ({hour:02d}:00)**: {status} "
-                            f"(Conf: {pred['confidence']:.1%})")
+                latest_location = latest['location'] if 'location' in df.columns else 0
+                for pred in horizon[horizon['location'] == latest_location].itertuples():
+                    status = "🔴 IRRIGAR" if pred.irrigation_needed else "🟢 OK"
+                    st.write(f"**Em {pred.hour_offset}h ({pred.future_hour:02d}:00)**: {status} "
+                            f"(Conf: {pred.confidence:.1%}, {pred.temp_avg:.1f}°C)")
+                
+                if len(current) > 1:
+                    st.write("**Probabilidade de irrigar por local:**")
+                    st.dataframe(horizon.pivot(index='location', columns='hour_offset',
+                                               values='probability_yes').style.format('{:.0%}'))
                     
         except Exception as e:
             st.error(f"❌ Erro nas predições de ML: {e}")
@@ -406,23 +459,9 @@ class FarmTechDashboard:
         if df.empty:
             return
         
-        latest = df.iloc[-1]
-        alerts = []
-        
-        # Verificar condições críticas
-        if latest['humidity'] < 25:
-            alerts.append("🚨 CRÍTICO: Umidade extremamente baixa!")
-        elif latest['humidity'] < 35:
-            alerts.append("⚠️ ATENÇÃO: Umidade abaixo do ideal")
-        
-        if latest['ph_level'] < 5.5 or latest['ph_level'] > 8.0:
-            alerts.append("🧪 ALERTA: pH fora da faixa recomendada")
-        
-        if not latest['phosphorus']:
-            alerts.append("🟡 NUTRIENTE: Fósforo insuficiente")
-        
-        if not latest['potassium']:
-            alerts.append("🔵 NUTRIENTE: Potássio insuficiente")
+        icons = {'CRITICAL': '🚨 CRÍTICO', 'WARNING': '⚠️ ATENÇÃO', 'INFO': '🟡 NUTRIENTE'}
+        alerts = [f"{icons.get(rule.severity, rule.severity)}: {message}"
+                  for rule, message in self.alert_engine.describe(df)]
         
         if alerts:
             st.error("🚨 **ALERTAS DO SISTEMA**")
@@ -430,6 +469,14 @@ class FarmTechDashboard:
                 st.write(f"- {alert}")
         else:
             st.success("✅ **Sistema funcionando normalmente**")
+        
+        # Mesmas regras avaliadas de uma vez sobre todo o período carregado
+        masks = self.alert_engine.evaluate(df, stateful=False)
+        in_alert = int(self.alert_engine.any_fired(masks).sum())
+        critical = sum(int(masks[rule.name].sum()) for rule in self.alert_engine.rules
+                       if rule.severity == 'CRITICAL')
+        st.caption(f"📊 Leituras em alerta no período: {in_alert} de {len(df)} "
+                   f"({critical} crítica(s))")
     
     def main(self):
         """Função principal do dashboard"""
@@ -444,6 +491,11 @@ class FarmTechDashboard:
         # Controles da sidebar
         show_raw_data = st.sidebar.checkbox("📋 Mostrar Dados Brutos", value=False)
         auto_refresh = st.sidebar.checkbox("🔄 Atualização Automática", value=False)
+        chart_window = st.sidebar.selectbox(
+            "🕒 Janela dos Gráficos",
+            list(CHART_WINDOWS),
+            index=1
+        )
         
         if auto_refresh:
             st.sidebar.info("🔄 Página será atualizada automaticamente")
@@ -476,7 +528,7 @@ class FarmTechDashboard:
         
         # Gráficos principais
         st.header("📈 Análise Temporal")
-        self.create_safe_charts(df)
+        self.create_safe_charts(df, CHART_WINDOWS[chart_window])
         
         # Machine Learning
         if self.predictor:
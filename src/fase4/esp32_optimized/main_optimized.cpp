@@ -33,6 +33,8 @@ struct SensorData {
 SensorData current_data = {0.0f, 0.0f, false, false, false, 0};
 
 // Limiares como constantes para economizar RAM
+// Manter iguais a SensorConfig/system_config: o servidor reavalia com
+// alert_rules.IRRIGATION_RULES (integration/alert_rules.py)
 constexpr float HUMIDITY_MIN = 30.0f;
 constexpr float PH_MIN = 6.0f;
 constexpr float PH_MAX = 7.5f;
@@ -0,0 +1,232 @@
+import threading
+import time
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from alert_rules import AlertRuleEngine, _column, _length
+
+logger = logging.getLogger(__name__)
+
+# Ordem de severidade dentro de um episódio
+SEVERITY_LEVELS = {'INFO': 1, 'WARNING': 2, 'CRITICAL': 3}
+
+@dataclass
+class AlertEpisode:
+    """Condição de alerta aberta para um (local, grupo de regra)"""
+    alert_id: int
+    location: Optional[str]
+    group: str
+    alert_type: str
+    severity: str
+    count: int
+    last_seen: str
+    persisted_count: int
+    persisted_at: float
+
+    @property
+    def level(self) -> int:
+        return SEVERITY_LEVELS[self.severity]
+
+def _now_text() -> str:
+    return datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')
+
+class AlertManager:
+    """Deduplica alertas mantendo episódios abertos em memória
+
+    Um episódio por (local, grupo de regra) — 'phosphorus' e 'potassium' são
+    grupos distintos embora ambos sejam alert_type NUTRIENT. Só transições geram
+    escrita: abrir (INSERT), escalar para severidade maior (resolve o episódio e
+    abre outro) e resolver (UPDATE resolved_at). Repetições só incrementam
+    occurrence_count/last_seen em memória; os contadores são gravados nas
+    transições e, para episódios longos, no máximo a cada touch_interval segundos.
+    Uma queda de severidade mantém o episódio aberto na severidade máxima.
+    """
+
+    def __init__(self, engine: AlertRuleEngine, touch_interval: float = 60.0,
+                 load_existing: bool = True):
+        self.engine = engine
+        self.touch_interval = touch_interval
+        self.counters = {'opened': 0, 'escalated': 0, 'resolved': 0, 'coalesced': 0}
+        # None = carregar os episódios abertos do banco no primeiro lote
+        self._episodes: Optional[Dict[Tuple[Optional[str], str], AlertEpisode]] = \
+            None if load_existing else {}
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        """Descarta o estado em memória (ex.: transação revertida); recarrega do banco"""
+        with self._lock:
+            self._episodes = None
+
+    def open_episodes(self) -> List[AlertEpisode]:
+        with self._lock:
+            return list((self._episodes or {}).values())
+
+    def _load(self, cursor):
+        """Carrega episódios abertos; duplicados do mesmo par são resolvidos (fica o mais novo)"""
+        self._episodes = {}
+        rows = cursor.execute('''
+            SELECT id, location, alert_group, alert_type, severity,
+                   occurrence_count, COALESCE(last_seen, timestamp)
+            FROM system_alerts
+            WHERE resolved_at IS NULL AND alert_group IS NOT NULL
+            ORDER BY id
+        ''').fetchall()
+        now = time.monotonic()
+        for alert_id, location, group, alert_type, severity, count, last_seen in rows:
+            previous = self._episodes.get((location, group))
+            if previous is not None:
+                self._resolve(cursor, previous, previous.last_seen)
+            self._episodes[(location, group)] = AlertEpisode(
+                alert_id, location, group, alert_type, severity, count or 1,
+                last_seen, count or 1, now)
+
+    def _open(self, cursor, location, rule, message: str, reading_id, timestamp: str):
+        cursor.execute('''
+            INSERT INTO system_alerts
+            (alert_type, severity, message, sensor_reading_id, timestamp,
+             location, alert_group, occurrence_count, last_seen)
+            VALUES (?, ?, ?, ?, ?, ?, ?, 1, ?)
+        ''', (rule.alert_type, rule.severity, message, reading_id, timestamp,
+              location, rule.group, timestamp))
+        self._episodes[(location, rule.group)] = AlertEpisode(
+            cursor.lastrowid, location, rule.group, rule.alert_type, rule.severity,
+            1, timestamp, 1, time.monotonic())
+
+    def _touch(self, cursor, episode: AlertEpisode, resolved_at: str = None) -> bool:
+        """Grava contadores (e a resolução); False se a linha sumiu (ex.: retenção)"""
+        cursor.execute('''
+            UPDATE system_alerts
+            SET occurrence_count = ?, last_seen = ?, resolved_at = ?
+            WHERE id = ?
+        ''', (episode.count, episode.last_seen, resolved_at, episode.alert_id))
+        episode.persisted_count = episode.count
+        episode.persisted_at = time.monotonic()
+        return cursor.rowcount > 0
+
+    def _resolve(self, cursor, episode: AlertEpisode, timestamp: str):
+        self._touch(cursor, episode, resolved_at=timestamp)
+        del self._episodes[(episode.location, episode.group)]
+
+    def _group_levels(self, masks: Dict[str, np.ndarray], size: int):
+        """Por grupo: nível de severidade por leitura e índice da regra que disparou"""
+        groups = {}
+        for index, rule in enumerate(self.engine.rules):
+            levels, rules = groups.setdefault(rule.group, (np.zeros(size, dtype=np.int8),
+                                                           np.full(size, -1, dtype=np.int16)))
+            mask = masks[rule.name]
+            levels[mask] = SEVERITY_LEVELS[rule.severity]
+            rules[mask] = index
+        return groups
+
+    def process(self, cursor, data, ids, timestamps=None) -> Dict[str, int]:
+        """Avalia o lote e grava só as transições de episódio usando o cursor informado
+
+        Deve rodar na mesma transação do insert das leituras; se ela falhar, chame
+        invalidate(). Retorna quantos episódios foram abertos/escalados/resolvidos.
+        """
+        size = _length(data)
+        report = {'opened': 0, 'escalated': 0, 'resolved': 0, 'coalesced': 0}
+        if not size:
+            return report
+
+        ids = np.asarray(ids)
+        if timestamps is None:
+            timestamps = [None] * size
+        now = _now_text()
+        timestamps = [now if value is None else str(value)[:19] for value in timestamps]
+
+        has_location = 'location' in (data.columns if isinstance(data, pd.DataFrame) else data)
+        if has_location:
+            codes, uniques = pd.factorize(np.asarray(data['location'], dtype=object))
+            locations = list(uniques)
+            if (codes < 0).any():
+                codes[codes < 0] = len(locations)
+                locations.append(None)
+        else:
+            codes, locations = np.zeros(size, dtype=np.int64), [None]
+
+        with self._lock:
+            masks = self.engine.evaluate(data)
+            if self._episodes is None:
+                self._load(cursor)
+            groups = self._group_levels(masks, size)
+            values = {}
+
+            for code, location in enumerate(locations):
+                positions = np.flatnonzero(codes == code) if len(locations) > 1 else np.arange(size)
+                for group, (all_levels, all_rules) in groups.items():
+                    episode = self._episodes.get((location, group))
+                    levels = all_levels[positions]
+                    active = levels > 0
+
+                    # Estado anterior como elemento virtual no início da sequência
+                    previous_level = episode.level if episode else 0
+                    extended = np.concatenate(([previous_level], levels))
+                    extended_active = extended > 0
+                    # Máximo acumulado por trecho ativo (run_id * 4 separa os trechos)
+                    starts = extended_active[1:] & ~extended_active[:-1]
+                    run_id = np.concatenate(([0], np.cumsum(starts)))
+                    running_max = np.maximum.accumulate(run_id * 4 + extended) - run_id * 4
+
+                    changed = extended_active[1:] != extended_active[:-1]
+                    escalated = (extended_active[1:] & extended_active[:-1]
+                                 & (extended[1:] > running_max[:-1]))
+                    events = np.flatnonzero(changed | escalated)
+
+                    counted = np.concatenate(([0], np.cumsum(active)))
+                    last_event = 0
+                    for event in events:
+                        # Repetições desde o último evento pertencem ao episódio aberto
+                        if episode is not None and event > last_event:
+                            episode.count += int(counted[event] - counted[last_event])
+                            episode.last_seen = timestamps[positions[event - 1]]
+                        position = positions[event]
+                        if active[event]:
+                            rule = self.engine.rules[all_rules[position]]
+                            if rule.column not in values:
+                                values[rule.column] = _column(data, rule.column)
+                            message = rule.message.format(value=values[rule.column][position])
+                            if episode is not None:  # escalada
+                                self._resolve(cursor, episode, timestamps[position])
+                                report['escalated'] += 1
+                            else:
+                                report['opened'] += 1
+                            self._open(cursor, location, rule, message,
+                                       int(ids[position]), timestamps[position])
+                            episode = self._episodes[(location, group)]
+                        else:
+                            self._resolve(cursor, episode, timestamps[position])
+                            report['resolved'] += 1
+                            episode = None
+                        last_event = event + 1
+
+                    if episode is not None and last_event < len(levels):
+                        episode.count += int(counted[-1] - counted[last_event])
+                        episode.last_seen = timestamps[positions[-1]]
+
+            # Contadores de episódios longos, no máximo a cada touch_interval
+            deadline = time.monotonic() - self.touch_interval
+            for key, episode in list(self._episodes.items()):
+                if episode.count != episode.persisted_count and episode.persisted_at <= deadline:
+                    if not self._touch(cursor, episode):
+                        # Linha removida pela retenção: o episódio recomeça na próxima leitura
+                        del self._episodes[key]
+
+            report['coalesced'] = int(sum(int(levels.astype(bool).sum())
+                                          for levels, _ in groups.values())
+                                      - report['opened'] - report['escalated'])
+            for key, value in report.items():
+                self.counters[key] += value
+        return report
+
+    def flush(self, cursor):
+        """Grava os contadores pendentes de todos os episódios abertos"""
+        with self._lock:
+            for episode in (self._episodes or {}).values():
+                if episode.count != episode.persisted_count:
+                    self._touch(cursor, episode)
@@ -0,0 +1,345 @@
+import sys
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Adicionar a raiz do projeto para importar config/database.py
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../..'))
+from config.database import SensorConfig
+
+# Parâmetros de system_config que sobrescrevem limites de SensorConfig
+SYSTEM_CONFIG_THRESHOLDS = {
+    'humidity_min_threshold': 'humidity_min',
+    'humidity_max_threshold': 'humidity_max',
+    'ph_min_threshold': 'ph_min',
+    'ph_max_threshold': 'ph_max'
+}
+
+# Histerese padrão (0 = sem histerese); configurável em system_config
+DEFAULT_HYSTERESIS = {
+    'humidity_hysteresis': 0.0,
+    'ph_hysteresis': 0.0
+}
+
+# Sufixo de sobrescrita por local em system_config: 'humidity_critical@Campo_Norte'
+LOCATION_SEPARATOR = '@'
+
+@dataclass(frozen=True)
+class AlertRule:
+    """Regra de limite avaliada como máscara booleana sobre uma coluna
+
+    below/above são chaves de limite (valor < below ou valor > above dispara);
+    when_false dispara para colunas booleanas falsas. Regras do mesmo group são
+    exclusivas: a primeira que dispara (mais severa) suprime as seguintes.
+    Com histerese h, uma regra ativa só desliga quando o valor volta além do
+    limite por h (ex.: umidade >= limite + h).
+    """
+    name: str
+    group: str
+    alert_type: str
+    severity: str
+    column: str
+    message: str
+    below: Optional[str] = None
+    above: Optional[str] = None
+    when_false: bool = False
+    hysteresis: Optional[str] = None
+
+# Alertas gravados em system_alerts
+ALERT_RULES = [
+    AlertRule('humidity_critical', 'humidity', 'HUMIDITY', 'CRITICAL', 'humidity',
+              'Umidade crítica: {value:.1f}%', below='humidity_critical',
+              hysteresis='humidity_hysteresis'),
+    AlertRule('humidity_low', 'humidity', 'HUMIDITY', 'WARNING', 'humidity',
+              'Umidade baixa: {value:.1f}%', below='humidity_warning',
+              hysteresis='humidity_hysteresis'),
+    AlertRule('ph_critical', 'ph', 'PH', 'CRITICAL', 'ph_level',
+              'pH crítico: {value:.2f}', below='ph_critical_low', above='ph_critical_high',
+              hysteresis='ph_hysteresis'),
+    AlertRule('ph_out_of_range', 'ph', 'PH', 'WARNING', 'ph_level',
+              'pH fora da faixa ideal: {value:.2f}', below='ph_min', above='ph_max',
+              hysteresis='ph_hysteresis'),
+    AlertRule('phosphorus_missing', 'phosphorus', 'NUTRIENT', 'INFO', 'phosphorus',
+              'Fósforo insuficiente detectado', when_false=True),
+    AlertRule('potassium_missing', 'potassium', 'NUTRIENT', 'INFO', 'potassium',
+              'Potássio insuficiente detectado', when_false=True)
+]
+
+# Condições de irrigação: mesmas de shouldIrrigate() em esp32_optimized/main_optimized.cpp
+IRRIGATION_RULES = [
+    AlertRule('humidity_critical', 'humidity', 'HUMIDITY', 'CRITICAL', 'humidity',
+              'Umidade crítica ({value:.1f}%)', below='humidity_critical'),
+    AlertRule('humidity_low', 'humidity', 'HUMIDITY', 'WARNING', 'humidity',
+              'Umidade baixa ({value:.1f}%)', below='humidity_min'),
+    AlertRule('ph_out_of_range', 'ph', 'PH', 'WARNING', 'ph_level',
+              'pH inadequado ({value:.2f})', below='ph_min', above='ph_max'),
+    AlertRule('phosphorus_missing', 'phosphorus', 'NUTRIENT', 'INFO', 'phosphorus',
+              'Fósforo insuficiente', when_false=True),
+    AlertRule('potassium_missing', 'potassium', 'NUTRIENT', 'INFO', 'potassium',
+              'Potássio insuficiente', when_false=True)
+]
+
+def thresholds_from_sensor_config(sensor_config: SensorConfig = None) -> Dict[str, float]:
+    sensor_config = sensor_config or SensorConfig.from_env()
+    thresholds = {
+        'humidity_min': sensor_config.humidity_min,
+        'humidity_max': sensor_config.humidity_max,
+        'ph_min': sensor_config.ph_min,
+        'ph_max': sensor_config.ph_max
+    }
+    thresholds.update(DEFAULT_HYSTERESIS)
+    thresholds.update(sensor_config.alert_thresholds)
+    return thresholds
+
+def _column(data, name: str) -> np.ndarray:
+    """Coluna como float64 (booleanos viram 0/1, None vira NaN)"""
+    values = data[name]
+    if isinstance(values, pd.Series):
+        return values.to_numpy(dtype=float, na_value=np.nan)
+    if isinstance(values, np.ndarray) and values.dtype != object:
+        return values.astype(float, copy=False)
+    return np.array([np.nan if value is None else value for value in values], dtype=float)
+
+def _length(data) -> int:
+    if isinstance(data, pd.DataFrame):
+        return len(data)
+    return len(next(iter(data.values()))) if data else 0
+
+class AlertRuleEngine:
+    """Compila regras de limite em máscaras NumPy e avalia lotes inteiros de uma vez
+
+    Limites vêm de SensorConfig, sobrescritos por system_config (inclusive por
+    local, com o sufixo '@<local>'). O estado da histerese é guardado por
+    (regra, local) entre lotes; use reset_state() antes de reavaliar histórico.
+    """
+
+    def __init__(self, thresholds: Dict[str, float],
+                 overrides: Dict[str, Dict[str, float]] = None,
+                 rules: List[AlertRule] = None):
+        self.rules = list(rules if rules is not None else ALERT_RULES)
+        self.thresholds = dict(thresholds)
+        self.overrides = {location: dict(values) for location, values in (overrides or {}).items()}
+
+        missing = {key for rule in self.rules
+                   for key in (rule.below, rule.above, rule.hysteresis)
+                   if key is not None and key not in self.thresholds}
+        if missing:
+            raise ValueError(f"Limites sem valor para as regras: {', '.join(sorted(missing))}")
+
+        self._state: Dict[Tuple[str, Optional[str]], bool] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, db=None, sensor_config: SensorConfig = None,
+                    rules: List[AlertRule] = None) -> 'AlertRuleEngine':
+        """Limites de SensorConfig com as sobrescritas de system_config do banco (se houver)"""
+        thresholds = thresholds_from_sensor_config(sensor_config)
+        overrides = {}
+        if db is not None:
+            for name, value in db.get_config_values().items():
+                key, _, location = name.partition(LOCATION_SEPARATOR)
+                key = SYSTEM_CONFIG_THRESHOLDS.get(key, key)
+                if key not in thresholds or isinstance(value, bool):
+                    continue
+                try:
+                    value = float(value)
+                except (TypeError, ValueError):
+                    continue
+                if location:
+                    overrides.setdefault(location, {})[key] = value
+                else:
+                    thresholds[key] = value
+        return cls(thresholds, overrides, rules)
+
+    def with_rules(self, rules: List[AlertRule]) -> 'AlertRuleEngine':
+        """Mesmos limites aplicados a outro conjunto de regras (estado zerado)"""
+        return AlertRuleEngine(self.thresholds, self.overrides, rules)
+
+    def threshold(self, key: str, location: str = None) -> float:
+        return self.overrides.get(location, {}).get(key, self.thresholds[key])
+
+    def reset_state(self):
+        with self._lock:
+            self._state.clear()
+
+    def _threshold_values(self, key: str, codes, locations):
+        """Limite escalar ou, havendo sobrescrita para os locais do lote, um array por leitura"""
+        value = self.thresholds[key]
+        if codes is None:
+            return value
+        per_location = np.array([self.overrides.get(location, {}).get(key, value)
+                                 for location in locations], dtype=float)
+        if (per_location == value).all():
+            return value
+        return per_location[codes]
+
+    def _raw_mask(self, rule: AlertRule, values: np.ndarray, codes, locations) -> np.ndarray:
+        """Máscara sem histerese, e a máscara de 'liberação' (volta à faixa normal)"""
+        if rule.when_false:
+            on = values == 0
+            return on, ~on & ~np.isnan(values)
+
+        hysteresis = 0.0
+        if rule.hysteresis is not None:
+            hysteresis = self._threshold_values(rule.hysteresis, codes, locations)
+
+        on = np.zeros(len(values), dtype=bool)
+        off = ~np.isnan(values)
+        if rule.below is not None:
+            low = self._threshold_values(rule.below, codes, locations)
+            on |= values < low
+            off &= values >= low + hysteresis
+        if rule.above is not None:
+            high = self._threshold_values(rule.above, codes, locations)
+            on |= values > high
+            off &= values <= high - hysteresis
+        return on, off
+
+    def _apply_hysteresis(self, rule: AlertRule, on: np.ndarray, off: np.ndarray,
+                          codes, locations) -> np.ndarray:
+        """Estado de cada leitura = último evento (liga/desliga) anterior no mesmo local
+
+        Vetorizado: ordena por local (estável), propaga o índice do último evento com
+        np.maximum.accumulate e usa o estado salvo do lote anterior no início de cada local.
+        """
+        size = len(on)
+        if codes is None:
+            codes = np.zeros(size, dtype=np.int64)
+            locations = [None]
+
+        order = np.argsort(codes, kind='stable')
+        sorted_codes = codes[order]
+        on_sorted = on[order]
+        off_sorted = off[order]
+
+        group_start = np.ones(size, dtype=bool)
+        group_start[1:] = sorted_codes[1:] != sorted_codes[:-1]
+
+        previous = np.array([self._state.get((rule.name, location), False)
+                             for location in locations], dtype=bool)
+        event_state = np.where(on_sorted, True, np.where(off_sorted, False,
+                                                          previous[sorted_codes]))
+        positions = np.arange(size)
+        last_event = np.maximum.accumulate(
+            np.where(on_sorted | off_sorted | group_start, positions, 0))
+        active_sorted = event_state[last_event]
+
+        group_end = np.ones(size, dtype=bool)
+        group_end[:-1] = group_start[1:]
+        for position in np.flatnonzero(group_end):
+            self._state[(rule.name, locations[sorted_codes[position]])] = bool(active_sorted[position])
+
+        active = np.empty(size, dtype=bool)
+        active[order] = active_sorted
+        return active
+
+    def evaluate(self, data, stateful: bool = True) -> Dict[str, np.ndarray]:
+        """Avalia todas as regras sobre um lote (DataFrame ou dict de colunas)
+
+        Retorna {nome da regra: máscara booleana por leitura}. A coluna 'location',
+        se presente, seleciona as sobrescritas e o estado de histerese por local.
+        """
+        size = _length(data)
+        codes, locations = None, None
+        has_location = 'location' in (data.columns if isinstance(data, pd.DataFrame) else data)
+        if has_location and size:
+            codes, uniques = pd.factorize(np.asarray(data['location'], dtype=object))
+            locations = list(uniques)
+            if (codes < 0).any():  # leituras sem local
+                codes[codes < 0] = len(locations)
+                locations.append(None)
+
+        columns = {}
+        fired_by_group: Dict[str, np.ndarray] = {}
+        masks = {}
+        with self._lock:
+            for rule in self.rules:
+                if rule.column not in columns:
+                    columns[rule.column] = _column(data, rule.column)
+                on, off = self._raw_mask(rule, columns[rule.column], codes, locations)
+
+                hysteresis = rule.hysteresis is not None and np.any(
+                    self._threshold_values(rule.hysteresis, codes, locations))
+                if stateful and hysteresis and size:
+                    mask = self._apply_hysteresis(rule, on, off, codes, locations)
+                else:
+                    mask = on
+
+                fired = fired_by_group.get(rule.group)
+                if fired is not None:
+                    mask = mask & ~fired
+                    fired_by_group[rule.group] = fired | mask
+                else:
+                    fired_by_group[rule.group] = mask
+                masks[rule.name] = mask
+        return masks
+
+    def any_fired(self, masks: Dict[str, np.ndarray]) -> np.ndarray:
+        """Leituras em que alguma regra disparou (ex.: decisão de irrigação)"""
+        result = None
+        for mask in masks.values():
+            result = mask.copy() if result is None else result | mask
+        return result
+
+    def build_alerts(self, data, ids, timestamps=None) -> List[tuple]:
+        """Linhas (alert_type, severity, message, sensor_reading_id, timestamp) para system_alerts"""
+        masks = self.evaluate(data)
+        ids = np.asarray(ids)
+        alerts = []
+        for rule in self.rules:
+            indexes = np.flatnonzero(masks[rule.name])
+            if not len(indexes):
+                continue
+            values = _column(data, rule.column)
+            for i in indexes:
+                alerts.append((rule.alert_type, rule.severity,
+                               rule.message.format(value=values[i]), int(ids[i]),
+                               None if timestamps is None else timestamps[i]))
+        return alerts
+
+    def describe(self, data, index: int = -1) -> List[Tuple[AlertRule, str]]:
+        """Regras disparadas para uma leitura (sem alterar o estado da histerese)"""
+        if isinstance(data, pd.DataFrame):
+            row = data.iloc[[index]]
+        else:
+            row = {name: [values[index]] for name, values in data.items()}
+        masks = self.evaluate(row, stateful=False)
+        return [(rule, rule.message.format(value=_column(row, rule.column)[0]))
+                for rule in self.rules if masks[rule.name][0]]
+
+def benchmark(count: int = 1_000_000, locations: int = 8, seed: int = 0) -> Dict:
+    """Mede leituras/s do motor com e sem histerese e sobrescritas por local"""
+    rng = np.random.default_rng(seed)
+    data = {
+        'humidity': rng.uniform(0, 100, count),
+        'ph_level': rng.uniform(4, 9, count),
+        'phosphorus': rng.integers(0, 2, count).astype(float),
+        'potassium': rng.integers(0, 2, count).astype(float),
+        'location': np.array([f'Campo_{i}' for i in range(locations)], dtype=object)[
+            rng.integers(0, locations, count)]
+    }
+    base = thresholds_from_sensor_config(SensorConfig())
+
+    results = {'readings': count}
+    plain = AlertRuleEngine(base)
+    started = time.perf_counter()
+    plain.evaluate({name: data[name] for name in data if name != 'location'})
+    results['plain_readings_per_second'] = round(count / (time.perf_counter() - started))
+
+    tuned = dict(base, humidity_hysteresis=2.0, ph_hysteresis=0.2)
+    engine = AlertRuleEngine(tuned, overrides={'Campo_1': {'humidity_critical': 15.0}})
+    started = time.perf_counter()
+    engine.evaluate(data)
+    results['hysteresis_readings_per_second'] = round(count / (time.perf_counter() - started))
+    return results
+
+# Execução principal
+if __name__ == "__main__":
+    print("⚡ Benchmark do motor de regras:")
+    for key, value in benchmark().items():
+        print(f"  {key}: {value}")
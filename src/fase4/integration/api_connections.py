@@ -6,6 +6,7 @@ import logging
 from dataclasses import dataclass
 import os
 from database_enhanced import EnhancedFarmTechDatabase
+from alert_rules import IRRIGATION_RULES
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
@@ -112,30 +113,38 @@ class WeatherAPIClient:
     def _save_weather_data(self, weather: WeatherData, data_source: str):
         """Salva dados meteorológicos no banco"""
         try:
-            conn = self.db._get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                INSERT INTO weather_data 
-                (temperature, humidity, pressure, wind_speed, precipitation, 
-                 weather_condition, forecast_hours, data_source, timestamp)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                weather.temperature, weather.humidity, weather.pressure,
-                weather.wind_speed, weather.precipitation, weather.weather_condition,
-                weather.forecast_hours, data_source, weather.timestamp
-            ))
-            
-            conn.commit()
-            conn.close()
+            with self.db._get_connection() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute('''
+                    INSERT INTO weather_data 
+                    (temperature, humidity, pressure, wind_speed, precipitation, 
+                     weather_condition, forecast_hours, data_source, timestamp)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', (
+                    weather.temperature, weather.humidity, weather.pressure,
+                    weather.wind_speed, weather.precipitation, weather.weather_condition,
+                    weather.forecast_hours, data_source, weather.timestamp
+                ))
             
         except Exception as e:
             logger.error(f"❌ Erro ao salvar dados meteorológicos: {e}")
 
+# Peso de cada condição de irrigação na confiança da decisão
+IRRIGATION_CONFIDENCE = {
+    'humidity_critical': 0.3,
+    'humidity_low': 0.2,
+    'ph_out_of_range': 0.15,
+    'phosphorus_missing': 0.1,
+    'potassium_missing': 0.1
+}
+
 class SmartIrrigationDecision:
     def __init__(self):
         self.weather_client = WeatherAPIClient()
         self.db = EnhancedFarmTechDatabase()
+        # Mesmos limites dos alertas (system_config), condições de shouldIrrigate()
+        self.irrigation_rules = self.db.alert_engine.with_rules(IRRIGATION_RULES)
         
     def make_irrigation_decision(self, current_humidity: float, current_ph: float,
                                phosphorus: bool, potassium: bool) -> Dict:
@@ -176,39 +185,21 @@ class SmartIrrigationDecision:
                              phosphorus: bool, potassium: bool) -> Dict:
         """Decisão baseada apenas nos sensores"""
         reasons = []
-        should_irrigate = False
         confidence = 0.5
         
-        # Verificar umidade
-        if humidity < 25:
-            should_irrigate = True
-            reasons.append(f"Umidade crítica ({humidity:.1f}%)")
-            confidence += 0.3
-        elif humidity < 35:
-            should_irrigate = True
-            reasons.append(f"Umidade baixa ({humidity:.1f}%)")
-            confidence += 0.2
-        elif humidity > 65:
+        fired = self.irrigation_rules.describe({
+            'humidity': [humidity], 'ph_level': [ph],
+            'phosphorus': [phosphorus], 'potassium': [potassium]
+        }, 0)
+        for rule, message in fired:
+            reasons.append(message)
+            confidence += IRRIGATION_CONFIDENCE[rule.name]
+        
+        should_irrigate = bool(fired)
+        if humidity > self.irrigation_rules.threshold('humidity_max'):
             reasons.append(f"Umidade adequada ({humidity:.1f}%)")
             confidence -= 0.1
         
-        # Verificar pH
-        if ph < 6.0 or ph > 7.5:
-            should_irrigate = True
-            reasons.append(f"pH inadequado ({ph:.2f})")
-            confidence += 0.15
-        
-        # Verificar nutrientes
-        if not phosphorus:
-            should_irrigate = True
-            reasons.append("Fósforo insuficiente")
-            confidence += 0.1
-        
-        if not potassium:
-            should_irrigate = True
-            reasons.append("Potássio insuficiente")
-            confidence += 0.1
-        
         confidence = min(1.0, max(0.0, confidence))
         
         return {
@@ -0,0 +1,183 @@
+import sqlite3
+import threading
+import queue
+import logging
+import weakref
+from contextlib import contextmanager
+from typing import Optional
+
+# Configurar logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class PoolExhaustedError(sqlite3.OperationalError):
+    """Nenhuma conexão livre no pool dentro do tempo limite"""
+
+class PooledConnection:
+    """Proxy de sqlite3.Connection que devolve a conexão ao pool em close()
+
+    Um proxy coletado pelo GC sem close() devolve a conexão pelo finalizador,
+    para a vaga não ficar presa para sempre.
+    """
+
+    def __init__(self, pool: 'SQLiteConnectionPool', conn: sqlite3.Connection):
+        object.__setattr__(self, '_pool', pool)
+        object.__setattr__(self, '_conn', conn)
+        # O finalizador guarda pool e conexão, nunca o proxy (senão ele não seria coletado)
+        object.__setattr__(self, '_finalizer', weakref.finalize(self, pool.reclaim, conn))
+
+    def __getattr__(self, name):
+        conn = object.__getattribute__(self, '_conn')
+        if conn is None:
+            raise sqlite3.ProgrammingError("Conexão já devolvida ao pool")
+        return getattr(conn, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._conn, name, value)
+
+    @property
+    def raw_connection(self) -> sqlite3.Connection:
+        """Conexão sqlite3 subjacente (para APIs que exigem o tipo concreto)"""
+        return object.__getattribute__(self, '_conn')
+
+    def close(self):
+        """Devolve a conexão ao pool em vez de fechá-la"""
+        conn = object.__getattribute__(self, '_conn')
+        if conn is not None:
+            object.__setattr__(self, '_conn', None)
+            object.__getattribute__(self, '_finalizer').detach()
+            self._pool.release(conn)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        conn = object.__getattribute__(self, '_conn')
+        if conn is not None:
+            if exc_type is None:
+                conn.commit()
+            else:
+                conn.rollback()
+        self.close()
+        return False
+
+class SQLiteConnectionPool:
+    """Pool thread-safe de conexões SQLite persistentes"""
+
+    def __init__(self, db_path: str, max_connections: int = 10, timeout: int = 30,
+                 statement_cache_size: int = 128):
+        self.db_path = db_path
+        self.timeout = timeout
+        # LRU de statements compilados do próprio sqlite3, um por conexão
+        self.statement_cache_size = statement_cache_size
+        # Banco em memória existe apenas na própria conexão
+        self.max_connections = 1 if db_path == ':memory:' else max(1, max_connections)
+
+        self._idle = queue.LifoQueue(maxsize=self.max_connections)
+        self._lock = threading.Lock()
+        self._created = 0
+        self._closed = False
+        self._on_connect = []
+
+    def add_connect_hook(self, hook):
+        """Registra função chamada com cada nova conexão criada pelo pool"""
+        self._on_connect.append(hook)
+
+    def _create_connection(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=self.timeout, check_same_thread=False,
+                               cached_statements=self.statement_cache_size)
+        for hook in self._on_connect:
+            hook(conn)
+        return conn
+
+    def acquire(self, timeout: Optional[float] = None) -> PooledConnection:
+        """Obtém uma conexão do pool, criando uma nova se houver capacidade"""
+        if self._closed:
+            raise sqlite3.ProgrammingError("Pool de conexões encerrado")
+
+        try:
+            return PooledConnection(self, self._idle.get_nowait())
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            if self._created < self.max_connections:
+                self._created += 1
+                create = True
+            else:
+                create = False
+
+        if create:
+            try:
+                return PooledConnection(self, self._create_connection())
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+
+        wait = self.timeout if timeout is None else timeout
+        try:
+            return PooledConnection(self, self._idle.get(timeout=wait))
+        except queue.Empty:
+            raise PoolExhaustedError(
+                f"Nenhuma conexão disponível após {wait}s ({self.max_connections} em uso)"
+            )
+
+    def release(self, conn: sqlite3.Connection):
+        """Devolve uma conexão ao pool, descartando transações pendentes"""
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            conn.row_factory = None
+        except sqlite3.Error:
+            self._discard(conn)
+            return
+
+        if self._closed:
+            self._discard(conn)
+            return
+
+        try:
+            self._idle.put_nowait(conn)
+        except queue.Full:
+            self._discard(conn)
+
+    def reclaim(self, conn: sqlite3.Connection):
+        """Chamado pelo finalizador de um PooledConnection esquecido sem close()"""
+        logger.warning("⚠️ Conexão coletada sem close(): devolvendo ao pool")
+        self.release(conn)
+
+    def _discard(self, conn: sqlite3.Connection):
+        with self._lock:
+            self._created -= 1
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+    @contextmanager
+    def connection(self):
+        """Context manager: commit ao sair, rollback em erro, devolve ao pool"""
+        conn = self.acquire()
+        with conn:
+            yield conn
+
+    def close_all(self):
+        """Fecha todas as conexões ociosas e impede novas aquisições"""
+        self._closed = True
+        while True:
+            try:
+                self._discard(self._idle.get_nowait())
+            except queue.Empty:
+                break
+        logger.info(f"🔌 Pool de conexões encerrado: {self.db_path}")
+
+    def stats(self) -> dict:
+        """Retorna estado atual do pool"""
+        return {
+            'db_path': self.db_path,
+            'max_connections': self.max_connections,
+            'created': self._created,
+            'idle': self._idle.qsize(),
+            'in_use': self._created - self._idle.qsize()
+        }
@@ -2,130 +2,537 @@ import sqlite3
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
-from typing import List, Dict, Optional, Tuple
+from typing import List, Dict, Optional, Tuple, Iterable
+from concurrent.futures import Future
 import json
 import logging
+import sys
+import os
+import time
+import threading
+from contextlib import contextmanager
+
+from connection_pool import SQLiteConnectionPool, PooledConnection
+from write_behind import WriteBehindQueue
+from alert_rules import AlertRuleEngine
+from alert_manager import AlertManager
+from sensor_shards import ShardedSensorStore, Shard, SHARD_CATALOG_SQL, period_bounds
+from series_tiers import choose_tier, rollup_series_sql, series_from_rows, SERIES_METRICS
+
+# Adicionar a raiz do projeto para importar o pacote config/
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../..'))
+from config.database import DatabaseConfig
+from config.sqlite_storage import (apply_storage_profile, check_storage_profile,
+                                   apply_migrations, find_full_scans, enable_incremental_vacuum,
+                                   incremental_vacuum_enabled,
+                                   stream_table_export, table_columns, iter_query_chunks,
+                                   write_export, build_keyset_query, fetch_columns,
+                                   BATCH_CONVERTERS, rows_to_columns)
+from config.columnar_archive import ColumnarArchive, ARCHIVE_TABLES, ARCHIVE_KEY_FORMAT
+from config.storage import SensorStorageMixin, downsample_series, series_from_raw
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-class EnhancedFarmTechDatabase:
-    def __init__(self, db_path: str = "farmtech_enhanced.db"):
+# Colunas aceitas por insert_sensor_batch (tuplas seguem a ordem de insert_enhanced_sensor_data)
+SENSOR_BATCH_COLUMNS = ['humidity', 'ph_level', 'phosphorus', 'potassium', 'pump_status',
+                        'temperature', 'light_intensity', 'soil_conductivity',
+                        'weather_condition', 'location', 'timestamp']
+
+# Tabelas limpas pela retenção (dependentes antes de sensor_readings)
+RETENTION_TABLES = ['ml_predictions', 'system_alerts', 'sensor_readings', 'weather_data']
+
+# Tabelas exportáveis e a coluna de tempo usada no filtro por período
+EXPORT_TIME_COLUMNS = {
+    'sensor_readings': 'timestamp',
+    'ml_predictions': 'timestamp',
+    'system_alerts': 'timestamp',
+    'weather_data': 'timestamp',
+    'irrigation_history': 'start_time'
+}
+
+# Expressão do bucket de cada tabela de rollup de sensores ({ts} = coluna de tempo)
+ROLLUP_BUCKETS = {
+    'sensor_rollup_hourly': "strftime('%Y-%m-%d %H:00:00', {ts})",
+    'sensor_rollup_daily': "strftime('%Y-%m-%d 00:00:00', {ts})",
+    'sensor_rollup_minute': "strftime('%Y-%m-%d %H:%M:00', {ts})",
+    'sensor_rollup_15min': "datetime(CAST(strftime('%s', {ts}) AS INTEGER) / 900 * 900, 'unixepoch')"
+}
+
+# Tiers finos das séries de gráfico têm retenção própria (os demais ficam para sempre)
+ROLLUP_RETENTION_DAYS = {
+    'sensor_rollup_minute': 30
+}
+
+def _rollup_table_sql(table: str) -> str:
+    return f'''
+        CREATE TABLE IF NOT EXISTS {table} (
+            bucket TEXT NOT NULL,
+            location TEXT NOT NULL,
+            reading_count INTEGER NOT NULL,
+            humidity_sum REAL NOT NULL,
+            humidity_min REAL,
+            humidity_max REAL,
+            ph_sum REAL NOT NULL,
+            ph_min REAL,
+            ph_max REAL,
+            temperature_sum REAL NOT NULL,
+            temperature_count INTEGER NOT NULL,
+            pump_activations INTEGER NOT NULL,
+            PRIMARY KEY (bucket, location)
+        ) WITHOUT ROWID
+    '''
+
+def _rollup_backfill_sql(table: str) -> str:
+    return f'''
+        INSERT OR REPLACE INTO {table}
+        SELECT {ROLLUP_BUCKETS[table].format(ts='timestamp')}, COALESCE(location, ''),
+               COUNT(*), TOTAL(humidity), MIN(humidity), MAX(humidity),
+               TOTAL(ph_level), MIN(ph_level), MAX(ph_level),
+               TOTAL(temperature), COUNT(temperature), TOTAL(pump_status = 1)
+        FROM sensor_readings
+        GROUP BY 1, 2
+    '''
+
+def _rollup_merge_sql(table: str, source: str) -> str:
+    """Soma ao rollup as leituras de source com id entre ? e ? (uma vez por lote inserido)"""
+    return f'''
+        INSERT INTO {table}
+        SELECT {ROLLUP_BUCKETS[table].format(ts='timestamp')}, COALESCE(location, ''),
+               COUNT(*), TOTAL(humidity), MIN(humidity), MAX(humidity),
+               TOTAL(ph_level), MIN(ph_level), MAX(ph_level),
+               TOTAL(temperature), COUNT(temperature), TOTAL(pump_status = 1)
+        FROM {source}
+        WHERE id BETWEEN ? AND ?
+        GROUP BY 1, 2
+        ON CONFLICT(bucket, location) DO UPDATE SET
+            reading_count = reading_count + excluded.reading_count,
+            humidity_sum = humidity_sum + excluded.humidity_sum,
+            humidity_min = MIN(humidity_min, excluded.humidity_min),
+            humidity_max = MAX(humidity_max, excluded.humidity_max),
+            ph_sum = ph_sum + excluded.ph_sum,
+            ph_min = MIN(ph_min, excluded.ph_min),
+            ph_max = MAX(ph_max, excluded.ph_max),
+            temperature_sum = temperature_sum + excluded.temperature_sum,
+            temperature_count = temperature_count + excluded.temperature_count,
+            pump_activations = pump_activations + excluded.pump_activations
+    '''
+
+def _rollup_upsert_sql(table: str) -> str:
+    return f'''
+        INSERT INTO {table} VALUES (
+            {ROLLUP_BUCKETS[table].format(ts='NEW.timestamp')}, COALESCE(NEW.location, ''),
+            1, NEW.humidity, NEW.humidity, NEW.humidity,
+            NEW.ph_level, NEW.ph_level, NEW.ph_level,
+            COALESCE(NEW.temperature, 0), NEW.temperature IS NOT NULL, NEW.pump_status = 1
+        )
+        ON CONFLICT(bucket, location) DO UPDATE SET
+            reading_count = reading_count + 1,
+            humidity_sum = humidity_sum + excluded.humidity_sum,
+            humidity_min = MIN(humidity_min, excluded.humidity_min),
+            humidity_max = MAX(humidity_max, excluded.humidity_max),
+            ph_sum = ph_sum + excluded.ph_sum,
+            ph_min = MIN(ph_min, excluded.ph_min),
+            ph_max = MAX(ph_max, excluded.ph_max),
+            temperature_sum = temperature_sum + excluded.temperature_sum,
+            temperature_count = temperature_count + excluded.temperature_count,
+            pump_activations = pump_activations + excluded.pump_activations;
+    '''
+
+# Migrações versionadas do schema (PRAGMA user_version)
+SCHEMA_MIGRATIONS = [
+    (1, 'Índices compostos e de cobertura para consultas por janela de tempo', [
+        'CREATE INDEX IF NOT EXISTS idx_sensor_location_timestamp ON sensor_readings(location, timestamp)',
+        # Cobre as agregações de get_enhanced_statistics sem acessar a tabela
+        '''CREATE INDEX IF NOT EXISTS idx_sensor_timestamp_stats
+           ON sensor_readings(timestamp, humidity, ph_level, pump_status, temperature)''',
+        'CREATE INDEX IF NOT EXISTS idx_alerts_ack_timestamp ON system_alerts(acknowledged, timestamp)',
+        'CREATE INDEX IF NOT EXISTS idx_alerts_severity_ack ON system_alerts(severity, acknowledged)',
+        '''CREATE INDEX IF NOT EXISTS idx_alerts_timestamp_stats
+           ON system_alerts(timestamp, severity, acknowledged)''',
+        '''CREATE INDEX IF NOT EXISTS idx_predictions_timestamp
+           ON ml_predictions(timestamp, confidence_score, prediction_accuracy)''',
+        '''CREATE INDEX IF NOT EXISTS idx_irrigation_start_stats
+           ON irrigation_history(start_time, duration_minutes, water_amount_liters, efficiency_score)''',
+        'CREATE INDEX IF NOT EXISTS idx_weather_timestamp ON weather_data(timestamp)'
+    ]),
+    (2, 'Rollups horários e diários de sensores mantidos por trigger', [
+        _rollup_table_sql('sensor_rollup_hourly'),
+        _rollup_table_sql('sensor_rollup_daily'),
+        _rollup_backfill_sql('sensor_rollup_hourly'),
+        _rollup_backfill_sql('sensor_rollup_daily'),
+        f'''CREATE TRIGGER IF NOT EXISTS trg_sensor_rollup AFTER INSERT ON sensor_readings
+           BEGIN
+               {_rollup_upsert_sql('sensor_rollup_hourly')}
+               {_rollup_upsert_sql('sensor_rollup_daily')}
+           END'''
+    ]),
+    (3, 'Índice de alertas por leitura para reavaliação de regras', [
+        'CREATE INDEX IF NOT EXISTS idx_alerts_sensor_reading ON system_alerts(sensor_reading_id)'
+    ]),
+    (4, 'Episódios de alerta deduplicados (contagem, last_seen e resolução)', [
+        'ALTER TABLE system_alerts ADD COLUMN location TEXT',
+        'ALTER TABLE system_alerts ADD COLUMN alert_group TEXT',
+        'ALTER TABLE system_alerts ADD COLUMN occurrence_count INTEGER DEFAULT 1',
+        'ALTER TABLE system_alerts ADD COLUMN last_seen DATETIME',
+        'ALTER TABLE system_alerts ADD COLUMN resolved_at DATETIME',
+        # Alertas antigos viram episódios de uma ocorrência já encerrados
+        'UPDATE system_alerts SET last_seen = timestamp, resolved_at = timestamp',
+        '''CREATE INDEX IF NOT EXISTS idx_alerts_open_episodes
+           ON system_alerts(location, alert_group) WHERE resolved_at IS NULL'''
+    ]),
+    (5, 'Catálogo de partições mensais de sensor_readings', SHARD_CATALOG_SQL),
+    (6, 'Rollups de 1 e 15 minutos para séries de gráfico multirresolução', [
+        _rollup_table_sql('sensor_rollup_minute'),
+        _rollup_table_sql('sensor_rollup_15min'),
+        _rollup_backfill_sql('sensor_rollup_minute'),
+        _rollup_backfill_sql('sensor_rollup_15min'),
+        f'''CREATE TRIGGER IF NOT EXISTS trg_sensor_rollup_fine AFTER INSERT ON sensor_readings
+           BEGIN
+               {_rollup_upsert_sql('sensor_rollup_minute')}
+               {_rollup_upsert_sql('sensor_rollup_15min')}
+           END'''
+    ]),
+    # Trigger por linha dobrava o custo de insert_sensor_batch: os rollups passam a
+    # ser somados uma vez por lote (_merge_rollups), na mesma transação do INSERT
+    (7, 'Rollups atualizados por lote em vez de triggers por linha', [
+        'DROP TRIGGER IF EXISTS trg_sensor_rollup',
+        'DROP TRIGGER IF EXISTS trg_sensor_rollup_fine'
+    ])
+]
+
+# Agregados parciais no mesmo formato das tabelas de rollup
+_RAW_PARTIAL_SQL = '''
+    SELECT COUNT(*), TOTAL(humidity), MIN(humidity), MAX(humidity),
+           TOTAL(ph_level), MIN(ph_level), MAX(ph_level),
+           TOTAL(temperature), COUNT(temperature), TOTAL(pump_status = 1)
+    FROM {table} WHERE timestamp >= ? AND timestamp < ?'''
+
+_ROLLUP_PARTIAL_SQL = '''
+    SELECT TOTAL(reading_count), TOTAL(humidity_sum), MIN(humidity_min), MAX(humidity_max),
+           TOTAL(ph_sum), MIN(ph_min), MAX(ph_max),
+           TOTAL(temperature_sum), TOTAL(temperature_count), TOTAL(pump_activations)
+    FROM {table} WHERE bucket >= ? AND bucket < ?'''
+
+# Consultas críticas verificadas com EXPLAIN QUERY PLAN (nenhuma pode varrer a tabela inteira)
+QUERY_PLAN_CHECKS = {
+    'recent_alerts': (
+        "SELECT * FROM system_alerts WHERE (timestamp >= datetime('now', ?) "
+        "OR resolved_at IS NULL) AND acknowledged = ? ORDER BY timestamp DESC", ('-24 hours', False)),
+    'open_alert_episodes': (
+        "SELECT id FROM system_alerts WHERE resolved_at IS NULL AND alert_group IS NOT NULL", ()),
+    'sensor_window_stats': (
+        "SELECT COUNT(*), AVG(humidity), MIN(ph_level), SUM(pump_status), AVG(temperature) "
+        "FROM sensor_readings WHERE timestamp >= datetime('now', '-7 days')", ()),
+    'sensor_location_window': (
+        "SELECT * FROM sensor_readings WHERE location = ? AND timestamp >= ? "
+        "ORDER BY timestamp", ('Campo_Principal', '2000-01-01')),
+    'alert_window_stats': (
+        "SELECT COUNT(*), COUNT(CASE WHEN severity = 'CRITICAL' THEN 1 END), "
+        "COUNT(CASE WHEN acknowledged = 1 THEN 1 END) FROM system_alerts "
+        "WHERE timestamp >= datetime('now', ?)", ('-7 days',)),
+    'irrigation_window_stats': (
+        "SELECT COUNT(*), AVG(duration_minutes), SUM(water_amount_liters) "
+        "FROM irrigation_history WHERE start_time >= datetime('now', ?)", ('-7 days',)),
+    'prediction_window_stats': (
+        "SELECT COUNT(*), AVG(confidence_score), AVG(prediction_accuracy) "
+        "FROM ml_predictions WHERE timestamp >= datetime('now', ?)", ('-7 days',)),
+    'health_last_reading': (
+        "SELECT timestamp FROM sensor_readings ORDER BY timestamp DESC LIMIT 1", ()),
+    'health_critical_alerts': (
+        "SELECT COUNT(*) FROM system_alerts WHERE severity = 'CRITICAL' AND acknowledged = FALSE", ()),
+    'health_prediction_accuracy': (
+        "SELECT AVG(prediction_accuracy) FROM ml_predictions "
+        "WHERE timestamp >= datetime('now', '-24 hours') AND prediction_accuracy IS NOT NULL", ()),
+    'weather_window': (
+        "SELECT * FROM weather_data WHERE timestamp >= datetime('now', '-30 days')", ()),
+    'sensor_keyset_page': build_keyset_query('sensor_readings', start='2000-01-01',
+                                             after=('2000-01-02 00:00:00', 1), limit=100),
+    'sensor_location_keyset_page': build_keyset_query('sensor_readings', location='Campo_Principal',
+                                                      after=('2000-01-02 00:00:00', 1), limit=100)
+}
+
+class EnhancedFarmTechDatabase(SensorStorageMixin):
+    """Motor 'sqlite' do protocolo SensorStorage: pool de conexões, rollups, partições e alertas"""
+    
+    def __init__(self, db_path: str = "farmtech_enhanced.db",
+                 db_config: Optional[DatabaseConfig] = None):
         self.db_path = db_path
+        self.db_config = db_config or DatabaseConfig.from_env()
+        self.pool = SQLiteConnectionPool(
+            db_path,
+            max_connections=self.db_config.max_connections,
+            timeout=self.db_config.timeout,
+            statement_cache_size=self.db_config.statement_cache_size
+        )
+        self.pool.add_connect_hook(self._configure_connection)
+        self.storage_status = None
+        self.write_behind: Optional[WriteBehindQueue] = None
+        self._write_behind_lock = threading.Lock()
         self.init_enhanced_database()
+        self.shards: Optional[ShardedSensorStore] = None
+        self._sensor_table_sql = None
+        if self.db_config.partition_period != 'none':
+            self.init_sharded_storage()
+        self.archive = ColumnarArchive(self.db_config.archive_dir) if self.db_config.archive_dir else None
+        self.alert_engine = AlertRuleEngine.from_config(self)
+        self.alert_manager = AlertManager(self.alert_engine)
+        # Preditor opcional (predict_batch): pontua cada lote na ingestão
+        self.predictor = None
+        self.model_version = None
+    
+    def _configure_connection(self, conn: sqlite3.Connection):
+        """Hook do pool: PRAGMAs aplicados a cada conexão nova"""
+        # auto_vacuum só vale em banco novo e precisa vir antes do journal_mode=WAL
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        apply_storage_profile(conn, self.db_config.storage_profile)
+    
+    def init_sharded_storage(self):
+        """Ativa o modo particionado: leituras novas vão para um arquivo por período
+        
+        Leituras que ainda estiverem na tabela principal são movidas para as partições
+        (mesmos IDs; rollups e alertas já as contabilizaram).
+        """
+        shard_dir = self.db_config.shard_dir or os.path.splitext(self.db_path)[0] + '_shards'
+        self.shards = ShardedSensorStore(shard_dir, self.db_config.partition_period)
+        with self._get_connection() as conn:
+            self.shards.init_sequence(conn)
+            self._sensor_table_sql = conn.execute(
+                "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'sensor_readings'"
+            ).fetchone()[0]
+        
+        if 6 in self._applied_migrations:
+            # O backfill da migração só enxerga a tabela principal
+            self._backfill_rollups_from_shards(['sensor_rollup_minute', 'sensor_rollup_15min'])
+        moved = self._move_readings_to_shards()
+        logger.info(f"🗂️ Armazenamento particionado por '{self.db_config.partition_period}' em "
+                    f"{shard_dir}" + (f" ({moved} leituras migradas)" if moved else ""))
+    
+    def _backfill_rollups_from_shards(self, tables: List[str]):
+        with self._get_connection() as conn:
+            for shard in self.shards.list_shards(conn):
+                if shard.min_id is None:
+                    continue
+                with self.shards.attached(conn, [shard]):
+                    for table in tables:
+                        conn.execute(_rollup_merge_sql(table, shard.table),
+                                     (shard.min_id, shard.max_id))
+    
+    def _move_readings_to_shards(self, chunk_size: int = 50000) -> int:
+        moved = 0
+        while True:
+            with self._get_connection() as conn:
+                cursor = conn.execute('SELECT * FROM sensor_readings ORDER BY id LIMIT ?',
+                                      (chunk_size,))
+                columns = [desc[0] for desc in cursor.description]
+                rows = cursor.fetchall()
+                if not rows:
+                    break
+                timestamp_index = columns.index('timestamp')
+                shards, index = self.shards.shards_for_timestamps(
+                    conn, [row[timestamp_index] for row in rows])
+                # Uma partição por vez; o DELETE na principal vai na mesma transação,
+                # então uma migração interrompida recomeça sem duplicar IDs
+                for position, shard in enumerate(
+                        self.shards.each_attached(conn, shards, self._sensor_table_sql)):
+                    shard_rows = [row for row, p in zip(rows, index) if p == position]
+                    conn.executemany(
+                        f"INSERT INTO {shard.table} ({', '.join(columns)}) "
+                        f"VALUES ({', '.join('?' * len(columns))})", shard_rows)
+                    self.shards.record_insert(conn, shard, shard_rows[0][0],
+                                              shard_rows[-1][0], len(shard_rows))
+                    conn.executemany('DELETE FROM sensor_readings WHERE id = ?',
+                                     ((row[0],) for row in shard_rows))
+            moved += len(rows)
+        return moved
+    
+    @staticmethod
+    def _merge_rollups(conn, source: str, first_id: int, last_id: int):
+        """Soma as leituras [first_id, last_id] de source a todas as tabelas de rollup"""
+        for table in ROLLUP_BUCKETS:
+            conn.execute(_rollup_merge_sql(table, source), (first_id, last_id))
+    
+    def _sensor_sources(self, conn, start=None, end=None,
+                        descending: bool = False) -> List[Optional[Shard]]:
+        """Onde ler leituras: None = tabela principal; no modo particionado, as partições do intervalo"""
+        if self.shards is None:
+            return [None]
+        return self.shards.list_shards(conn, start, end, descending)
+    
+    @contextmanager
+    def _sensor_table(self, conn, shard: Optional[Shard]):
+        """Nome da tabela de leituras da fonte, com a partição anexada durante o bloco"""
+        if shard is None:
+            yield 'sensor_readings'
+        else:
+            with self.shards.attached(conn, [shard]):
+                yield shard.table
+    
+    def _get_connection(self) -> PooledConnection:
+        """Obtém conexão do pool; close() ou o bloco with devolvem a conexão"""
+        return self.pool.acquire()
+    
+    def close(self):
+        """Grava leituras pendentes e contadores de alertas e encerra o pool de conexões"""
+        self.stop_write_behind()
+        with self._get_connection() as conn:
+            self.alert_manager.flush(conn.cursor())
+        self.pool.close_all()
+    
+    def start_write_behind(self, flush_rows: int = 500, flush_ms: float = 200,
+                           max_pending: int = 10000) -> WriteBehindQueue:
+        """Ativa a fila write-behind usada por submit_sensor_data"""
+        with self._write_behind_lock:
+            if self.write_behind is None:
+                self.write_behind = WriteBehindQueue(self, flush_rows=flush_rows, flush_ms=flush_ms,
+                                                     max_pending=max_pending)
+                logger.info(f"✍️ Write-behind ativo (flush a cada {flush_rows} leituras ou {flush_ms} ms)")
+            return self.write_behind
+    
+    def stop_write_behind(self):
+        with self._write_behind_lock:
+            write_behind, self.write_behind = self.write_behind, None
+        if write_behind is not None:
+            write_behind.close()
     
     def init_enhanced_database(self):
         """Inicializa banco de dados aprimorado com novas tabelas"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Tabela principal de sensores (aprimorada)
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS sensor_readings (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-                humidity REAL NOT NULL,
-                ph_level REAL NOT NULL,
-                phosphorus BOOLEAN NOT NULL,
-                potassium BOOLEAN NOT NULL,
-                pump_status BOOLEAN NOT NULL,
-                location TEXT DEFAULT 'Campo_Principal',
-                temperature REAL,
-                light_intensity REAL,
-                soil_conductivity REAL,
-                weather_condition TEXT,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # Tabela de predições ML
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS ml_predictions (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-                sensor_reading_id INTEGER,
-                predicted_irrigation BOOLEAN NOT NULL,
-                confidence_score REAL NOT NULL,
-                model_version TEXT,
-                features_used TEXT,
-                actual_irrigation BOOLEAN,
-                prediction_accuracy REAL,
-                FOREIGN KEY (sensor_reading_id) REFERENCES sensor_readings (id)
-            )
-        ''')
-        
-        # Tabela de configurações do sistema
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS system_config (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                parameter_name TEXT UNIQUE NOT NULL,
-                parameter_value TEXT NOT NULL,
-                parameter_type TEXT DEFAULT 'string',
-                description TEXT,
-                updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                updated_by TEXT DEFAULT 'system'
-            )
-        ''')
-        
-        # Tabela de alertas
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS system_alerts (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-                alert_type TEXT NOT NULL,
-                severity TEXT NOT NULL,
-                message TEXT NOT NULL,
-                sensor_reading_id INTEGER,
-                acknowledged BOOLEAN DEFAULT FALSE,
-                acknowledged_at DATETIME,
-                acknowledged_by TEXT,
-                FOREIGN KEY (sensor_reading_id) REFERENCES sensor_readings (id)
-            )
-        ''')
-        
-        # Tabela de histórico de irrigação
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS irrigation_history (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                start_time DATETIME NOT NULL,
-                end_time DATETIME,
-                duration_minutes INTEGER,
-                water_amount_liters REAL,
-                trigger_reason TEXT,
-                efficiency_score REAL,
-                cost_estimate REAL,
-                location TEXT DEFAULT 'Campo_Principal'
-            )
-        ''')
-        
-        # Tabela de dados meteorológicos
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS weather_data (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-                temperature REAL,
-                humidity REAL,
-                pressure REAL,
-                wind_speed REAL,
-                precipitation REAL,
-                weather_condition TEXT,
-                forecast_hours INTEGER DEFAULT 0,
-                data_source TEXT
-            )
-        ''')
+        with self._get_connection() as conn:
+            # Conferir se o perfil de armazenamento foi aplicado de fato
+            self.storage_status = check_storage_profile(conn, self.db_config.storage_profile)
+            if not self.storage_status['ok']:
+                logger.warning(f"⚠️ PRAGMAs fora do perfil '{self.db_config.storage_profile}': "
+                               f"{self.storage_status['mismatches']}")
+            
+            cursor = conn.cursor()
+            
+            # Tabela principal de sensores (aprimorada)
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS sensor_readings (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+                    humidity REAL NOT NULL,
+                    ph_level REAL NOT NULL,
+                    phosphorus BOOLEAN NOT NULL,
+                    potassium BOOLEAN NOT NULL,
+                    pump_status BOOLEAN NOT NULL,
+                    location TEXT DEFAULT 'Campo_Principal',
+                    temperature REAL,
+                    light_intensity REAL,
+                    soil_conductivity REAL,
+                    weather_condition TEXT,
+                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            
+            # Tabela de predições ML
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS ml_predictions (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+                    sensor_reading_id INTEGER,
+                    predicted_irrigation BOOLEAN NOT NULL,
+                    confidence_score REAL NOT NULL,
+                    model_version TEXT,
+                    features_used TEXT,
+                    actual_irrigation BOOLEAN,
+                    prediction_accuracy REAL,
+                    FOREIGN KEY (sensor_reading_id) REFERENCES sensor_readings (id)
+                )
+            ''')
+            
+            # Tabela de configurações do sistema
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS system_config (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    parameter_name TEXT UNIQUE NOT NULL,
+                    parameter_value TEXT NOT NULL,
+                    parameter_type TEXT DEFAULT 'string',
+                    description TEXT,
+                    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                    updated_by TEXT DEFAULT 'system'
+                )
+            ''')
+            
+            # Tabela de alertas
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS system_alerts (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+                    alert_type TEXT NOT NULL,
+                    severity TEXT NOT NULL,
+                    message TEXT NOT NULL,
+                    sensor_reading_id INTEGER,
+                    acknowledged BOOLEAN DEFAULT FALSE,
+                    acknowledged_at DATETIME,
+                    acknowledged_by TEXT,
+                    FOREIGN KEY (sensor_reading_id) REFERENCES sensor_readings (id)
+                )
+            ''')
+            
+            # Tabela de histórico de irrigação
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS irrigation_history (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    start_time DATETIME NOT NULL,
+                    end_time DATETIME,
+                    duration_minutes INTEGER,
+                    water_amount_liters REAL,
+                    trigger_reason TEXT,
+                    efficiency_score REAL,
+                    cost_estimate REAL,
+                    location TEXT DEFAULT 'Campo_Principal'
+                )
+            ''')
+            
+            # Tabela de dados meteorológicos
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS weather_data (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+                    temperature REAL,
+                    humidity REAL,
+                    pressure REAL,
+                    wind_speed REAL,
+                    precipitation REAL,
+                    weather_condition TEXT,
+                    forecast_hours INTEGER DEFAULT 0,
+                    data_source TEXT
+                )
+            ''')
+            
+            # Índices para performance
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_sensor_timestamp ON sensor_readings(timestamp)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_alerts_timestamp ON system_alerts(timestamp)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_irrigation_start ON irrigation_history(start_time)')
+            
+            # Inserir configurações padrão
+            self.insert_default_config(cursor)
+            conn.commit()
+            
+            # Migrações versionadas (índices compostos/de cobertura)
+            self._applied_migrations = []
+            for version, description in apply_migrations(conn, SCHEMA_MIGRATIONS):
+                self._applied_migrations.append(version)
+                logger.info(f"🔧 Migração {version} aplicada: {description}")
+            
+            offenders = find_full_scans(conn, QUERY_PLAN_CHECKS)
+            if offenders:
+                logger.warning(f"⚠️ Consultas sem índice adequado: {', '.join(offenders)}")
         
-        # Índices para performance
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_sensor_timestamp ON sensor_readings(timestamp)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_alerts_timestamp ON system_alerts(timestamp)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_irrigation_start ON irrigation_history(start_time)')
+        logger.info("✅ Banco de dados aprimorado inicializado com sucesso!")
+    
+    def check_query_plans(self) -> Dict[str, str]:
+        """Verifica com EXPLAIN QUERY PLAN que nenhuma consulta crítica faz varredura completa"""
+        with self._get_connection() as conn:
+            offenders = find_full_scans(conn, QUERY_PLAN_CHECKS)
         
-        # Inserir configurações padrão
-        self.insert_default_config(cursor)
+        if offenders:
+            details = '; '.join(f"{name}: {' | '.join(plan)}" for name, plan in offenders.items())
+            raise RuntimeError(f"Consultas com varredura completa de tabela: {details}")
         
-        conn.commit()
-        conn.close()
-        logger.info("✅ Banco de dados aprimorado inicializado com sucesso!")
+        return {name: 'OK' for name in QUERY_PLAN_CHECKS}
     
     def insert_default_config(self, cursor):
         """Insere configurações padrão do sistema"""
@@ -134,6 +541,12 @@ class EnhancedFarmTechDatabase:
             ('humidity_max_threshold', '70.0', 'float', 'Limite máximo de umidade'),
             ('ph_min_threshold', '6.0', 'float', 'pH mínimo ideal'),
             ('ph_max_threshold', '7.5', 'float', 'pH máximo ideal'),
+            ('humidity_critical', '20.0', 'float', 'Umidade abaixo da qual o alerta é crítico'),
+            ('humidity_warning', '25.0', 'float', 'Umidade abaixo da qual há alerta de atenção'),
+            ('ph_critical_low', '5.0', 'float', 'pH abaixo do qual o alerta é crítico'),
+            ('ph_critical_high', '8.5', 'float', 'pH acima do qual o alerta é crítico'),
+            ('humidity_hysteresis', '0.0', 'float', 'Histerese (%) para encerrar alertas de umidade'),
+            ('ph_hysteresis', '0.0', 'float', 'Histerese para encerrar alertas de pH'),
             ('irrigation_duration_default', '15', 'int', 'Duração padrão de irrigação em minutos'),
             ('alert_email_enabled', 'true', 'bool', 'Envio de alertas por email'),
             ('ml_prediction_enabled', 'true', 'bool', 'Usar predições de ML'),
@@ -154,187 +567,613 @@ class EnhancedFarmTechDatabase:
                                   soil_conductivity: float = None, weather_condition: str = None,
                                   location: str = 'Campo_Principal') -> int:
         """Insere dados dos sensores com informações aprimoradas"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        if self.shards is not None:
+            return self.insert_sensor_batch([(humidity, ph_level, phosphorus, potassium, pump_status,
+                                              temperature, light_intensity, soil_conductivity,
+                                              weather_condition, location, None)]).start
         
-        cursor.execute('''
-            INSERT INTO sensor_readings 
-            (humidity, ph_level, phosphorus, potassium, pump_status, 
-             temperature, light_intensity, soil_conductivity, weather_condition, location)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (humidity, ph_level, phosphorus, potassium, pump_status,
-              temperature, light_intensity, soil_conductivity, weather_condition, location))
+        try:
+            with self._get_connection() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute('''
+                    INSERT INTO sensor_readings 
+                    (humidity, ph_level, phosphorus, potassium, pump_status, 
+                     temperature, light_intensity, soil_conductivity, weather_condition, location)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', (humidity, ph_level, phosphorus, potassium, pump_status,
+                      temperature, light_intensity, soil_conductivity, weather_condition, location))
+                
+                record_id = cursor.lastrowid
+                self._merge_rollups(conn, 'sensor_readings', record_id, record_id)
+                
+                # Verificar se precisa gerar alertas (mesma conexão e transação)
+                self._create_alerts(cursor, record_id, humidity, ph_level, phosphorus, potassium,
+                                    location)
+        except Exception:
+            self.alert_manager.invalidate()
+            raise
         
-        record_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
+        return record_id
+    
+    def submit_sensor_data(self, humidity: float, ph_level: float,
+                           phosphorus: bool, potassium: bool, pump_status: bool,
+                           temperature: float = None, light_intensity: float = None,
+                           soil_conductivity: float = None, weather_condition: str = None,
+                           location: str = 'Campo_Principal', timestamp=None) -> Future:
+        """Versão assíncrona de insert_enhanced_sensor_data via fila write-behind
         
-        # Verificar se precisa gerar alertas
-        self.check_and_create_alerts(record_id, humidity, ph_level, phosphorus, potassium)
+        Retorna um Future com o ID do registro; future.result() espera o flush.
+        """
+        write_behind = self.write_behind or self.start_write_behind()
+        return write_behind.submit((humidity, ph_level, phosphorus, potassium, pump_status,
+                                         temperature, light_intensity, soil_conductivity,
+                                         weather_condition, location, timestamp))
+    
+    def insert_sensor_batch(self, rows: Iterable) -> range:
+        """Insere lote de leituras com um único executemany/transação e retorna a faixa de IDs"""
+        data = rows_to_columns(rows, SENSOR_BATCH_COLUMNS, {'ph': 'ph_level'})
+        size = len(data['humidity'])
+        if size == 0:
+            return range(0)
         
-        return record_id
+        converted = {col: [BATCH_CONVERTERS[col](value) for value in data[col]]
+                     for col in SENSOR_BATCH_COLUMNS}
+        converted['location'] = [value or 'Campo_Principal' for value in converted['location']]
+        
+        if self.shards is not None:
+            first_id, last_id, transitions = self._insert_sharded_batch(converted, size)
+            logger.info(f"📦 Lote de {size} leituras inserido nas partições (IDs {first_id}-{last_id}), "
+                        f"alertas: {transitions['opened']} aberto(s), {transitions['escalated']} "
+                        f"escalado(s), {transitions['resolved']} resolvido(s)")
+            self._score_ingested(range(first_id, last_id + 1), converted)
+            return range(first_id, last_id + 1)
+        
+        try:
+            with self._get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.executemany('''
+                    INSERT INTO sensor_readings 
+                    (humidity, ph_level, phosphorus, potassium, pump_status, 
+                     temperature, light_intensity, soil_conductivity, weather_condition,
+                     location, timestamp)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP))
+                ''', zip(*(converted[col] for col in SENSOR_BATCH_COLUMNS)))
+                
+                # A transação mantém o lock de escrita, então os IDs são contíguos
+                last_id = cursor.execute('SELECT last_insert_rowid()').fetchone()[0]
+                first_id = last_id - size + 1
+                self._merge_rollups(conn, 'sensor_readings', first_id, last_id)
+                
+                # Só transições de episódio viram escrita em system_alerts
+                transitions = self.alert_manager.process(cursor, converted,
+                                                         range(first_id, last_id + 1),
+                                                         converted['timestamp'])
+        except Exception:
+            self.alert_manager.invalidate()
+            raise
+        
+        logger.info(f"📦 Lote de {size} leituras inserido (IDs {first_id}-{last_id}), "
+                    f"alertas: {transitions['opened']} aberto(s), {transitions['escalated']} "
+                    f"escalado(s), {transitions['resolved']} resolvido(s)")
+        self._score_ingested(range(first_id, last_id + 1), converted)
+        return range(first_id, last_id + 1)
+    
+    def _insert_sharded_batch(self, converted: Dict[str, list], size: int):
+        """Grava o lote nas partições dos seus timestamps, com rollups e alertas na mesma conexão
+        
+        Cada partição é anexada e confirmada separadamente (lotes que cobrem mais
+        partições que o limite do ATTACH); os IDs são reservados antes, então uma
+        falha no meio deixa só uma lacuna na sequência.
+        """
+        now = datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')
+        converted['timestamp'] = [value or now for value in converted['timestamp']]
+        columns = ['id'] + SENSOR_BATCH_COLUMNS
+        
+        try:
+            with self._get_connection() as conn:
+                shards, index = self.shards.shards_for_timestamps(conn, converted['timestamp'])
+                first_id = self.shards.allocate_ids(conn, size)
+                conn.commit()
+                rows = list(zip(range(first_id, first_id + size),
+                                *(converted[col] for col in SENSOR_BATCH_COLUMNS)))
+                for position, shard in enumerate(
+                        self.shards.each_attached(conn, shards, self._sensor_table_sql)):
+                    shard_rows = rows if len(shards) == 1 else \
+                        [row for row, p in zip(rows, index) if p == position]
+                    conn.executemany(
+                        f"INSERT INTO {shard.table} ({', '.join(columns)}) "
+                        f"VALUES ({', '.join('?' * len(columns))})", shard_rows)
+                    low, high = shard_rows[0][0], shard_rows[-1][0]
+                    self.shards.record_insert(conn, shard, low, high, len(shard_rows))
+                    self._merge_rollups(conn, shard.table, low, high)
+                
+                transitions = self.alert_manager.process(conn.cursor(), converted,
+                                                         range(first_id, first_id + size),
+                                                         converted['timestamp'])
+        except Exception:
+            self.alert_manager.invalidate()
+            raise
+        
+        return first_id, first_id + size - 1, transitions
     
     def insert_ml_prediction(self, sensor_reading_id: int, predicted_irrigation: bool,
                            confidence_score: float, model_version: str,
                            features_used: List[str]) -> int:
         """Insere predição de ML"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        features_json = json.dumps(features_used)
         
+        with self._get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                INSERT INTO ml_predictions 
+                (sensor_reading_id, predicted_irrigation, confidence_score, 
+                 model_version, features_used)
+                VALUES (?, ?, ?, ?, ?)
+            ''', (sensor_reading_id, predicted_irrigation, confidence_score,
+                  model_version, features_json))
+            
+            prediction_id = cursor.lastrowid
+        
+        return prediction_id
+    
+    def insert_ml_predictions_batch(self, sensor_reading_ids, predictions: Dict[str, np.ndarray],
+                                    model_version: str, features_used: List[str]) -> int:
+        """Insere as predições de predict_batch com um único executemany"""
+        if len(sensor_reading_ids) == 0:
+            return 0
         features_json = json.dumps(features_used)
+        rows = zip((int(value) for value in sensor_reading_ids),
+                   predictions['irrigation_needed'].tolist(),
+                   predictions['confidence'].tolist())
         
-        cursor.execute('''
-            INSERT INTO ml_predictions 
-            (sensor_reading_id, predicted_irrigation, confidence_score, 
-             model_version, features_used)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (sensor_reading_id, predicted_irrigation, confidence_score,
-              model_version, features_json))
+        with self._get_connection() as conn:
+            conn.executemany('''
+                INSERT INTO ml_predictions 
+                (sensor_reading_id, predicted_irrigation, confidence_score, 
+                 model_version, features_used)
+                VALUES (?, ?, ?, ?, ?)
+            ''', ((reading_id, needed, confidence, model_version, features_json)
+                  for reading_id, needed, confidence in rows))
         
-        prediction_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
+        return len(sensor_reading_ids)
+    
+    def set_predictor(self, predictor, model_version: str = None):
+        """Ativa a pontuação na ingestão: cada lote inserido vira linhas em ml_predictions"""
+        self.predictor = predictor
+        self.model_version = model_version or (
+            (predictor.model_version or type(predictor.model).__name__) if predictor else None)
+    
+    def _score_ingested(self, ids: range, converted: Dict[str, list]):
+        # Pontuação é acessória: falha no modelo não derruba a ingestão
+        if self.predictor is None:
+            return
+        try:
+            readings = pd.DataFrame({name: converted[name] for name in
+                                     ('humidity', 'ph_level', 'phosphorus', 'potassium',
+                                      'temperature', 'timestamp')})
+            readings['timestamp'] = readings['timestamp'].fillna(
+                datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S'))
+            predictions = self.predictor.predict_batch(readings)
+            self.insert_ml_predictions_batch(ids, predictions, self.model_version,
+                                             self.predictor.feature_names)
+        except Exception as e:
+            logger.warning(f"⚠️ Falha ao pontuar lote na ingestão: {e}")
+    
+    def backfill_ml_predictions(self, predictor, start=None, end=None, location: str = None,
+                                model_version: str = None, chunk_size: int = 50000) -> int:
+        """Pontua leituras do período ainda sem predição desta versão do modelo
         
-        return prediction_id
+        Lê as colunas pelo protocolo SensorStorage e pontua em blocos com
+        predict_batch (um predict_proba por bloco); retorna quantas foram inseridas.
+        """
+        model_version = model_version or predictor.model_version or type(predictor.model).__name__
+        columns = self.get_sensor_columns(start, end, location, fmt='numpy')
+        if len(columns['id']) == 0:
+            return 0
+        
+        with self._get_connection() as conn:
+            scored = np.array([row[0] for row in conn.execute(
+                'SELECT sensor_reading_id FROM ml_predictions WHERE model_version = ?',
+                (model_version,))], dtype=np.int64)
+        pending = ~np.isin(columns['id'].astype(np.int64), scored)
+        readings = pd.DataFrame({name: columns[name][pending] for name in
+                                 ('id', 'humidity', 'ph_level', 'phosphorus', 'potassium',
+                                  'temperature', 'timestamp')})
+        
+        inserted = 0
+        for offset in range(0, len(readings), chunk_size):
+            chunk = readings.iloc[offset:offset + chunk_size]
+            predictions = predictor.predict_batch(chunk)
+            inserted += self.insert_ml_predictions_batch(chunk['id'].to_numpy(), predictions,
+                                                         model_version, predictor.feature_names)
+        
+        logger.info(f"🤖 Backfill de predições: {inserted} leitura(s) pontuada(s) "
+                    f"(modelo {model_version})")
+        return inserted
     
     def check_and_create_alerts(self, sensor_reading_id: int, humidity: float,
                               ph_level: float, phosphorus: bool, potassium: bool):
         """Verifica condições e cria alertas automaticamente"""
-        alerts = []
+        try:
+            with self._get_connection() as conn:
+                return self._create_alerts(conn.cursor(), sensor_reading_id, humidity,
+                                           ph_level, phosphorus, potassium)
+        except Exception:
+            self.alert_manager.invalidate()
+            raise
+    
+    def _create_alerts(self, cursor, sensor_reading_id: int, humidity: float,
+                       ph_level: float, phosphorus: bool, potassium: bool,
+                       location: str = None) -> int:
+        """Avalia as regras de alerta e grava as transições de episódio com o cursor informado"""
+        transitions = self.alert_manager.process(cursor, {
+            'humidity': [humidity], 'ph_level': [ph_level],
+            'phosphorus': [phosphorus], 'potassium': [potassium], 'location': [location]
+        }, [sensor_reading_id])
         
-        # Verificar umidade crítica
-        if humidity < 20:
-            alerts.append(('CRITICAL', 'HUMIDITY', f'Umidade crítica: {humidity:.1f}%'))
-        elif humidity < 30:
-            alerts.append(('WARNING', 'HUMIDITY', f'Umidade baixa: {humidity:.1f}%'))
+        created = transitions['opened'] + transitions['escalated']
+        if created:
+            logger.info(f"🚨 {created} alerta(s) criado(s) para leitura {sensor_reading_id}")
         
-        # Verificar pH
-        if ph_level < 5.5 or ph_level > 8.0:
-            alerts.append(('WARNING', 'PH', f'pH fora da faixa ideal: {ph_level:.2f}'))
+        return created
+    
+    def reload_alert_rules(self) -> AlertRuleEngine:
+        """Recompila as regras após mudanças em system_config"""
+        self.alert_engine = AlertRuleEngine.from_config(self)
+        self.alert_manager.engine = self.alert_engine
+        return self.alert_engine
+    
+    def reevaluate_alerts(self, start=None, end=None, location: str = None,
+                          chunk_size: int = 50000) -> Dict:
+        """Reavalia as regras atuais sobre o histórico e reconstrói os episódios de alerta
         
-        # Verificar nutrientes
-        if not phosphorus:
-            alerts.append(('INFO', 'NUTRIENT', 'Fósforo insuficiente detectado'))
+        Percorre as leituras em ordem cronológica por keyset, em lotes de chunk_size;
+        cada lote apaga os alertas não reconhecidos abertos em suas leituras e grava
+        as transições recalculadas numa única transação.
+        """
+        engine = self.alert_engine.with_rules(self.alert_engine.rules)  # histerese do zero
+        manager = AlertManager(engine, touch_interval=0, load_existing=False)
+        report = {'readings': 0, 'alerts_removed': 0, 'opened': 0, 'escalated': 0, 'resolved': 0}
+        with self._get_connection() as conn:
+            sources = self._sensor_sources(conn, start, end)
+        try:
+            for shard in sources:
+                after = None
+                while True:
+                    with self._get_connection() as conn, self._sensor_table(conn, shard) as table:
+                        sql, params = build_keyset_query(table, start, end, location, after,
+                                                         descending=False, limit=chunk_size)
+                        columns = fetch_columns(conn, sql, params, 'sensor_readings', 'numpy')
+                        size = len(columns['id'])
+                        if not size:
+                            break
+                        
+                        cursor = conn.cursor()
+                        cursor.executemany('''
+                            DELETE FROM system_alerts WHERE sensor_reading_id = ? AND acknowledged = FALSE
+                        ''', ((int(record_id),) for record_id in columns['id']))
+                        report['alerts_removed'] += cursor.rowcount
+                        transitions = manager.process(cursor, columns, columns['id'],
+                                                      columns['timestamp'].tolist())
+                    
+                    report['readings'] += size
+                    for key in ('opened', 'escalated', 'resolved'):
+                        report[key] += transitions[key]
+                    if size < chunk_size:
+                        break
+                    after = (columns['timestamp'][-1], int(columns['id'][-1]))
+        finally:
+            # Os episódios abertos mudaram no banco: recarregar no próximo lote
+            self.alert_manager.invalidate()
         
-        if not potassium:
-            alerts.append(('INFO', 'NUTRIENT', 'Potássio insuficiente detectado'))
+        logger.info(f"🔁 Alertas reavaliados: {report['readings']} leituras, "
+                    f"{report['alerts_removed']} removido(s), {report['opened']} episódio(s) aberto(s)")
+        return report
+    
+    def get_sensor_by_id(self, record_id: int) -> Optional[Dict]:
+        """Busca uma leitura pela chave primária"""
+        with self._get_connection() as conn:
+            sources = [None] if self.shards is None else self.shards.shards_for_id(conn, record_id)
+            for shard in sources:
+                with self._sensor_table(conn, shard) as table:
+                    cursor = conn.cursor()
+                    cursor.row_factory = sqlite3.Row
+                    row = cursor.execute(f'SELECT * FROM {table} WHERE id = ?',
+                                         (record_id,)).fetchone()
+                if row:
+                    return dict(row)
         
-        # Inserir alertas
-        if alerts:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            for severity, alert_type, message in alerts:
-                cursor.execute('''
-                    INSERT INTO system_alerts 
-                    (alert_type, severity, message, sensor_reading_id)
-                    VALUES (?, ?, ?, ?)
-                ''', (alert_type, severity, message, sensor_reading_id))
-            
-            conn.commit()
-            conn.close()
-            
-            logger.info(f"🚨 {len(alerts)} alerta(s) criado(s) para leitura {sensor_reading_id}")
+        return None
     
-    def get_recent_alerts(self, hours: int = 24, acknowledged: bool = False) -> List[Dict]:
-        """Retorna alertas recentes"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
+    def query_sensor_page(self, start=None, end=None, location: str = None,
+                          after: tuple = None, limit: int = 100,
+                          descending: bool = True) -> Tuple[List[Dict], Optional[tuple]]:
+        """Retorna uma página de leituras e o cursor (timestamp, id) da próxima
         
-        cursor.execute('''
-            SELECT * FROM system_alerts 
-            WHERE timestamp >= datetime('now', '-{} hours')
-            AND acknowledged = ?
-            ORDER BY timestamp DESC
-        '''.format(hours), (acknowledged,))
+        start/end delimitam [start, end) em UTC, como o CURRENT_TIMESTAMP do SQLite.
+        O cursor é None quando não há mais páginas.
+        """
+        rows = []
+        with self._get_connection() as conn:
+            # Modo particionado: as partições em ordem de tempo continuam o mesmo keyset
+            for shard in self._sensor_sources(conn, start, end, descending):
+                with self._sensor_table(conn, shard) as table:
+                    sql, params = build_keyset_query(table, start, end, location,
+                                                     after, descending, limit - len(rows))
+                    cursor = conn.cursor()
+                    cursor.row_factory = sqlite3.Row
+                    rows.extend(dict(row) for row in cursor.execute(sql, params))
+                if len(rows) >= limit:
+                    break
         
-        alerts = [dict(row) for row in cursor.fetchall()]
-        conn.close()
+        next_cursor = None
+        if rows and len(rows) == limit:
+            next_cursor = (rows[-1]['timestamp'], rows[-1]['id'])
+        return rows, next_cursor
+    
+    def get_sensor_columns(self, start=None, end=None, location: str = None,
+                           descending: bool = False, limit: int = None, fmt: str = 'list'):
+        """Retorna as leituras do período por coluna, lidas direto do cursor
+        
+        fmt: 'list' (listas), 'numpy' ({coluna: ndarray}) ou 'arrow' (pyarrow.Table).
+        """
+        if self.shards is None:
+            sql, params = build_keyset_query('sensor_readings', start, end, location,
+                                             descending=descending, limit=limit)
+            with self._get_connection() as conn:
+                return fetch_columns(conn, sql, params, 'sensor_readings', fmt)
+        
+        parts = []
+        remaining = limit
+        with self._get_connection() as conn:
+            for shard in self._sensor_sources(conn, start, end, descending):
+                with self._sensor_table(conn, shard) as table:
+                    sql, params = build_keyset_query(table, start, end, location,
+                                                     descending=descending, limit=remaining)
+                    # Tipos declarados vêm da tabela principal (mesmo schema)
+                    part = fetch_columns(conn, sql, params, 'sensor_readings', fmt)
+                parts.append(part)
+                if remaining is not None:
+                    remaining -= part.num_rows if fmt == 'arrow' else len(part['id'])
+                    if remaining <= 0:
+                        break
+            if not parts:
+                sql, params = build_keyset_query('sensor_readings', limit=0)
+                return fetch_columns(conn, sql, params, 'sensor_readings', fmt)
+        
+        if fmt == 'arrow':
+            import pyarrow as pa
+            return pa.concat_tables(parts)
+        if fmt == 'numpy':
+            return {name: np.concatenate([part[name] for part in parts]) for name in parts[0]}
+        return {name: [value for part in parts for value in part[name]] for name in parts[0]}
+    
+    def get_sensor_series(self, metric: str = 'humidity', start=None, end=None,
+                          pixels: int = 1000, location: str = None) -> Dict:
+        """Série de um sensor para gráfico, com no máximo ~pixels pontos
+        
+        O tier (leituras cruas, 1 min, 15 min, 1 h ou 1 dia) sai do intervalo e do
+        orçamento de pixels; acima do orçamento a série é reduzida por LTTB mantendo
+        o envelope min/max. Retorna {'tier', 'timestamp', 'avg', 'min', 'max', 'count'}.
+        """
+        if metric not in SERIES_METRICS:
+            raise ValueError(f"Métrica inválida: {metric} (use {', '.join(SERIES_METRICS)})")
+        now = datetime.utcnow()
+        end = pd.Timestamp(end).to_pydatetime() if end is not None else now
+        start = pd.Timestamp(start).to_pydatetime() if start is not None else end - timedelta(days=1)
+        
+        # Tiers finos cuja retenção não cobre o início do intervalo ficam de fora
+        expired = [table for table, days in ROLLUP_RETENTION_DAYS.items()
+                   if start < now - timedelta(days=days)]
+        tier = choose_tier(start, end, pixels, skip=expired)
+        
+        if tier.table == 'sensor_readings':
+            columns = self.get_sensor_columns(start, end, location, fmt='numpy')
+            series = series_from_raw(columns, metric)
+        else:
+            sql, params = rollup_series_sql(tier, metric, start, end, location)
+            with self._get_connection() as conn:
+                series = series_from_rows(conn.execute(sql, params).fetchall())
+        
+        series = downsample_series(series, pixels)
+        series['tier'] = tier.name
+        return series
+    
+    def get_forecast_temperatures(self, hours_ahead: int = 24, start: datetime = None) -> Optional[np.ndarray]:
+        """Temperatura hora a hora das previsões em cache (weather_data, data_source='forecast')
+        
+        Cada hora h = 1..hours_ahead após start recebe a interpolação linear dos
+        pontos de 3 em 3 h da previsão mais recente; horas fora da cobertura do
+        cache ficam NaN. Retorna None quando não há previsão para o período.
+        """
+        start = (start or datetime.now()).replace(minute=0, second=0, microsecond=0)
+        end = start + timedelta(hours=hours_ahead)
+        
+        with self._get_connection() as conn:
+            # Buscas repetidas gravam o mesmo horário várias vezes: vale a última (maior id)
+            rows = conn.execute('''
+                SELECT timestamp, temperature FROM weather_data
+                WHERE id IN (
+                    SELECT MAX(id) FROM weather_data
+                    WHERE data_source = 'forecast' AND temperature IS NOT NULL
+                      AND timestamp >= ? AND timestamp <= ?
+                    GROUP BY timestamp
+                )
+                ORDER BY timestamp
+            ''', ((start - timedelta(hours=3)).strftime('%Y-%m-%d %H:%M:%S'),
+                  (end + timedelta(hours=3)).strftime('%Y-%m-%d %H:%M:%S'))).fetchall()
+        if not rows:
+            return None
+        
+        known = np.array([str(ts)[:19] for ts, _ in rows], dtype='datetime64[s]').astype(np.int64)
+        values = np.array([temperature for _, temperature in rows], dtype=np.float64)
+        hours = (np.datetime64(start, 's') + np.arange(1, hours_ahead + 1).astype('timedelta64[h]'))
+        hours = hours.astype('datetime64[s]').astype(np.int64)
+        return np.interp(hours, known, values, left=np.nan, right=np.nan)
+    
+    def get_recent_alerts(self, hours: int = 24, acknowledged: bool = False) -> List[Dict]:
+        """Retorna alertas recentes"""
+        with self._get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.row_factory = sqlite3.Row
+            
+            cursor.execute('''
+                SELECT * FROM system_alerts 
+                WHERE (timestamp >= datetime('now', ?) OR resolved_at IS NULL)
+                AND acknowledged = ?
+                ORDER BY timestamp DESC
+            ''', (f'-{int(hours)} hours', acknowledged))
+            
+            alerts = [dict(row) for row in cursor.fetchall()]
         
         return alerts
     
     def acknowledge_alert(self, alert_id: int, acknowledged_by: str = 'user') -> bool:
         """Marca alerta como reconhecido"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        with self._get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                UPDATE system_alerts 
+                SET acknowledged = TRUE, 
+                    acknowledged_at = CURRENT_TIMESTAMP,
+                    acknowledged_by = ?
+                WHERE id = ?
+            ''', (acknowledged_by, alert_id))
+            
+            rows_affected = cursor.rowcount
+        
+        return rows_affected > 0
+    
+    def _rollup_segments(self, cursor, days: int) -> List[Tuple[str, str, str]]:
+        """Divide a janela em trechos: bordas parciais lidas cruas, o meio pelos rollups"""
+        fmt = '%Y-%m-%d %H:%M:%S'
+        now = datetime.strptime(cursor.execute("SELECT datetime('now')").fetchone()[0], fmt)
+        start = now - timedelta(days=days)
+        current_hour = now.replace(minute=0, second=0)
+        head_hour = start.replace(minute=0, second=0)
+        if head_hour < start:
+            head_hour += timedelta(hours=1)
         
-        cursor.execute('''
-            UPDATE system_alerts 
-            SET acknowledged = TRUE, 
-                acknowledged_at = CURRENT_TIMESTAMP,
-                acknowledged_by = ?
-            WHERE id = ?
-        ''', (acknowledged_by, alert_id))
+        end_of_time = '9999-12-31 23:59:59'
+        if head_hour > current_hour:
+            # Janela inteira dentro da hora corrente
+            return [('sensor_readings', start.strftime(fmt), end_of_time)]
         
-        rows_affected = cursor.rowcount
-        conn.commit()
-        conn.close()
+        segments = [('sensor_readings', start.strftime(fmt), head_hour.strftime(fmt))]
         
-        return rows_affected > 0
+        head_day = head_hour.replace(hour=0)
+        if head_day < head_hour:
+            head_day += timedelta(days=1)
+        tail_day = current_hour.replace(hour=0)
+        
+        if head_day < tail_day:
+            segments.append(('sensor_rollup_hourly', head_hour.strftime(fmt), head_day.strftime(fmt)))
+            segments.append(('sensor_rollup_daily', head_day.strftime(fmt), tail_day.strftime(fmt)))
+            segments.append(('sensor_rollup_hourly', tail_day.strftime(fmt), current_hour.strftime(fmt)))
+        else:
+            segments.append(('sensor_rollup_hourly', head_hour.strftime(fmt), current_hour.strftime(fmt)))
+        
+        segments.append(('sensor_readings', current_hour.strftime(fmt), end_of_time))
+        return segments
     
-    def get_enhanced_statistics(self, days: int = 7) -> Dict:
-        """Retorna estatísticas aprimoradas do sistema"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+    def _sensor_window_stats(self, cursor, days: int, location: str = None):
+        """Estatísticas dos sensores a partir dos rollups + horas parciais cruas"""
+        parts = []
+        params = []
+        shards = {}
         
-        # Estatísticas básicas dos sensores
-        cursor.execute('''
-            SELECT 
-                COUNT(*) as total_readings,
-                AVG(humidity) as avg_humidity,
-                MIN(humidity) as min_humidity,
-                MAX(humidity) as max_humidity,
-                AVG(ph_level) as avg_ph,
-                MIN(ph_level) as min_ph,
-                MAX(ph_level) as max_ph,
-                SUM(CASE WHEN pump_status = 1 THEN 1 ELSE 0 END) as pump_activations,
-                AVG(temperature) as avg_temperature
-            FROM sensor_readings
-            WHERE timestamp >= datetime('now', '-{} days')
-        '''.format(days))
-        
-        basic_stats = cursor.fetchone()
-        
-        # Estatísticas de alertas
-        cursor.execute('''
-            SELECT 
-                COUNT(*) as total_alerts,
-                COUNT(CASE WHEN severity = 'CRITICAL' THEN 1 END) as critical_alerts,
-                COUNT(CASE WHEN severity = 'WARNING' THEN 1 END) as warning_alerts,
-                COUNT(CASE WHEN acknowledged = 1 THEN 1 END) as acknowledged_alerts
-            FROM system_alerts
-            WHERE timestamp >= datetime('now', '-{} days')
-        '''.format(days))
-        
-        alert_stats = cursor.fetchone()
-        
-        # Estatísticas de irrigação
-        cursor.execute('''
-            SELECT 
-                COUNT(*) as irrigation_sessions,
-                AVG(duration_minutes) as avg_duration,
-                SUM(water_amount_liters) as total_water_used,
-                AVG(efficiency_score) as avg_efficiency
-            FROM irrigation_history
-            WHERE start_time >= datetime('now', '-{} days')
-        '''.format(days))
-        
-        irrigation_stats = cursor.fetchone()
-        
-        # Estatísticas de ML
-        cursor.execute('''
-            SELECT 
-                COUNT(*) as total_predictions,
-                AVG(confidence_score) as avg_confidence,
-                AVG(prediction_accuracy) as avg_accuracy
-            FROM ml_predictions
-            WHERE timestamp >= datetime('now', '-{} days')
-        '''.format(days))
+        for table, start, end in self._rollup_segments(cursor, days):
+            if table == 'sensor_readings':
+                # Horas parciais: lidas cruas da tabela principal ou das partições do trecho
+                sources = self._sensor_sources(cursor, start, end)
+                shards.update((shard.key, shard) for shard in sources if shard is not None)
+                tables = [shard.table if shard else 'sensor_readings' for shard in sources]
+                sqls = [_RAW_PARTIAL_SQL.format(table=name) for name in tables]
+            else:
+                sqls = [_ROLLUP_PARTIAL_SQL.format(table=table)]
+            for sql in sqls:
+                params.extend([start, end])
+                if location is not None:
+                    sql += ' AND location = ?'
+                    params.append(location)
+                parts.append(sql)
         
-        ml_stats = cursor.fetchone()
+        if shards:
+            with self.shards.attached(cursor.connection, list(shards.values())):
+                return self._combine_partials(cursor, parts, params)
+        return self._combine_partials(cursor, parts, params)
+    
+    def _combine_partials(self, cursor, parts: List[str], params: list):
+        cursor.execute(f'''
+            SELECT 
+                CAST(TOTAL(c0) AS INTEGER) as total_readings,
+                TOTAL(c1) / TOTAL(c0) as avg_humidity,
+                MIN(c2) as min_humidity,
+                MAX(c3) as max_humidity,
+                TOTAL(c4) / TOTAL(c0) as avg_ph,
+                MIN(c5) as min_ph,
+                MAX(c6) as max_ph,
+                CAST(TOTAL(c9) AS INTEGER) as pump_activations,
+                TOTAL(c7) / TOTAL(c8) as avg_temperature
+            FROM (
+                SELECT NULL c0, NULL c1, NULL c2, NULL c3, NULL c4,
+                       NULL c5, NULL c6, NULL c7, NULL c8, NULL c9 WHERE 0
+                UNION ALL {' UNION ALL '.join(parts)}
+            )
+        ''', params)
         
-        conn.close()
+        return cursor.fetchone()
+    
+    def get_enhanced_statistics(self, days: int = 7, location: str = None) -> Dict:
+        """Retorna estatísticas aprimoradas do sistema"""
+        with self._get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.row_factory = sqlite3.Row
+            
+            # Estatísticas básicas dos sensores (rollups horários/diários)
+            basic_stats = self._sensor_window_stats(cursor, days, location)
+            
+            # Janela sempre como parâmetro: mesmo texto SQL, plano reaproveitado do cache
+            window = f'-{int(days)} days'
+            
+            # Estatísticas de alertas
+            cursor.execute('''
+                SELECT 
+                    COUNT(*) as total_alerts,
+                    COUNT(CASE WHEN severity = 'CRITICAL' THEN 1 END) as critical_alerts,
+                    COUNT(CASE WHEN severity = 'WARNING' THEN 1 END) as warning_alerts,
+                    COUNT(CASE WHEN acknowledged = 1 THEN 1 END) as acknowledged_alerts
+                FROM system_alerts
+                WHERE timestamp >= datetime('now', ?)
+            ''', (window,))
+            
+            alert_stats = cursor.fetchone()
+            
+            # Estatísticas de irrigação
+            cursor.execute('''
+                SELECT 
+                    COUNT(*) as irrigation_sessions,
+                    AVG(duration_minutes) as avg_duration,
+                    SUM(water_amount_liters) as total_water_used,
+                    AVG(efficiency_score) as avg_efficiency
+                FROM irrigation_history
+                WHERE start_time >= datetime('now', ?)
+            ''', (window,))
+            
+            irrigation_stats = cursor.fetchone()
+            
+            # Estatísticas de ML
+            cursor.execute('''
+                SELECT 
+                    COUNT(*) as total_predictions,
+                    AVG(confidence_score) as avg_confidence,
+                    AVG(prediction_accuracy) as avg_accuracy
+                FROM ml_predictions
+                WHERE timestamp >= datetime('now', ?)
+            ''', (window,))
+            
+            ml_stats = cursor.fetchone()
         
         return {
             'period_days': days,
@@ -345,86 +1184,327 @@ class EnhancedFarmTechDatabase:
             'generated_at': datetime.now().isoformat()
         }
     
-    def cleanup_old_data(self, retention_days: int = 90):
-        """Remove dados antigos baseado na política de retenção"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        tables_to_clean = [
-            'sensor_readings',
-            'ml_predictions',
-            'system_alerts',
-            'weather_data'
-        ]
+    def get_config_value(self, parameter_name: str, default=None):
+        """Lê um parâmetro de system_config convertido pelo parameter_type"""
+        with self._get_connection() as conn:
+            row = conn.execute('''
+                SELECT parameter_value, parameter_type FROM system_config
+                WHERE parameter_name = ?
+            ''', (parameter_name,)).fetchone()
         
-        total_deleted = 0
+        if row is None:
+            return default
+        return self._parse_config_value(parameter_name, *row, default=default)
+    
+    def get_config_values(self) -> Dict:
+        """Todos os parâmetros de system_config, convertidos pelo parameter_type"""
+        with self._get_connection() as conn:
+            rows = conn.execute('''
+                SELECT parameter_name, parameter_value, parameter_type FROM system_config
+            ''').fetchall()
+        return {name: self._parse_config_value(name, value, value_type)
+                for name, value, value_type in rows}
+    
+    @staticmethod
+    def _parse_config_value(parameter_name: str, value: str, value_type: str, default=None):
+        try:
+            if value_type == 'int':
+                return int(value)
+            if value_type == 'float':
+                return float(value)
+            if value_type == 'bool':
+                return value.lower() in ('true', '1', 'yes')
+        except ValueError:
+            logger.warning(f"⚠️ Valor inválido em system_config para {parameter_name}: {value}")
+            return default
+        return value
+    
+    def run_retention(self, retention_days: int = None, chunk_size: int = 5000,
+                      pause_seconds: float = 0.05, vacuum: bool = True) -> Dict:
+        """Remove dados antigos em lotes curtos e devolve as páginas livres ao SO
         
-        for table in tables_to_clean:
-            cursor.execute(f'''
-                DELETE FROM {table}
-                WHERE timestamp < datetime('now', '-{retention_days} days')
-            ''')
-            deleted = cursor.rowcount
-            total_deleted += deleted
-            logger.info(f"🗑️ Removidos {deleted} registros antigos de {table}")
+        Cada lote apaga no máximo chunk_size linhas por rowid e faz commit, liberando
+        o lock de escrita por pause_seconds antes do próximo lote. As páginas só
+        voltam ao SO com auto_vacuum=INCREMENTAL; em banco antigo o relatório traz
+        incremental_vacuum='off' até rodar convert_to_incremental_vacuum().
+        """
+        if retention_days is None:
+            retention_days = self.get_config_value('data_retention_days',
+                                                   self.db_config.retention_days)
+        retention_days = int(retention_days)
+        chunk_size = max(1, int(chunk_size))
+        started = time.perf_counter()
+        
+        # Com arquivo colunar, leituras/clima só saem do SQLite depois de arquivadas.
+        # Arquiva antes de pegar a conexão da retenção: o arquivamento usa as
+        # próprias conexões do pool (com :memory: o pool tem uma só)
+        if self.archive is not None:
+            self.archive_closed_partitions()
+        
+        conn = self._get_connection()
+        try:
+            cutoff = conn.execute(
+                "SELECT datetime('now', ?)", (f'-{retention_days} days',)
+            ).fetchone()[0]
+            
+            archive_cutoff = cutoff
+            if self.archive is not None:
+                archived_until = period_bounds(datetime.utcnow(), 'month')[0]
+                archive_cutoff = min(cutoff, archived_until.strftime('%Y-%m-%d %H:%M:%S'))
+            
+            deleted = {}
+            chunks = 0
+            for table in RETENTION_TABLES:
+                deleted[table] = 0
+                table_cutoff = archive_cutoff if table in ARCHIVE_TABLES else cutoff
+                while True:
+                    cursor = conn.execute(f'''
+                        DELETE FROM {table} WHERE rowid IN (
+                            SELECT rowid FROM {table}
+                            WHERE timestamp < ?
+                            ORDER BY timestamp LIMIT ?
+                        )
+                    ''', (table_cutoff, chunk_size))
+                    removed = cursor.rowcount
+                    conn.commit()
+                    deleted[table] += removed
+                    chunks += 1
+                    if removed < chunk_size:
+                        break
+                    time.sleep(pause_seconds)
+                logger.info(f"🗑️ Removidos {deleted[table]} registros antigos de {table}")
+            
+            rollups_deleted = {}
+            for table, days in ROLLUP_RETENTION_DAYS.items():
+                cursor = conn.execute(f"DELETE FROM {table} WHERE bucket < datetime('now', ?)",
+                                      (f'-{int(days)} days',))
+                conn.commit()
+                rollups_deleted[table] = cursor.rowcount
+            
+            if self.shards is not None:
+                # Particionado: partições inteiras expiradas saem apagando o arquivo
+                expired = self.shards.drop_before(conn, archive_cutoff)
+                deleted['sensor_readings'] += sum(shard.row_count for shard in expired)
+            
+            pages_freed = 0
+            page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+            vacuum_status = 'skipped'
+            if vacuum and not incremental_vacuum_enabled(conn):
+                vacuum_status = 'off'
+                logger.warning("⚠️ auto_vacuum não é INCREMENTAL: páginas livres ficam no arquivo "
+                               "(rode convert_to_incremental_vacuum() numa janela de manutenção)")
+            elif vacuum:
+                vacuum_status = 'incremental'
+                pages_before = conn.execute("PRAGMA page_count").fetchone()[0]
+                conn.commit()
+                # execute() roda um único passo (uma página); executescript vai até o fim
+                conn.executescript("PRAGMA incremental_vacuum;")
+                # Em WAL o arquivo só encolhe depois do checkpoint
+                conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchall()
+                pages_freed = pages_before - conn.execute("PRAGMA page_count").fetchone()[0]
+        finally:
+            conn.close()
         
-        conn.commit()
-        conn.close()
+        total_deleted = sum(deleted.values())
+        report = {
+            'retention_days': retention_days,
+            'cutoff': cutoff,
+            'rows_deleted': deleted,
+            'total_deleted': total_deleted,
+            'rollup_rows_deleted': rollups_deleted,
+            'chunks': chunks,
+            'incremental_vacuum': vacuum_status,
+            'pages_freed': pages_freed,
+            'bytes_freed': pages_freed * page_size,
+            'elapsed_seconds': round(time.perf_counter() - started, 3)
+        }
+        logger.info(f"✅ Limpeza concluída: {total_deleted} registros removidos, "
+                    f"{pages_freed} páginas liberadas")
+        return report
+    
+    def convert_to_incremental_vacuum(self) -> bool:
+        """Manutenção única: converte banco antigo para auto_vacuum=INCREMENTAL
         
-        logger.info(f"✅ Limpeza concluída: {total_deleted} registros removidos")
-        return total_deleted
+        Roda um VACUUM completo (lock exclusivo durante a reescrita do arquivo);
+        chame fora do horário de ingestão. Retorna False se já estava convertido.
+        """
+        with self._get_connection() as conn:
+            converted = enable_incremental_vacuum(conn)
+        if converted:
+            logger.info("🔧 auto_vacuum convertido para INCREMENTAL (VACUUM completo)")
+        return converted
     
-    def export_data_to_csv(self, table_name: str, days: int = 30, 
-                          filepath: str = None) -> str:
-        """Exporta dados para CSV"""
+    def archive_closed_partitions(self, before=None) -> Dict:
+        """Compacta meses fechados de sensor_readings/weather_data no arquivo colunar
+        
+        Só grava meses ausentes do arquivo ou que ganharam linhas desde a última
+        compactação (nunca troca uma partição por outra menor). Sem DB_ARCHIVE_DIR,
+        usa '<banco>_archive/' e passa a arquivar também na retenção.
+        """
+        if self.archive is None:
+            self.archive = ColumnarArchive(os.path.splitext(self.db_path)[0] + '_archive')
+        
+        limit = period_bounds(datetime.utcnow(), 'month')[0]
+        if before is not None:
+            limit = min(limit, pd.Timestamp(before).to_pydatetime())
+        
+        fmt = '%Y-%m-%d %H:%M:%S'
+        report = {}
+        for table in ARCHIVE_TABLES:
+            report[table] = {'partitions': 0, 'rows': 0}
+            oldest = self._oldest_timestamp(table)
+            if oldest is None:
+                continue
+            
+            period_start, period_end = period_bounds(pd.Timestamp(oldest).to_pydatetime(), 'month')
+            while period_end <= limit:
+                key = period_start.strftime(ARCHIVE_KEY_FORMAT)
+                start, end = period_start.strftime(fmt), period_end.strftime(fmt)
+                meta = self.archive.get_partition(table, key)
+                if meta is None or self._count_period(table, start, end) > meta['rows']:
+                    columns = self._archive_source_columns(table, start, end)
+                    size = len(columns['id'])
+                    if size and (meta is None or size > meta['rows']):
+                        self.archive.write_partition(table, key, start, end, columns)
+                        report[table]['partitions'] += 1
+                        report[table]['rows'] += size
+                period_start, period_end = period_end, period_bounds(period_end, 'month')[1]
+        
+        logger.info("🧊 Arquivo colunar: " + ", ".join(
+            f"{table} +{info['partitions']} mês(es)/{info['rows']} linhas" for table, info in report.items()))
+        return report
+    
+    def _oldest_timestamp(self, table: str) -> Optional[str]:
+        if table == 'sensor_readings':
+            page = self.query_sensor_page(limit=1, descending=False)[0]
+            return page[0]['timestamp'] if page else None
+        with self._get_connection() as conn:
+            return conn.execute(f'SELECT MIN(timestamp) FROM {table}').fetchone()[0]
+    
+    def _count_period(self, table: str, start: str, end: str) -> int:
+        with self._get_connection() as conn:
+            if table == 'sensor_readings':
+                # Rollup diário conta as leituras nos dois modos (tabela única ou partições)
+                return conn.execute('''
+                    SELECT CAST(TOTAL(reading_count) AS INTEGER) FROM sensor_rollup_daily
+                    WHERE bucket >= ? AND bucket < ?
+                ''', (start, end)).fetchone()[0]
+            return conn.execute(f'SELECT COUNT(*) FROM {table} WHERE timestamp >= ? AND timestamp < ?',
+                                (start, end)).fetchone()[0]
+    
+    def _archive_source_columns(self, table: str, start: str, end: str) -> Dict[str, np.ndarray]:
+        if table == 'sensor_readings':
+            return self.get_sensor_columns(start, end, fmt='numpy')
+        with self._get_connection() as conn:
+            return fetch_columns(conn, f'''
+                SELECT * FROM {table} WHERE timestamp >= ? AND timestamp < ? ORDER BY timestamp
+            ''', (start, end), table, 'numpy')
+    
+    def get_archived_columns(self, table: str = 'sensor_readings', start=None, end=None,
+                             columns: List[str] = None) -> Dict[str, np.ndarray]:
+        """Colunas do arquivo colunar (memmap) para análises longas, sem passar pelo SQLite"""
+        if self.archive is None:
+            return {}
+        return self.archive.read(table, start, end, columns)
+    
+    def cleanup_old_data(self, retention_days: int = None):
+        """Remove dados antigos baseado na política de retenção"""
+        return self.run_retention(retention_days)['total_deleted']
+    
+    def export_data(self, table_name: str, days: Optional[int] = 30, filepath: str = None,
+                    fmt: str = 'csv', chunk_size: int = 5000) -> str:
+        """Exporta uma tabela em streaming (CSV, JSON Lines ou Parquet)
+        
+        days=None exporta a tabela inteira; a memória usada fica limitada a chunk_size linhas.
+        """
+        if table_name not in EXPORT_TIME_COLUMNS:
+            raise ValueError(f"Tabela não exportável: {table_name}")
+        
         if filepath is None:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filepath = f"farmtech_{table_name}_{timestamp}.csv"
+            filepath = f"farmtech_{table_name}_{timestamp}.{fmt}"
+        
+        time_column = EXPORT_TIME_COLUMNS[table_name]
+        where, params = '', ()
+        if days is not None:
+            where = f"{time_column} >= datetime('now', ?)"
+            params = (f'-{int(days)} days',)
         
-        conn = sqlite3.connect(self.db_path)
+        with self._get_connection() as conn:
+            if table_name == 'sensor_readings' and self.shards is not None:
+                total = self._export_sharded(conn, filepath, fmt, days, where, params, chunk_size)
+            else:
+                total = stream_table_export(conn, table_name, filepath, fmt,
+                                            where=where, params=params,
+                                            order_by=f"{time_column} DESC",
+                                            chunk_size=chunk_size)
         
-        query = f'''
-            SELECT * FROM {table_name}
-            WHERE timestamp >= datetime('now', '-{days} days')
-            ORDER BY timestamp DESC
-        '''
+        logger.info(f"📊 {total} registros exportados para: {filepath}")
+        return filepath
+    
+    def _export_sharded(self, conn, filepath: str, fmt: str, days: Optional[int],
+                        where: str, params: tuple, chunk_size: int) -> int:
+        """Exporta a tabela principal e as partições do período, uma partição anexada por vez
         
-        df = pd.read_sql_query(query, conn)
-        df.to_csv(filepath, index=False)
+        As partições cobrem períodos disjuntos; percorridas da mais nova para a
+        mais antiga, com timestamp DESC em cada uma, a saída fica na mesma ordem
+        de uma consulta única. Não há limite de partições (SQLITE_MAX_ATTACHED).
+        """
+        start = None
+        if days is not None:
+            start = conn.execute("SELECT datetime('now', ?)", params).fetchone()[0]
+        sources = [None] + self.shards.list_shards(conn, start, descending=True)
+        table_info = table_columns(conn, 'sensor_readings')
+        columns = ', '.join(name for name, _ in table_info)
         
-        conn.close()
+        def chunks():
+            for shard in sources:
+                with self._sensor_table(conn, shard) as table:
+                    sql = f"SELECT {columns} FROM {table}"
+                    if where:
+                        sql += f" WHERE {where}"
+                    yield from iter_query_chunks(conn, sql + " ORDER BY timestamp DESC",
+                                                 params, chunk_size)
         
-        logger.info(f"📊 Dados exportados para: {filepath}")
-        return filepath
+        return write_export(filepath, fmt, table_info, chunks())
+    
+    def export_data_to_csv(self, table_name: str, days: int = 30, 
+                          filepath: str = None) -> str:
+        """Exporta dados para CSV"""
+        return self.export_data(table_name, days, filepath, fmt='csv')
     
     def get_system_health(self) -> Dict:
         """Retorna status de saúde do sistema"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Verificar últimas leituras
-        cursor.execute('''
-            SELECT timestamp FROM sensor_readings 
-            ORDER BY timestamp DESC LIMIT 1
-        ''')
-        last_reading = cursor.fetchone()
-        
-        # Verificar alertas críticos não reconhecidos
-        cursor.execute('''
-            SELECT COUNT(*) FROM system_alerts 
-            WHERE severity = 'CRITICAL' AND acknowledged = FALSE
-        ''')
-        critical_alerts = cursor.fetchone()[0]
-        
-        # Verificar taxa de erro das predições ML
-        cursor.execute('''
-            SELECT AVG(prediction_accuracy) FROM ml_predictions 
-            WHERE timestamp >= datetime('now', '-24 hours')
-            AND prediction_accuracy IS NOT NULL
-        ''')
-        ml_accuracy = cursor.fetchone()[0]
-        
-        conn.close()
+        with self._get_connection() as conn:
+            cursor = conn.cursor()
+            
+            # Verificar últimas leituras
+            if self.shards is None:
+                cursor.execute('''
+                    SELECT timestamp FROM sensor_readings 
+                    ORDER BY timestamp DESC LIMIT 1
+                ''')
+                last_reading = cursor.fetchone()
+            else:
+                latest = self.query_sensor_page(limit=1)[0]
+                last_reading = (latest[0]['timestamp'],) if latest else None
+            
+            # Verificar alertas críticos não reconhecidos
+            cursor.execute('''
+                SELECT COUNT(*) FROM system_alerts 
+                WHERE severity = 'CRITICAL' AND acknowledged = FALSE
+            ''')
+            critical_alerts = cursor.fetchone()[0]
+            
+            # Verificar taxa de erro das predições ML
+            cursor.execute('''
+                SELECT AVG(prediction_accuracy) FROM ml_predictions 
+                WHERE timestamp >= datetime('now', '-24 hours')
+                AND prediction_accuracy IS NOT NULL
+            ''')
+            ml_accuracy = cursor.fetchone()[0]
+            
+            storage_status = check_storage_profile(conn, self.db_config.storage_profile)
         
         # Calcular score de saúde
         health_score = 100
@@ -466,6 +1546,7 @@ class EnhancedFarmTechDatabase:
             'last_reading': last_reading[0] if last_reading else None,
             'critical_alerts': critical_alerts,
             'ml_accuracy': ml_accuracy,
+            'storage': storage_status,
             'checked_at': datetime.now().isoformat()
         }
 
@@ -0,0 +1,403 @@
+import asyncio
+import socket
+import struct
+import random
+import time
+import logging
+import sys
+import numpy as np
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from database_enhanced import EnhancedFarmTechDatabase
+from serial_ingest import DeviceClock
+from sensor_frames import (SENSOR_STRUCT, SENSOR_DTYPE, FRAME_MAGIC, FrameError,
+                           FrameStreamDecoder, iter_frames, encode_frame, encode_frames)
+
+# Configurar logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Formatos aceitos (SensorData = registro empacotado de 15 bytes, ver sensor_frames.py):
+# - frames versionados de sensor_frames.py (começam com FRAME_MAGIC), por TCP ou UDP
+# - UDP legado: uint16 node_id seguido de N registros SensorData
+# - TCP legado: linha 'NODE <id> <location>' e depois registros SensorData contínuos
+UDP_HEADER = struct.Struct('<H')
+TCP_HELLO = b'NODE'
+
+DEFAULT_TCP_PORT = 9750
+DEFAULT_UDP_PORT = 9751
+UDP_RECEIVE_BUFFER = 4 * 1024 * 1024
+
+class NodeState:
+    """Estado de um nó de campo visto pelo servidor"""
+
+    def __init__(self, node_id: int, location: str):
+        self.node_id = node_id
+        self.location = location
+        self.clock = DeviceClock()
+        self.readings = 0
+        self.last_seen = None
+
+    def to_dict(self) -> Dict:
+        return {
+            'node_id': self.node_id,
+            'location': self.location,
+            'readings': self.readings,
+            'last_seen': self.last_seen.isoformat() if self.last_seen else None
+        }
+
+class NodeIngestServer:
+    """Servidor asyncio que recebe SensorData de vários ESP32 por TCP e UDP
+
+    Cada conexão/datagrama é decodificado e separado por nó e location; todos os
+    lotes passam por uma fila para uma única tarefa gravadora, que junta até
+    batch_size leituras por transação e grava no máximo flush_interval segundos
+    depois da primeira leitura do lote.
+    """
+
+    def __init__(self, db: EnhancedFarmTechDatabase, host: str = '0.0.0.0',
+                 tcp_port: int = DEFAULT_TCP_PORT, udp_port: Optional[int] = DEFAULT_UDP_PORT,
+                 batch_size: int = 2000, flush_interval: float = 0.5,
+                 max_pending_chunks: int = 1000, node_locations: Dict[int, str] = None):
+        self.db = db
+        self.host = host
+        self.tcp_port = tcp_port
+        self.udp_port = udp_port
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.node_locations = dict(node_locations or {})
+
+        self.nodes: Dict[int, NodeState] = {}
+        self.counters = {
+            'tcp_connections': 0,
+            'udp_datagrams': 0,
+            'readings_received': 0,
+            'readings_dropped': 0,
+            'malformed': 0,
+            'rows_flushed': 0,
+            'flushes': 0,
+            'flush_failures': 0,
+            'flush_seconds_max': 0.0,
+            'last_error': None
+        }
+
+        self._max_pending_chunks = max_pending_chunks
+        self._queue: Optional[asyncio.Queue] = None
+        self._servers = []
+        self._transport = None
+        self._writer_task = None
+        self._started_at = None
+
+    # Demultiplexação -------------------------------------------------------
+
+    def _node(self, node_id: int, location: str = None) -> NodeState:
+        state = self.nodes.get(node_id)
+        if state is None:
+            location = location or self.node_locations.get(node_id, f'Node_{node_id:03d}')
+            state = NodeState(node_id, location)
+            self.nodes[node_id] = state
+            logger.info(f"🛰️ Nó {node_id} registrado em {location}")
+        elif location and location != state.location:
+            state.location = location
+        return state
+
+    def _decode(self, node: NodeState, payload) -> List[tuple]:
+        """Converte registros SensorData brutos em tuplas de insert_sensor_batch"""
+        return self._to_rows(node, SENSOR_STRUCT.iter_unpack(payload))
+    
+    def _to_rows(self, node: NodeState, records) -> List[tuple]:
+        received_at = datetime.utcnow()
+        to_utc = node.clock.to_utc
+        location = node.location
+        rows = [(humidity, ph, phosphorus, potassium, pump, None, None, None, None,
+                 location, to_utc(device_ms, received_at))
+                for humidity, ph, phosphorus, potassium, pump, device_ms in records]
+        node.readings += len(rows)
+        node.last_seen = received_at
+        self.counters['readings_received'] += len(rows)
+        return rows
+
+    # TCP -------------------------------------------------------------------
+
+    async def _handle_tcp(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        peer = writer.get_extra_info('peername')
+        self.counters['tcp_connections'] += 1
+        try:
+            first = await reader.readexactly(len(FRAME_MAGIC))
+            if first == FRAME_MAGIC:
+                await self._read_tcp_frames(reader, first)
+                return
+            
+            hello = (first + await reader.readline()).split()
+            if len(hello) < 2 or hello[0] != TCP_HELLO:
+                self.counters['malformed'] += 1
+                logger.warning(f"⚠️ Conexão {peer} sem identificação de nó")
+                return
+            node = self._node(int(hello[1]), hello[2].decode() if len(hello) > 2 else None)
+
+            pending = b''
+            size = SENSOR_STRUCT.size
+            while True:
+                data = await reader.read(65536)
+                if not data:
+                    break
+                data = pending + data
+                usable = len(data) - len(data) % size
+                pending = data[usable:]
+                if usable:
+                    # put() aguarda se a fila estiver cheia: o TCP segura o envio do nó
+                    await self._queue.put(self._decode(node, memoryview(data)[:usable]))
+            if pending:
+                self.counters['malformed'] += 1
+        except asyncio.IncompleteReadError:
+            pass  # conexão fechada antes de enviar algo
+        except (ValueError, ConnectionError) as e:
+            self.counters['malformed'] += 1
+            logger.warning(f"⚠️ Conexão {peer} encerrada: {e}")
+        finally:
+            writer.close()
+    
+    async def _read_tcp_frames(self, reader: asyncio.StreamReader, first: bytes):
+        """Stream de frames versionados; cada frame traz o próprio node_id"""
+        decoder = FrameStreamDecoder()
+        data = first
+        while data:
+            for header, records in decoder.feed(data):
+                node = self._node(header.node_id)
+                await self._queue.put(self._to_rows(node, records.tolist()))
+            data = await reader.read(65536)
+        if decoder.pending_bytes:
+            self.counters['malformed'] += 1
+
+    # UDP -------------------------------------------------------------------
+
+    def _handle_datagram(self, data: bytes):
+        self.counters['udp_datagrams'] += 1
+        if data[:len(FRAME_MAGIC)] == FRAME_MAGIC:
+            try:
+                for header, records in iter_frames(data):
+                    self._enqueue_nowait(self._to_rows(self._node(header.node_id), records.tolist()))
+            except FrameError:
+                self.counters['malformed'] += 1
+            return
+        
+        body = len(data) - UDP_HEADER.size
+        if body <= 0 or body % SENSOR_STRUCT.size:
+            self.counters['malformed'] += 1
+            return
+        node = self._node(UDP_HEADER.unpack_from(data)[0])
+        self._enqueue_nowait(self._decode(node, memoryview(data)[UDP_HEADER.size:]))
+    
+    def _enqueue_nowait(self, rows: List[tuple]):
+        try:
+            # UDP não tem controle de fluxo: com a fila cheia o lote é descartado
+            self._queue.put_nowait(rows)
+        except asyncio.QueueFull:
+            self.counters['readings_dropped'] += len(rows)
+
+    # Gravação --------------------------------------------------------------
+
+    async def _writer(self):
+        loop = asyncio.get_running_loop()
+        batch = []
+        deadline = None
+        stopping = False
+        while not stopping:
+            # O prazo conta da primeira leitura do lote, mesmo com dados chegando sem parar
+            timeout = None if deadline is None else max(deadline - loop.time(), 0)
+            try:
+                chunk = await asyncio.wait_for(self._queue.get(), timeout=timeout)
+            except asyncio.TimeoutError:
+                chunk = []
+
+            # None é a sentinela de stop(): gravar o que restou e sair
+            stopping = chunk is None
+            if chunk:
+                if not batch:
+                    deadline = loop.time() + self.flush_interval
+                batch.extend(chunk)
+                while len(batch) < self.batch_size and not self._queue.empty():
+                    chunk = self._queue.get_nowait()
+                    if chunk is None:
+                        stopping = True
+                        break
+                    batch.extend(chunk)
+
+            if batch and (stopping or len(batch) >= self.batch_size or loop.time() >= deadline):
+                await self._flush(loop, batch)
+                batch = []
+                deadline = None
+
+    async def _flush(self, loop, batch: list):
+        started = time.perf_counter()
+        try:
+            # SQLite bloqueia: grava fora do event loop, mas sempre uma transação por vez
+            await loop.run_in_executor(None, self.db.insert_sensor_batch, batch)
+        except Exception as e:
+            # Lote não é reenfileirado: a perda fica visível nos contadores
+            logger.error(f"❌ Falha ao gravar lote de {len(batch)} leituras: {e}")
+            self.counters['flush_failures'] += 1
+            self.counters['readings_dropped'] += len(batch)
+            self.counters['last_error'] = str(e)
+            return
+        elapsed = time.perf_counter() - started
+        self.counters['rows_flushed'] += len(batch)
+        self.counters['flushes'] += 1
+        self.counters['flush_seconds_max'] = max(self.counters['flush_seconds_max'], elapsed)
+
+    # Ciclo de vida -----------------------------------------------------------
+
+    async def start(self):
+        """Abre os sockets TCP/UDP e inicia a tarefa gravadora"""
+        loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(maxsize=self._max_pending_chunks)
+        self._started_at = time.monotonic()
+        self._writer_task = asyncio.create_task(self._writer())
+
+        tcp = await asyncio.start_server(self._handle_tcp, self.host, self.tcp_port)
+        self._servers.append(tcp)
+        self.tcp_port = tcp.sockets[0].getsockname()[1]
+
+        if self.udp_port is not None:
+            server = self
+
+            class _UDPProtocol(asyncio.DatagramProtocol):
+                def datagram_received(self, data, addr):
+                    server._handle_datagram(data)
+
+            self._transport, _ = await loop.create_datagram_endpoint(
+                _UDPProtocol, local_addr=(self.host, self.udp_port))
+            self.udp_port = self._transport.get_extra_info('sockname')[1]
+            # Buffer maior absorve rajadas de datagramas enquanto o loop atende o TCP
+            self._transport.get_extra_info('socket').setsockopt(
+                socket.SOL_SOCKET, socket.SO_RCVBUF, UDP_RECEIVE_BUFFER)
+
+        logger.info(f"📡 Servidor de nós ouvindo TCP {self.tcp_port} / UDP {self.udp_port}")
+
+    async def stop(self):
+        """Fecha os sockets, grava o que estiver na fila e encerra a gravadora"""
+        for server in self._servers:
+            server.close()
+            await server.wait_closed()
+        if self._transport is not None:
+            # Datagramas já no buffer do kernel ainda são lidos antes de fechar
+            await asyncio.sleep(self.flush_interval)
+            self._transport.close()
+        # A sentinela entra depois de todos os lotes já enfileirados
+        await self._queue.put(None)
+        await self._writer_task
+
+    def get_stats(self) -> Dict:
+        elapsed = max(time.monotonic() - self._started_at, 1e-9) if self._started_at else 0
+        stats = dict(self.counters)
+        stats['flush_seconds_max'] = round(stats['flush_seconds_max'], 4)
+        stats['pending_chunks'] = self._queue.qsize() if self._queue else 0
+        stats['rows_per_second'] = round(stats['rows_flushed'] / elapsed, 1) if elapsed else 0.0
+        stats['nodes'] = {node_id: node.to_dict() for node_id, node in self.nodes.items()}
+        return stats
+
+# Simuladores de nós (loopback) ---------------------------------------------
+
+def simulate_readings(count: int, seed: int = 0, interval_ms: int = 5000) -> bytes:
+    """Gera count registros SensorData empacotados, como o firmware enviaria"""
+    rnd = random.Random(seed)
+    payload = bytearray()
+    for i in range(count):
+        humidity = min(90.0, max(10.0, rnd.gauss(45, 15)))
+        ph = min(9.0, max(4.0, rnd.gauss(6.8, 0.8)))
+        phosphorus, potassium = rnd.random() > 0.3, rnd.random() > 0.25
+        pump = humidity < 35 or not phosphorus or not potassium
+        payload += SENSOR_STRUCT.pack(humidity, ph, phosphorus, potassium, pump, i * interval_ms)
+    return bytes(payload)
+
+async def simulate_tcp_node(host: str, port: int, node_id: int, location: str,
+                            count: int = 1000, chunk: int = 100, framed: bool = False):
+    """Nó TCP: envia count leituras em blocos de chunk registros
+
+    framed=True usa frames versionados; senão identifica-se com a linha NODE.
+    """
+    reader, writer = await asyncio.open_connection(host, port)
+    payload = simulate_readings(count, seed=node_id)
+    if framed:
+        payload = encode_frames(np.frombuffer(payload, dtype=SENSOR_DTYPE), node_id,
+                                records_per_frame=chunk)
+    else:
+        writer.write(b'%s %d %s\n' % (TCP_HELLO, node_id, location.encode()))
+    step = chunk * SENSOR_STRUCT.size
+    for offset in range(0, len(payload), step):
+        writer.write(payload[offset:offset + step])
+        await writer.drain()
+    writer.close()
+    await writer.wait_closed()
+
+async def simulate_udp_node(host: str, port: int, node_id: int,
+                            count: int = 1000, chunk: int = 50, framed: bool = False):
+    """Nó UDP: envia datagramas de até chunk registros (frame ou cabeçalho node_id)"""
+    loop = asyncio.get_running_loop()
+    transport, _ = await loop.create_datagram_endpoint(
+        asyncio.DatagramProtocol, remote_addr=(host, port))
+    payload = simulate_readings(count, seed=10000 + node_id)
+    step = chunk * SENSOR_STRUCT.size
+    header = UDP_HEADER.pack(node_id)
+    for i, offset in enumerate(range(0, len(payload), step)):
+        if framed:
+            records = np.frombuffer(payload[offset:offset + step], dtype=SENSOR_DTYPE)
+            transport.sendto(encode_frame(records, node_id, sequence=i))
+        else:
+            transport.sendto(header + payload[offset:offset + step])
+        await asyncio.sleep(0)  # não inundar o buffer do loopback
+    transport.close()
+
+async def run_load_test(db_path: str = 'farmtech_load_test.db', tcp_nodes: int = 40,
+                        udp_nodes: int = 10, readings_per_node: int = 2000) -> Dict:
+    """Sobe o servidor em portas livres e dispara nós simulados contra ele"""
+    db = EnhancedFarmTechDatabase(db_path)
+    server = NodeIngestServer(db, host='127.0.0.1', tcp_port=0, udp_port=0)
+    await server.start()
+
+    started = time.perf_counter()
+    # Metade dos nós usa frames versionados, metade o formato legado
+    clients = [simulate_tcp_node('127.0.0.1', server.tcp_port, node_id,
+                                 f'Campo_{node_id % 8 + 1}', readings_per_node,
+                                 framed=node_id % 2 == 0)
+               for node_id in range(1, tcp_nodes + 1)]
+    clients += [simulate_udp_node('127.0.0.1', server.udp_port, node_id, readings_per_node,
+                                  framed=node_id % 2 == 0)
+                for node_id in range(tcp_nodes + 1, tcp_nodes + udp_nodes + 1)]
+    await asyncio.gather(*clients)
+    await server.stop()
+    elapsed = time.perf_counter() - started
+
+    stats = server.get_stats()
+    stats['elapsed_seconds'] = round(elapsed, 3)
+    stats['rows_per_second'] = round(stats['rows_flushed'] / elapsed, 1)
+    db.close()
+    return stats
+
+# Execução principal
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == 'serve':
+        async def serve():
+            server = NodeIngestServer(EnhancedFarmTechDatabase())
+            await server.start()
+            try:
+                while True:
+                    await asyncio.sleep(30)
+                    stats = server.get_stats()
+                    print(f"📊 {stats['rows_flushed']} leituras gravadas de {len(stats['nodes'])} nós "
+                          f"({stats['rows_per_second']}/s)")
+            finally:
+                await server.stop()
+
+        try:
+            asyncio.run(serve())
+        except KeyboardInterrupt:
+            pass
+    else:
+        print("🚀 Teste de carga com nós simulados (loopback)...")
+        result = asyncio.run(run_load_test())
+        nodes = result.pop('nodes')
+        for key, value in result.items():
+            print(f"  {key}: {value}")
+        print(f"  nós: {len(nodes)}")
@@ -0,0 +1,81 @@
+import threading
+import logging
+import sys
+import os
+from datetime import datetime
+from typing import Dict, Optional
+
+from database_enhanced import EnhancedFarmTechDatabase
+
+# Adicionar a raiz do projeto para importar config/settings.py
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../..'))
+from config.settings import DATABASE_CONFIG
+
+# Configurar logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class RetentionScheduler:
+    """Executa a retenção em segundo plano na janela de backup do ambiente"""
+
+    def __init__(self, db: EnhancedFarmTechDatabase, environment: str = 'production',
+                 chunk_size: int = 5000, pause_seconds: float = 0.05):
+        settings = DATABASE_CONFIG[environment]
+        self.db = db
+        self.environment = environment
+        self.enabled = settings.get('backup_enabled', False)
+        self.interval_hours = settings.get('backup_interval_hours', 24)
+        self.chunk_size = chunk_size
+        self.pause_seconds = pause_seconds
+
+        self.last_report: Optional[Dict] = None
+        self.last_run: Optional[datetime] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def run_once(self) -> Dict:
+        """Roda a retenção imediatamente e guarda o relatório"""
+        self.last_report = self.db.run_retention(chunk_size=self.chunk_size,
+                                                 pause_seconds=self.pause_seconds)
+        self.last_run = datetime.now()
+        return self.last_report
+
+    def _loop(self):
+        interval = self.interval_hours * 3600
+        while not self._stop.wait(interval):
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error(f"❌ Erro na retenção agendada: {e}")
+
+    def start(self) -> bool:
+        """Inicia a thread de agendamento se backup_enabled estiver ativo"""
+        if not self.enabled:
+            logger.info(f"⏸️ Retenção agendada desativada em '{self.environment}' (backup_enabled=False)")
+            return False
+        if self._thread and self._thread.is_alive():
+            return True
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name='farmtech-retention', daemon=True)
+        self._thread.start()
+        logger.info(f"⏰ Retenção agendada a cada {self.interval_hours}h ({self.environment})")
+        return True
+
+    def stop(self, timeout: float = None):
+        """Sinaliza a thread para parar; um lote em andamento termina antes"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def status(self) -> Dict:
+        """Estado atual do agendamento"""
+        return {
+            'environment': self.environment,
+            'enabled': self.enabled,
+            'interval_hours': self.interval_hours,
+            'running': bool(self._thread and self._thread.is_alive()),
+            'last_run': self.last_run.isoformat() if self.last_run else None,
+            'last_report': self.last_report
+        }
@@ -0,0 +1,201 @@
+import struct
+import random
+import time
+from typing import Iterator, List, Tuple, NamedTuple
+
+import numpy as np
+
+# Registro SensorData de main_optimized.cpp (__attribute__((packed)), little-endian, 15 bytes)
+SENSOR_DTYPE = np.dtype([
+    ('humidity', '<f4'),
+    ('ph_value', '<f4'),
+    ('phosphorus', 'u1'),
+    ('potassium', 'u1'),
+    ('pump_active', 'u1'),
+    ('timestamp', '<u4')
+])
+SENSOR_STRUCT = struct.Struct('<ffBBBI')
+
+# Frame v1: cabeçalho de 12 bytes + count registros SensorData
+#   magic 'FT' | version u8 | flags u8 | node_id u16 | count u16 | sequence u32
+FRAME_MAGIC = b'FT'
+FRAME_VERSION = 1
+FRAME_HEADER = struct.Struct('<2sBBHHI')
+MAX_RECORDS_PER_FRAME = 0xFFFF
+
+assert SENSOR_DTYPE.itemsize == SENSOR_STRUCT.size == 15
+
+class FrameError(ValueError):
+    """Frame inválido: magic, versão ou tamanho inconsistentes"""
+
+class FrameHeader(NamedTuple):
+    version: int
+    flags: int
+    node_id: int
+    count: int
+    sequence: int
+
+def to_records(rows) -> np.ndarray:
+    """Converte um array estruturado ou tuplas (umidade, ph, P, K, bomba, ts) em SENSOR_DTYPE"""
+    if isinstance(rows, np.ndarray) and rows.dtype == SENSOR_DTYPE:
+        return rows
+    return np.array([tuple(row) for row in rows], dtype=SENSOR_DTYPE)
+
+def encode_frame(rows, node_id: int, sequence: int = 0, flags: int = 0) -> bytes:
+    """Empacota até 65535 leituras em um frame v1"""
+    records = to_records(rows)
+    if len(records) > MAX_RECORDS_PER_FRAME:
+        raise FrameError(f"Frame com {len(records)} registros (máximo {MAX_RECORDS_PER_FRAME})")
+    header = FRAME_HEADER.pack(FRAME_MAGIC, FRAME_VERSION, flags, node_id,
+                               len(records), sequence & 0xFFFFFFFF)
+    return header + records.tobytes()
+
+def encode_frames(rows, node_id: int, records_per_frame: int = 256,
+                  first_sequence: int = 0) -> bytes:
+    """Divide um lote em frames consecutivos com sequence crescente"""
+    records = to_records(rows)
+    return b''.join(
+        encode_frame(records[start:start + records_per_frame], node_id, first_sequence + i)
+        for i, start in enumerate(range(0, len(records), records_per_frame))
+    )
+
+def decode_header(buffer, offset: int = 0) -> FrameHeader:
+    magic, version, flags, node_id, count, sequence = FRAME_HEADER.unpack_from(buffer, offset)
+    if magic != FRAME_MAGIC:
+        raise FrameError(f"Magic inválido no offset {offset}: {magic!r}")
+    if version != FRAME_VERSION:
+        raise FrameError(f"Versão de frame não suportada: {version}")
+    return FrameHeader(version, flags, node_id, count, sequence)
+
+def decode_frame(buffer, offset: int = 0) -> Tuple[FrameHeader, np.ndarray, int]:
+    """Decodifica um frame a partir de offset sem copiar os registros
+
+    Retorna (cabeçalho, registros, próximo offset). Os registros são uma view
+    np.frombuffer sobre o buffer original.
+    """
+    header = decode_header(buffer, offset)
+    start = offset + FRAME_HEADER.size
+    end = start + header.count * SENSOR_DTYPE.itemsize
+    if end > len(buffer):
+        raise FrameError(f"Frame truncado: {len(buffer) - start} de {end - start} bytes")
+    records = np.frombuffer(buffer, dtype=SENSOR_DTYPE, count=header.count, offset=start)
+    return header, records, end
+
+def iter_frames(buffer) -> Iterator[Tuple[FrameHeader, np.ndarray]]:
+    """Percorre frames concatenados (ex.: arquivo ou datagrama com vários frames)"""
+    buffer = memoryview(buffer)
+    offset = 0
+    while offset < len(buffer):
+        header, records, offset = decode_frame(buffer, offset)
+        yield header, records
+
+def decode_frames(buffer) -> Tuple[np.ndarray, np.ndarray]:
+    """Decodifica todos os frames de um buffer: (registros concatenados, node_id por registro)"""
+    parts, nodes = [], []
+    for header, records in iter_frames(buffer):
+        parts.append(records)
+        nodes.append(np.full(header.count, header.node_id, dtype=np.uint16))
+    if not parts:
+        return np.empty(0, dtype=SENSOR_DTYPE), np.empty(0, dtype=np.uint16)
+    return np.concatenate(parts), np.concatenate(nodes)
+
+class FrameStreamDecoder:
+    """Decodificador incremental para streams (TCP/serial) que chegam fragmentados"""
+
+    def __init__(self):
+        self._buffer = bytearray()
+
+    def feed(self, data) -> List[Tuple[FrameHeader, np.ndarray]]:
+        """Acrescenta bytes e devolve os frames completos (registros já copiados)"""
+        self._buffer += data
+        frames = []
+        offset = 0
+        view = memoryview(self._buffer)
+        try:
+            while len(view) - offset >= FRAME_HEADER.size:
+                header = decode_header(view, offset)
+                end = offset + FRAME_HEADER.size + header.count * SENSOR_DTYPE.itemsize
+                if end > len(view):
+                    break
+                # Cópia necessária: o bytearray interno será reaproveitado
+                records = np.frombuffer(view, dtype=SENSOR_DTYPE, count=header.count,
+                                        offset=offset + FRAME_HEADER.size).copy()
+                frames.append((header, records))
+                offset = end
+        finally:
+            view.release()
+        del self._buffer[:offset]
+        return frames
+
+    @property
+    def pending_bytes(self) -> int:
+        return len(self._buffer)
+
+# Arquivo de frames -----------------------------------------------------------
+
+def append_frames_to_archive(path: str, rows, node_id: int, first_sequence: int = 0) -> int:
+    """Acrescenta leituras a um arquivo de frames; retorna os bytes gravados"""
+    data = encode_frames(rows, node_id, first_sequence=first_sequence)
+    with open(path, 'ab') as f:
+        f.write(data)
+    return len(data)
+
+def read_frame_archive(path: str) -> Tuple[np.ndarray, np.ndarray]:
+    """Lê um arquivo de frames via mmap: (registros, node_id por registro)"""
+    mapped = np.memmap(path, dtype=np.uint8, mode='r')
+    return decode_frames(mapped)
+
+# Dados sintéticos ------------------------------------------------------------
+
+def random_records(count: int, rnd: random.Random) -> np.ndarray:
+    """Leituras arbitrárias dentro dos limites de cada campo do SensorData"""
+    records = np.empty(count, dtype=SENSOR_DTYPE)
+    records['humidity'] = [rnd.uniform(-1e3, 1e3) for _ in range(count)]
+    records['ph_value'] = [rnd.uniform(0, 14) for _ in range(count)]
+    for field in ('phosphorus', 'potassium', 'pump_active'):
+        records[field] = [rnd.randint(0, 1) for _ in range(count)]
+    records['timestamp'] = [rnd.randint(0, 0xFFFFFFFF) for _ in range(count)]
+    return records
+
+def compare_with_csv(count: int = 100000) -> dict:
+    """Mede bytes e tempo de parse do frame binário contra as linhas 'CSV:' do firmware"""
+    from serial_ingest import parse_line
+
+    rnd = random.Random(1)
+    records = random_records(count, rnd)
+    records['humidity'] = np.round(records['humidity'] / 10, 2)
+    lines = [b'CSV: %d,%.2f,%.2f,%d,%d,%d\n' % (r[5], r[0], r[1], r[2], r[3], r[4])
+             for r in records.tolist()]
+    binary = encode_frames(records, node_id=1)
+    # Bloco completo de printDetailedData (texto + linha CSV) para uma leitura típica
+    detailed_block = (b'--- LEITURA DE SENSORES ---\r\nTimestamp: 1234567\r\nUmidade: 45.2%\r\n'
+                      b'pH: 6.80\r\nFosforo: PRESENTE\r\nPotassio: AUSENTE\r\nBomba: ATIVA\r\n'
+                      b'Memoria livre: 245000 bytes\r\nCSV: 1234567,45.20,6.80,1,0,1\r\n'
+                      b'---------------------------\r\n')
+
+    started = time.perf_counter()
+    for line in lines:
+        parse_line(line)
+    csv_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    decode_frames(binary)
+    binary_seconds = time.perf_counter() - started
+
+    csv_bytes = sum(len(line) for line in lines)
+    return {
+        'records': count,
+        'csv_bytes': csv_bytes,
+        'binary_bytes': len(binary),
+        'bandwidth_ratio': round(csv_bytes / len(binary), 2),
+        'detailed_output_ratio': round(len(detailed_block) * count / len(binary), 2),
+        'csv_parse_ms': round(csv_seconds * 1000, 2),
+        'binary_parse_ms': round(binary_seconds * 1000, 2),
+        'parse_speedup': round(csv_seconds / binary_seconds, 1)
+    }
+
+# Execução principal
+if __name__ == "__main__":
+    print("📏 Frame binário vs linhas CSV:")
+    for key, value in compare_with_csv().items():
+        print(f"  {key}: {value}")
@@ -0,0 +1,248 @@
+import os
+import re
+import logging
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Granularidade das partições de sensor_readings ('none' = tabela única)
+PARTITION_PERIODS = ('none', 'day', 'week', 'month')
+
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# Máximo de partições anexadas de uma vez (SQLITE_MAX_ATTACHED padrão)
+MAX_ATTACHED_SHARDS = 10
+
+# Catálogo de partições e sequência global de IDs (ficam no banco principal)
+SHARD_CATALOG_SQL = [
+    '''CREATE TABLE IF NOT EXISTS sensor_shards (
+           shard_key TEXT PRIMARY KEY,
+           period_start DATETIME NOT NULL,
+           period_end DATETIME NOT NULL,
+           path TEXT NOT NULL,
+           min_id INTEGER,
+           max_id INTEGER,
+           row_count INTEGER NOT NULL DEFAULT 0,
+           created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+       )''',
+    'CREATE INDEX IF NOT EXISTS idx_sensor_shards_period ON sensor_shards(period_start, period_end)',
+    '''CREATE TABLE IF NOT EXISTS sensor_id_sequence (
+           name TEXT PRIMARY KEY,
+           next_id INTEGER NOT NULL
+       )'''
+]
+
+def period_bounds(value: datetime, period: str) -> Tuple[datetime, datetime]:
+    """Início e fim [start, end) da partição que contém value"""
+    day = value.replace(hour=0, minute=0, second=0, microsecond=0)
+    if period == 'day':
+        return day, day + timedelta(days=1)
+    if period == 'week':
+        start = day - timedelta(days=day.weekday())
+        return start, start + timedelta(days=7)
+    if period == 'month':
+        start = day.replace(day=1)
+        end = (start + timedelta(days=32)).replace(day=1)
+        return start, end
+    raise ValueError(f"Período de partição inválido: {period} (use {', '.join(PARTITION_PERIODS)})")
+
+def _parse_timestamp(value) -> datetime:
+    if isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(str(value)[:19])
+
+@dataclass
+class Shard:
+    key: str
+    start: str
+    end: str
+    path: str
+    min_id: Optional[int] = None
+    max_id: Optional[int] = None
+    row_count: int = 0
+
+    @property
+    def schema(self) -> str:
+        return f'shard_{self.key}'
+
+    @property
+    def table(self) -> str:
+        return f'{self.schema}.sensor_readings'
+
+class ShardedSensorStore:
+    """Leituras de sensores particionadas em um arquivo SQLite por período
+
+    O banco principal guarda o catálogo (sensor_shards) e a sequência global de
+    IDs; cada partição tem sua própria sensor_readings, anexada com ATTACH só
+    enquanto é usada. Consultas por período tocam apenas as partições que cobrem
+    o intervalo, e a retenção remove arquivos inteiros em vez de fazer DELETE.
+    """
+
+    def __init__(self, shard_dir: str, period: str = 'month'):
+        if period not in PARTITION_PERIODS or period == 'none':
+            raise ValueError(f"Período de partição inválido: {period}")
+        self.shard_dir = shard_dir
+        self.period = period
+        os.makedirs(shard_dir, exist_ok=True)
+
+    def shard_key(self, start: datetime) -> str:
+        return start.strftime('%Y%m' if self.period == 'month' else '%Y%m%d')
+
+    # Catálogo ---------------------------------------------------------------
+
+    def _shard_from_row(self, row) -> Shard:
+        key, start, end, path, min_id, max_id, row_count = row
+        return Shard(key, start, end, path, min_id, max_id, row_count)
+
+    def list_shards(self, conn, start=None, end=None, descending: bool = False) -> List[Shard]:
+        """Partições que cobrem [start, end), em ordem cronológica"""
+        sql = '''SELECT shard_key, period_start, period_end, path, min_id, max_id, row_count
+                 FROM sensor_shards WHERE 1 = 1'''
+        params = []
+        if start is not None:
+            sql += ' AND period_end > ?'
+            params.append(_parse_timestamp(start).strftime(TIMESTAMP_FORMAT))
+        if end is not None:
+            sql += ' AND period_start < ?'
+            params.append(_parse_timestamp(end).strftime(TIMESTAMP_FORMAT))
+        sql += f" ORDER BY period_start {'DESC' if descending else 'ASC'}"
+        return [self._shard_from_row(row) for row in conn.execute(sql, params)]
+
+    def shards_for_id(self, conn, record_id: int) -> List[Shard]:
+        return [self._shard_from_row(row) for row in conn.execute('''
+            SELECT shard_key, period_start, period_end, path, min_id, max_id, row_count
+            FROM sensor_shards WHERE ? BETWEEN min_id AND max_id
+            ORDER BY period_start DESC
+        ''', (record_id,))]
+
+    def _register(self, conn, start: datetime, end: datetime) -> Shard:
+        key = self.shard_key(start)
+        path = os.path.join(self.shard_dir, f'sensor_{key}.db')
+        conn.execute('''
+            INSERT OR IGNORE INTO sensor_shards (shard_key, period_start, period_end, path)
+            VALUES (?, ?, ?, ?)
+        ''', (key, start.strftime(TIMESTAMP_FORMAT), end.strftime(TIMESTAMP_FORMAT), path))
+        return self._shard_from_row(conn.execute('''
+            SELECT shard_key, period_start, period_end, path, min_id, max_id, row_count
+            FROM sensor_shards WHERE shard_key = ?
+        ''', (key,)).fetchone())
+
+    def shards_for_timestamps(self, conn, timestamps: List) -> Tuple[List[Shard], List[int]]:
+        """Registra (se preciso) as partições dos timestamps; devolve partições e índice por linha"""
+        shards, index, by_bounds = [], [], {}
+        for value in timestamps:
+            bounds = period_bounds(_parse_timestamp(value), self.period)
+            position = by_bounds.get(bounds)
+            if position is None:
+                position = by_bounds[bounds] = len(shards)
+                shards.append(self._register(conn, *bounds))
+            index.append(position)
+        conn.commit()
+        return shards, index
+
+    def allocate_ids(self, conn, count: int) -> int:
+        """Reserva count IDs consecutivos da sequência global; devolve o primeiro"""
+        conn.execute('UPDATE sensor_id_sequence SET next_id = next_id + ? WHERE name = ?',
+                     (count, 'sensor_readings'))
+        return conn.execute('SELECT next_id - ? FROM sensor_id_sequence WHERE name = ?',
+                            (count, 'sensor_readings')).fetchone()[0]
+
+    def init_sequence(self, conn):
+        """Sequência começa depois de qualquer ID já usado pela tabela principal"""
+        conn.execute('''
+            INSERT OR IGNORE INTO sensor_id_sequence (name, next_id)
+            SELECT 'sensor_readings', COALESCE(MAX(seq), 0) + 1 FROM (
+                SELECT seq FROM sqlite_sequence WHERE name = 'sensor_readings'
+                UNION ALL SELECT MAX(id) FROM sensor_readings
+            )
+        ''')
+
+    def record_insert(self, conn, shard: Shard, min_id: int, max_id: int, count: int):
+        conn.execute('''
+            UPDATE sensor_shards
+            SET min_id = MIN(COALESCE(min_id, ?), ?), max_id = MAX(COALESCE(max_id, ?), ?),
+                row_count = row_count + ?
+            WHERE shard_key = ?
+        ''', (min_id, min_id, max_id, max_id, count, shard.key))
+
+    # ATTACH sob demanda -----------------------------------------------------
+
+    @contextmanager
+    def attached(self, conn, shards: List[Shard], table_sql: str = None) -> Iterator[List[Shard]]:
+        """Anexa as partições durante o bloco; commit ao sair, rollback em erro, DETACH sempre
+
+        table_sql (CREATE TABLE da sensor_readings principal) cria a tabela em
+        partições novas. ATTACH/DETACH não rodam dentro de transação. Para mais de
+        MAX_ATTACHED_SHARDS partições use each_attached.
+        """
+        if len(shards) > MAX_ATTACHED_SHARDS:
+            raise ValueError(f"{len(shards)} partições de uma vez (máximo {MAX_ATTACHED_SHARDS}); "
+                             f"use each_attached")
+        if conn.in_transaction:
+            conn.commit()
+        already = {row[1] for row in conn.execute('PRAGMA database_list')}
+        attached = []
+        try:
+            for shard in shards:
+                if shard.schema in already:
+                    continue
+                if table_sql is None and not os.path.exists(shard.path):
+                    raise FileNotFoundError(f"Partição ausente: {shard.path}")
+                conn.execute('ATTACH DATABASE ? AS ' + shard.schema, (shard.path,))
+                attached.append(shard.schema)
+                if table_sql is not None:
+                    self._create_shard_table(conn, shard, table_sql)
+            yield shards
+            conn.commit()
+        except BaseException:  # inclui GeneratorExit de each_attached interrompido
+            conn.rollback()
+            raise
+        finally:
+            for schema in attached:
+                conn.execute('DETACH DATABASE ' + schema)
+
+    def each_attached(self, conn, shards: List[Shard], table_sql: str = None) -> Iterator[Shard]:
+        """Anexa uma partição por vez: cada uma é uma transação, com commit e DETACH antes da próxima
+
+        Sem limite de partições; o que o chamador escrever no banco principal
+        durante a iteração é confirmado junto com a partição corrente.
+        """
+        for shard in shards:
+            with self.attached(conn, [shard], table_sql):
+                yield shard
+
+    def _create_shard_table(self, conn, shard: Shard, table_sql: str):
+        # Mesmo schema da tabela principal, mas com IDs vindos da sequência global
+        sql = re.sub(r'CREATE TABLE\s+(IF NOT EXISTS\s+)?"?sensor_readings"?',
+                     f'CREATE TABLE IF NOT EXISTS {shard.table}', table_sql, count=1)
+        conn.execute(sql.replace('AUTOINCREMENT', ''))
+        conn.execute(f'PRAGMA {shard.schema}.journal_mode = WAL').fetchall()
+        conn.execute(f'''CREATE INDEX IF NOT EXISTS {shard.schema}.idx_shard_timestamp
+                         ON sensor_readings(timestamp)''')
+        conn.execute(f'''CREATE INDEX IF NOT EXISTS {shard.schema}.idx_shard_location_timestamp
+                         ON sensor_readings(location, timestamp)''')
+
+    # Retenção ---------------------------------------------------------------
+
+    def drop_before(self, conn, cutoff) -> List[Shard]:
+        """Remove as partições que terminam até cutoff (granularidade = período)"""
+        cutoff = _parse_timestamp(cutoff).strftime(TIMESTAMP_FORMAT)
+        expired = [self._shard_from_row(row) for row in conn.execute('''
+            SELECT shard_key, period_start, period_end, path, min_id, max_id, row_count
+            FROM sensor_shards WHERE period_end <= ? ORDER BY period_start
+        ''', (cutoff,))]
+        for shard in expired:
+            conn.execute('DELETE FROM sensor_shards WHERE shard_key = ?', (shard.key,))
+        conn.commit()
+
+        for shard in expired:
+            for suffix in ('', '-wal', '-shm', '-journal'):
+                try:
+                    os.remove(shard.path + suffix)
+                except FileNotFoundError:
+                    pass
+            logger.info(f"🗑️ Partição {shard.key} removida ({shard.row_count} leituras)")
+        return expired
@@ -0,0 +1,447 @@
+import socket
+import threading
+import queue
+import random
+import time
+import logging
+import sys
+import os
+from datetime import datetime, timedelta
+from typing import Iterator, Optional, Tuple, Dict
+
+from database_enhanced import EnhancedFarmTechDatabase
+
+# Configurar logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Leitura já decodificada: (timestamp_dispositivo_ms ou None, umidade, pH, P, K, bomba)
+Reading = Tuple[Optional[int], float, float, bool, bool, bool]
+
+# Prefixos das linhas emitidas por main_optimized.cpp
+CSV_PREFIX = b'CSV: '
+PLOTTER_PREFIX = b'Humidity:'
+
+# Escalas do printSerialPlotterData (valores ampliados para o Serial Plotter)
+PLOTTER_PH_SCALE = 10.0
+
+class LineParseError(ValueError):
+    """Linha reconhecida como leitura, mas com campos inválidos"""
+
+def parse_line(line: bytes) -> Optional[Reading]:
+    """Decodifica uma linha da serial do ESP32 sem convertê-la para str
+
+    Aceita 'CSV: ts,umidade,ph,P,K,bomba' (printDetailedData) e
+    'Humidity:..,pH:..,Pump:..,Phosphorus:..,Potassium:..' (printSerialPlotterData).
+    Retorna None para linhas que não são leituras (cabeçalhos, estatísticas).
+    """
+    line = line.strip()
+    try:
+        if line.startswith(CSV_PREFIX):
+            fields = line[len(CSV_PREFIX):].split(b',')
+            if len(fields) != 6:
+                raise LineParseError(f"CSV com {len(fields)} campos (esperado 6)")
+            # int()/float() aceitam bytes diretamente
+            return (int(fields[0]), float(fields[1]), float(fields[2]),
+                    fields[3] == b'1', fields[4] == b'1', fields[5] == b'1')
+
+        if line.startswith(PLOTTER_PREFIX):
+            values = {}
+            for field in line.split(b','):
+                key, _, value = field.partition(b':')
+                values[key] = float(value)
+            return (None, values[b'Humidity'], values[b'pH'] / PLOTTER_PH_SCALE,
+                    values[b'Phosphorus'] > 0, values[b'Potassium'] > 0, values[b'Pump'] > 0)
+    except (ValueError, KeyError) as e:
+        raise LineParseError(f"{e}: {line[:80]!r}") from None
+
+    return None
+
+class DeviceClock:
+    """Converte o millis() do ESP32 em horário UTC ancorado na primeira leitura"""
+
+    def __init__(self):
+        self._anchor_ms = None
+        self._anchor_time = None
+
+    def to_utc(self, device_ms: Optional[int], received_at: datetime) -> datetime:
+        if device_ms is None:
+            return received_at
+        # Primeira leitura, reboot ou overflow do millis(): reancorar no horário de chegada
+        if self._anchor_ms is None or device_ms < self._anchor_ms:
+            self._anchor_ms = device_ms
+            self._anchor_time = received_at
+        return self._anchor_time + timedelta(milliseconds=device_ms - self._anchor_ms)
+
+# Fontes de linhas ------------------------------------------------------------
+
+class StreamSource:
+    """Linhas de qualquer stream binário (stdin, FIFO, arquivo já aberto)"""
+
+    def __init__(self, stream, name: str = 'stream'):
+        self.stream = stream
+        self.name = name
+
+    def lines(self) -> Iterator[bytes]:
+        for line in self.stream:
+            yield line
+
+    def close(self):
+        self.stream.close()
+
+class FileTailSource:
+    """Acompanha um arquivo (ou pipe nomeado) como `tail -f`"""
+
+    def __init__(self, path: str, from_start: bool = False, poll_interval: float = 0.2):
+        self.path = path
+        self.name = f"tail:{path}"
+        self.from_start = from_start
+        self.poll_interval = poll_interval
+        self._closed = threading.Event()
+
+    def lines(self) -> Iterator[bytes]:
+        with open(self.path, 'rb') as f:
+            if not self.from_start:
+                f.seek(0, os.SEEK_END)
+            partial = b''
+            while not self._closed.is_set():
+                line = f.readline()
+                if not line:
+                    self._closed.wait(self.poll_interval)
+                    continue
+                if not line.endswith(b'\n'):
+                    partial += line  # linha ainda sendo escrita
+                    continue
+                yield partial + line
+                partial = b''
+
+    def close(self):
+        self._closed.set()
+
+class SerialSource:
+    """Porta serial do ESP32 (requer pyserial)"""
+
+    def __init__(self, port: str, baudrate: int = 115200, timeout: float = 1.0):
+        try:
+            import serial
+        except ImportError:
+            raise ImportError("Leitura serial requer pyserial (pip install pyserial)")
+        self.name = f"serial:{port}"
+        self.port = serial.Serial(port, baudrate=baudrate, timeout=timeout)
+
+    def lines(self) -> Iterator[bytes]:
+        while self.port.is_open:
+            line = self.port.readline()
+            if line:
+                yield line
+
+    def close(self):
+        self.port.close()
+
+class TCPSource:
+    """Linhas de um socket TCP (ex.: ponte serial-TCP como ser2net), com reconexão"""
+
+    def __init__(self, host: str, port: int, reconnect_delay: float = 2.0):
+        self.host = host
+        self.port = port
+        self.name = f"tcp:{host}:{port}"
+        self.reconnect_delay = reconnect_delay
+        self._closed = threading.Event()
+        self._sock = None
+
+    def lines(self) -> Iterator[bytes]:
+        while not self._closed.is_set():
+            try:
+                self._sock = socket.create_connection((self.host, self.port), timeout=10)
+                self._sock.settimeout(None)
+                with self._sock.makefile('rb') as stream:
+                    for line in stream:
+                        yield line
+            except OSError as e:
+                if self._closed.is_set():
+                    break
+                logger.warning(f"⚠️ Conexão {self.name} perdida: {e}")
+            self._closed.wait(self.reconnect_delay)
+
+    def close(self):
+        self._closed.set()
+        if self._sock is not None:
+            try:
+                self._sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            self._sock.close()
+
+class FakeSerialSource:
+    """Simula a saída serial do ESP32 para testes e demonstrações
+
+    Intercala linhas CSV, linhas do Serial Plotter, cabeçalhos de texto e, com
+    garbage_ratio > 0, linhas corrompidas. interval=0 gera o mais rápido possível.
+    """
+
+    def __init__(self, count: int = 1000, interval: float = 0.0, plotter_ratio: float = 0.2,
+                 garbage_ratio: float = 0.0, seed: int = 42):
+        self.name = 'fake-serial'
+        self.count = count
+        self.interval = interval
+        self.plotter_ratio = plotter_ratio
+        self.garbage_ratio = garbage_ratio
+        self.random = random.Random(seed)
+        self._closed = threading.Event()
+
+    def lines(self) -> Iterator[bytes]:
+        millis = 0
+        for _ in range(self.count):
+            if self._closed.is_set():
+                break
+            rnd = self.random
+            millis += 5000
+            humidity = min(90.0, max(10.0, rnd.gauss(45, 15)))
+            ph = min(9.0, max(4.0, rnd.gauss(6.8, 0.8)))
+            phosphorus, potassium = rnd.random() > 0.3, rnd.random() > 0.25
+            pump = humidity < 35 or not phosphorus or not potassium
+
+            yield b'--- LEITURA DE SENSORES ---\n'
+            if rnd.random() < self.garbage_ratio:
+                yield b'CSV: %d,%.2f,??\n' % (millis, humidity)
+            elif rnd.random() < self.plotter_ratio:
+                yield (b'Humidity:%.1f,pH:%.1f,Pump:%d,Phosphorus:%d,Potassium:%d\n'
+                       % (humidity, ph * PLOTTER_PH_SCALE, 100 if pump else 0,
+                          20 if phosphorus else 0, 30 if potassium else 0))
+            else:
+                yield (b'CSV: %d,%.2f,%.2f,%d,%d,%d\n'
+                       % (millis, humidity, ph, phosphorus, potassium, pump))
+
+            if self.interval:
+                self._closed.wait(self.interval)
+
+    def close(self):
+        self._closed.set()
+
+def open_source(spec: str):
+    """Cria a fonte a partir de 'serial:PORTA[@BAUD]', 'tail:ARQUIVO', 'tcp:HOST:PORTA', 'stdin' ou 'fake[:N]'"""
+    kind, _, target = spec.partition(':')
+    if kind == 'serial':
+        port, _, baud = target.partition('@')
+        return SerialSource(port, int(baud or 115200))
+    if kind == 'tail':
+        return FileTailSource(target)
+    if kind == 'tcp':
+        host, _, port = target.rpartition(':')
+        return TCPSource(host, int(port))
+    if kind == 'stdin':
+        return StreamSource(sys.stdin.buffer, 'stdin')
+    if kind == 'fake':
+        return FakeSerialSource(int(target or 1000))
+    raise ValueError(f"Fonte de ingestão desconhecida: {spec}")
+
+# Daemon ----------------------------------------------------------------------
+
+class IngestStats:
+    """Contadores do daemon (atualizados pelas threads leitora e gravadora)"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started_at = time.monotonic()
+        self.lines_read = 0
+        self.readings_parsed = 0
+        self.parse_failures = 0
+        self.ignored_lines = 0
+        self.backpressure_waits = 0
+        self.rows_flushed = 0
+        self.flushes = 0
+        self.flush_failures = 0
+        self.readings_dropped = 0
+        self.flush_seconds_total = 0.0
+        self.flush_seconds_max = 0.0
+        self.last_error = None
+
+    def record_flush(self, rows: int, seconds: float):
+        with self.lock:
+            self.rows_flushed += rows
+            self.flushes += 1
+            self.flush_seconds_total += seconds
+            self.flush_seconds_max = max(self.flush_seconds_max, seconds)
+
+    def snapshot(self, pending: int = 0) -> Dict:
+        with self.lock:
+            elapsed = max(time.monotonic() - self.started_at, 1e-9)
+            return {
+                'lines_read': self.lines_read,
+                'readings_parsed': self.readings_parsed,
+                'parse_failures': self.parse_failures,
+                'ignored_lines': self.ignored_lines,
+                'backpressure_waits': self.backpressure_waits,
+                'rows_flushed': self.rows_flushed,
+                'pending': pending,
+                'flushes': self.flushes,
+                'flush_failures': self.flush_failures,
+                'readings_dropped': self.readings_dropped,
+                'avg_flush_ms': round(1000 * self.flush_seconds_total / self.flushes, 2) if self.flushes else 0.0,
+                'max_flush_ms': round(1000 * self.flush_seconds_max, 2),
+                'rows_per_second': round(self.rows_flushed / elapsed, 1),
+                'last_error': self.last_error
+            }
+
+class SerialIngestDaemon:
+    """Lê linhas de uma fonte, decodifica e grava em lotes no EnhancedFarmTechDatabase
+
+    Uma thread lê e decodifica; outra grava com insert_sensor_batch quando o lote
+    atinge batch_size ou flush_interval segundos. A fila entre as duas tem no máximo
+    max_pending leituras: cheia, a leitora bloqueia (backpressure sobre a fonte).
+    """
+
+    def __init__(self, db: EnhancedFarmTechDatabase, source, batch_size: int = 500,
+                 flush_interval: float = 1.0, max_pending: int = 10000,
+                 location: str = 'Campo_Principal'):
+        self.db = db
+        self.source = source
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.location = location
+        self.stats = IngestStats()
+        self.clock = DeviceClock()
+
+        self._pending = queue.Queue(maxsize=max_pending)
+        self._stop = threading.Event()
+        self._reader_done = threading.Event()
+        self._reader = None
+        self._writer = None
+
+    def _read_loop(self):
+        stats = self.stats
+        try:
+            for line in self.source.lines():
+                if self._stop.is_set():
+                    break
+                with stats.lock:
+                    stats.lines_read += 1
+                try:
+                    reading = parse_line(line)
+                except LineParseError as e:
+                    with stats.lock:
+                        stats.parse_failures += 1
+                    logger.debug(f"Linha inválida: {e}")
+                    continue
+                if reading is None:
+                    with stats.lock:
+                        stats.ignored_lines += 1
+                    continue
+
+                device_ms, humidity, ph, phosphorus, potassium, pump = reading
+                row = (humidity, ph, phosphorus, potassium, pump, None, None, None, None,
+                       self.location, self.clock.to_utc(device_ms, datetime.utcnow()))
+                with stats.lock:
+                    stats.readings_parsed += 1
+
+                try:
+                    self._pending.put_nowait(row)
+                except queue.Full:
+                    with stats.lock:
+                        stats.backpressure_waits += 1
+                    while not self._stop.is_set():
+                        try:
+                            self._pending.put(row, timeout=0.5)
+                            break
+                        except queue.Full:
+                            continue
+        except Exception as e:
+            logger.error(f"❌ Erro lendo {self.source.name}: {e}")
+            with stats.lock:
+                stats.last_error = str(e)
+        finally:
+            self._reader_done.set()
+
+    def _drain(self, batch: list, deadline: float):
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._pending.get(timeout=remaining))
+            except queue.Empty:
+                break
+
+    def _write_loop(self):
+        batch = []
+        while True:
+            finished = self._reader_done.is_set() or self._stop.is_set()
+            if finished:
+                # Encerrando: esvaziar a fila sem esperar o intervalo
+                while len(batch) < self.batch_size:
+                    try:
+                        batch.append(self._pending.get_nowait())
+                    except queue.Empty:
+                        break
+            else:
+                self._drain(batch, time.monotonic() + self.flush_interval)
+
+            if batch:
+                self.flush(batch)
+                batch = []
+            elif finished and self._pending.empty():
+                break
+
+    def flush(self, batch: list):
+        """Grava um lote em uma transação e atualiza os contadores"""
+        started = time.perf_counter()
+        try:
+            self.db.insert_sensor_batch(batch)
+        except Exception as e:
+            # Lote não é regravado: a perda fica visível nos contadores
+            logger.error(f"❌ Falha ao gravar lote de {len(batch)} leituras: {e}")
+            with self.stats.lock:
+                self.stats.flush_failures += 1
+                self.stats.readings_dropped += len(batch)
+                self.stats.last_error = str(e)
+            return
+        self.stats.record_flush(len(batch), time.perf_counter() - started)
+
+    def start(self):
+        """Inicia as threads de leitura e gravação"""
+        self._reader = threading.Thread(target=self._read_loop, name='ingest-reader', daemon=True)
+        self._writer = threading.Thread(target=self._write_loop, name='ingest-writer', daemon=True)
+        self._reader.start()
+        self._writer.start()
+        logger.info(f"📡 Ingestão iniciada: {self.source.name} → {self.db.db_path}")
+
+    def stop(self, timeout: float = 10.0) -> Dict:
+        """Para a leitura, grava o que estiver pendente e retorna os contadores"""
+        self._stop.set()
+        self.source.close()
+        if self._reader:
+            self._reader.join(timeout)
+        if self._writer:
+            self._writer.join(timeout)
+        stats = self.get_stats()
+        logger.info(f"🛑 Ingestão encerrada: {stats['rows_flushed']} leituras gravadas, "
+                    f"{stats['readings_dropped']} descartadas, "
+                    f"{stats['parse_failures']} linhas inválidas")
+        return stats
+
+    def wait(self, timeout: float = None) -> bool:
+        """Aguarda a fonte terminar e a fila ser gravada (fontes finitas)"""
+        if self._writer:
+            self._writer.join(timeout)
+            return not self._writer.is_alive()
+        return True
+
+    def get_stats(self) -> Dict:
+        return self.stats.snapshot(self._pending.qsize())
+
+# Execução principal
+if __name__ == "__main__":
+    spec = sys.argv[1] if len(sys.argv) > 1 else 'fake:2000'
+    db_path = sys.argv[2] if len(sys.argv) > 2 else 'farmtech_enhanced.db'
+
+    daemon = SerialIngestDaemon(EnhancedFarmTechDatabase(db_path), open_source(spec))
+    daemon.start()
+    try:
+        while not daemon.wait(timeout=10):
+            print(f"📊 {daemon.get_stats()}")
+    except KeyboardInterrupt:
+        pass
+
+    print("\n📈 Estatísticas finais:")
+    for key, value in daemon.stop().items():
+        print(f"  {key}: {value}")
@@ -0,0 +1,121 @@
+import sys
+import os
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+# Adicionar a raiz do projeto para importar config/storage.py
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../..'))
+# LTTB é comum a todos os motores de armazenamento
+from config.storage import downsample_series, empty_series
+
+logger = logging.getLogger(__name__)
+
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+@dataclass(frozen=True)
+class SeriesTier:
+    """Resolução de uma série: tabela de origem e largura do bucket"""
+    name: str
+    table: str
+    bucket_seconds: int
+
+# Da mais fina para a mais grossa; 'raw' lê sensor_readings (ESP32 envia a cada ~5 s)
+SERIES_TIERS = [
+    SeriesTier('raw', 'sensor_readings', 5),
+    SeriesTier('1m', 'sensor_rollup_minute', 60),
+    SeriesTier('15m', 'sensor_rollup_15min', 900),
+    SeriesTier('1h', 'sensor_rollup_hourly', 3600),
+    SeriesTier('1d', 'sensor_rollup_daily', 86400)
+]
+
+# Métrica -> (soma, contagem, mínimo, máximo) nas tabelas de rollup
+SERIES_METRICS = {
+    'humidity': ('humidity_sum', 'reading_count', 'humidity_min', 'humidity_max'),
+    'ph_level': ('ph_sum', 'reading_count', 'ph_min', 'ph_max'),
+    # Rollups não guardam extremos de temperatura: min/max = média do bucket
+    'temperature': ('temperature_sum', 'temperature_count', None, None)
+}
+
+# Quantos pontos por pixel um tier pode devolver antes de passar para o próximo
+TIER_OVERSAMPLE = 4
+
+def _parse_time(value) -> datetime:
+    if isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(str(value)[:19])
+
+def choose_tier(start, end, pixels: int = 1000, skip: Iterable[str] = ()) -> SeriesTier:
+    """Tier mais fino cujo número de buckets no intervalo cabe em pixels * TIER_OVERSAMPLE
+
+    skip: tabelas indisponíveis para o intervalo (ex.: retenção do tier já passou).
+    """
+    span = (_parse_time(end) - _parse_time(start)).total_seconds()
+    budget = max(1, int(pixels)) * TIER_OVERSAMPLE
+    for tier in SERIES_TIERS:
+        if tier.table not in skip and span / tier.bucket_seconds <= budget:
+            return tier
+    return SERIES_TIERS[-1]
+
+def rollup_series_sql(tier: SeriesTier, metric: str, start, end,
+                      location: Optional[str] = None) -> Tuple[str, list]:
+    """SELECT bucket, média, mínimo, máximo, contagem de um tier de rollup (locais somados)"""
+    value_sum, count, minimum, maximum = SERIES_METRICS[metric]
+    average = f'TOTAL({value_sum}) / NULLIF(TOTAL({count}), 0)'
+    sql = f'''
+        SELECT bucket, {average},
+               {f'MIN({minimum})' if minimum else average},
+               {f'MAX({maximum})' if maximum else average},
+               CAST(TOTAL({count}) AS INTEGER)
+        FROM {tier.table}
+        WHERE bucket >= ? AND bucket < ?'''
+    params = [_parse_time(start).strftime(TIMESTAMP_FORMAT), _parse_time(end).strftime(TIMESTAMP_FORMAT)]
+    if location is not None:
+        sql += ' AND location = ?'
+        params.append(location)
+    sql += ' GROUP BY bucket ORDER BY bucket'
+    return sql, params
+
+def series_from_rows(rows: List[tuple]) -> Dict[str, np.ndarray]:
+    """Linhas (bucket, avg, min, max, count) -> colunas NumPy"""
+    if not rows:
+        return empty_series()
+    buckets, averages, minimums, maximums, counts = zip(*rows)
+    return {
+        'timestamp': np.array(buckets, dtype='datetime64[s]'),
+        'avg': np.array(averages, dtype=np.float64),
+        'min': np.array(minimums, dtype=np.float64),
+        'max': np.array(maximums, dtype=np.float64),
+        'count': np.array(counts, dtype=np.int64)
+    }
+
+def benchmark(points: int = 2_000_000, pixels: int = 1000) -> Dict[str, float]:
+    """Tempo do LTTB sobre uma série sintética (ex.: 90 dias de 1 min para 1000 px)"""
+    import time
+
+    start = np.datetime64('2024-01-01T00:00:00')
+    timestamps = start + np.arange(points).astype('timedelta64[m]')
+    rng = np.random.default_rng(42)
+    average = 45 + 15 * np.sin(np.arange(points) / 720) + rng.normal(0, 2, points)
+    series = {'timestamp': timestamps, 'avg': average, 'min': average - 1,
+              'max': average + 1, 'count': np.ones(points, dtype=np.int64)}
+
+    started = time.perf_counter()
+    reduced = downsample_series(series, pixels)
+    elapsed = time.perf_counter() - started
+
+    return {'points': points, 'pixels': len(reduced['timestamp']),
+            'seconds': round(elapsed, 4),
+            'peak_preserved': bool(reduced['max'].max() == series['max'].max())}
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+
+    now = datetime.utcnow()
+    for days in (0.25, 1, 7, 30, 90, 365 * 3):
+        tier = choose_tier(now - timedelta(days=days), now, pixels=1000)
+        print(f"📈 {days:>7} dia(s) em 1000 px -> tier {tier.name} ({tier.table})")
+    print(f"⚡ LTTB: {benchmark()}")
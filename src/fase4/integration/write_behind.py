@@ -0,0 +1,201 @@
+import queue
+import threading
+import time
+import logging
+from concurrent.futures import Future
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Marcadores de controle na fila (nunca chegam ao banco)
+_FLUSH = object()
+_STOP = object()
+
+# Intervalo para quem espera vaga na fila cheia reverificar se ela foi encerrada
+_PUT_POLL_SECONDS = 0.1
+
+class WriteBehindQueue:
+    """Fila write-behind com uma thread gravadora dedicada
+
+    Quem chama só enfileira a leitura e recebe um Future que resolve para o ID
+    do registro. A thread gravadora drena a fila em lotes e grava cada lote com
+    db.insert_sensor_batch: leituras e alertas (avaliados de forma vetorizada
+    sobre o lote) entram na mesma transação.
+
+    Durabilidade: o lote é gravado ao atingir flush_rows leituras, flush_ms
+    milissegundos após a primeira leitura pendente, em flush() ou no close().
+    Com flush_rows=1 cada leitura é gravada assim que chega.
+    """
+
+    def __init__(self, db, flush_rows: int = 500, flush_ms: float = 200,
+                 max_pending: int = 10000):
+        if flush_rows < 1:
+            raise ValueError("flush_rows deve ser >= 1")
+        self.db = db
+        self.flush_rows = flush_rows
+        self.flush_ms = flush_ms
+        self.counters = {
+            'submitted': 0,
+            'rows_flushed': 0,
+            'flushes': 0,
+            'flush_failures': 0,
+            'flush_seconds_max': 0.0,
+            'last_error': None
+        }
+
+        self._queue = queue.Queue(maxsize=max_pending)
+        # _state protege _closed e _putting; _stats_lock protege counters.
+        # Nenhum dos dois é mantido durante um put bloqueante na fila.
+        self._state = threading.Condition()
+        self._stats_lock = threading.Lock()
+        self._closed = False
+        self._putting = 0
+        self._thread = threading.Thread(target=self._run, name='write-behind', daemon=True)
+        self._thread.start()
+
+    def _put(self, item, future: Future) -> Future:
+        with self._state:
+            if self._closed:
+                raise RuntimeError("Fila write-behind encerrada")
+            self._putting += 1
+        try:
+            # Fila cheia (backpressure): espera vaga sem segurar lock nenhum,
+            # desistindo se a fila for encerrada enquanto isso
+            while True:
+                try:
+                    self._queue.put((item, future), timeout=_PUT_POLL_SECONDS)
+                    return future
+                except queue.Full:
+                    with self._state:
+                        if self._closed:
+                            raise RuntimeError("Fila write-behind encerrada")
+        finally:
+            with self._state:
+                self._putting -= 1
+                self._state.notify_all()
+
+    def submit(self, row) -> Future:
+        """Enfileira uma leitura (tupla/dict aceitos por insert_sensor_batch)
+
+        Sem timestamp explícito, a leitura recebe o horário UTC do enfileiramento,
+        não o do flush.
+        """
+        if isinstance(row, dict):
+            if row.get('timestamp') is None:
+                row = {**row, 'timestamp': datetime.utcnow()}
+        else:
+            row = tuple(row)
+            if len(row) < 11 or row[10] is None:
+                row = row[:10] + (None,) * (10 - len(row)) + (datetime.utcnow(),)
+        future = self._put(row, Future())
+        with self._stats_lock:
+            self.counters['submitted'] += 1
+        return future
+
+    def submit_many(self, rows: Iterable) -> List[Future]:
+        return [self.submit(row) for row in rows]
+
+    def flush(self, timeout: Optional[float] = None):
+        """Bloqueia até tudo que foi enfileirado antes desta chamada estar gravado"""
+        self._put(_FLUSH, Future()).result(timeout)
+
+    def close(self, timeout: Optional[float] = None):
+        """Grava o que estiver pendente e encerra a thread gravadora"""
+        with self._state:
+            if self._closed:
+                return
+            self._closed = True
+            # O marcador de parada só entra depois de todo put em andamento:
+            # nada fica na fila atrás dele
+            while self._putting:
+                self._state.wait()
+        self._queue.put((_STOP, None))
+        self._thread.join(timeout)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def get_stats(self) -> Dict:
+        with self._stats_lock:
+            stats = dict(self.counters)
+        stats['pending'] = self.pending
+        stats['flush_seconds_max'] = round(stats['flush_seconds_max'], 4)
+        return stats
+
+    def _run(self):
+        while True:
+            item, future = self._queue.get()
+            rows, futures, markers = [], [], []
+            deadline = time.monotonic() + self.flush_ms / 1000
+
+            # Acumula até flush_rows, o prazo ou um marcador de controle
+            while True:
+                if item is _STOP or item is _FLUSH:
+                    markers.append((item, future))
+                    break
+                rows.append(item)
+                futures.append(future)
+                if len(rows) >= self.flush_rows:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item, future = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+
+            if rows:
+                self._write(rows, futures)
+
+            for marker, marker_future in markers:
+                if marker is _STOP:
+                    self._drain_remaining()
+                    return
+                marker_future.set_result(None)
+
+    def _drain_remaining(self):
+        """Após o marcador de parada: grava qualquer resto e libera flush() pendentes"""
+        rows, futures = [], []
+        while True:
+            try:
+                item, future = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _FLUSH:
+                future.set_result(None)
+            elif item is not _STOP:
+                rows.append(item)
+                futures.append(future)
+        for start in range(0, len(rows), self.flush_rows):
+            self._write(rows[start:start + self.flush_rows],
+                        futures[start:start + self.flush_rows])
+
+    def _write(self, rows: list, futures: List[Future]):
+        started = time.perf_counter()
+        try:
+            ids = self.db.insert_sensor_batch(rows)
+        except Exception as e:
+            logger.error(f"❌ Falha ao gravar lote write-behind ({len(rows)} leituras): {e}")
+            with self._stats_lock:
+                self.counters['flush_failures'] += 1
+                self.counters['last_error'] = str(e)
+            for future in futures:
+                future.set_exception(e)
+            return
+
+        elapsed = time.perf_counter() - started
+        with self._stats_lock:
+            self.counters['rows_flushed'] += len(rows)
+            self.counters['flushes'] += 1
+            self.counters['flush_seconds_max'] = max(self.counters['flush_seconds_max'], elapsed)
+        for future, record_id in zip(futures, ids):
+            future.set_result(record_id)
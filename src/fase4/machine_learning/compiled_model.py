@@ -0,0 +1,240 @@
+import os
+import json
+from datetime import datetime
+
+import numpy as np
+
+# Formatos do artefato compilado (.npz): nós das árvores achatados + StandardScaler.
+# Este módulo não importa o scikit-learn: gateways e o daemon de ingestão só
+# precisam do NumPy para pontuar.
+COMPILED_KINDS = ('forest', 'gbm', 'linear')
+
+# Linhas avaliadas por bloco na travessia vetorizada (linhas x árvores índices em memória)
+TRAVERSAL_CHUNK_ROWS = 1000
+
+def compiled_path(filepath: str) -> str:
+    """Caminho do artefato compilado ao lado do pickle (modelo.pkl -> modelo.npz)"""
+    return os.path.splitext(filepath)[0] + '.npz'
+
+def feature_matrix(X, feature_names, hour=None, temp_avg=25) -> np.ndarray:
+    """DataFrame ou ndarray -> matriz float64 (N x features) na ordem de feature_names
+
+    No DataFrame, 'hour' sai do 'timestamp' (ou da hora atual) e 'temp_avg'
+    da coluna 'temperature' quando não vierem prontos.
+    """
+    if hasattr(X, 'columns'):
+        import pandas as pd
+        columns = {}
+        for name in feature_names:
+            if name in X.columns:
+                columns[name] = X[name]
+            elif name == 'hour':
+                if hour is None and 'timestamp' in X.columns:
+                    columns[name] = pd.to_datetime(X['timestamp']).dt.hour
+                else:
+                    columns[name] = datetime.now().hour if hour is None else hour
+            elif name == 'temp_avg' and 'temperature' in X.columns:
+                columns[name] = pd.to_numeric(X['temperature'], errors='coerce').fillna(temp_avg)
+            elif name == 'temp_avg':
+                columns[name] = temp_avg
+            else:
+                raise KeyError(f"Coluna ausente para predição: {name}")
+        return pd.DataFrame(columns, index=X.index).to_numpy(dtype=np.float64)
+
+    features = np.asarray(X, dtype=np.float64)
+    if features.ndim == 1:
+        features = features.reshape(1, -1)
+    if features.shape[1] != len(feature_names):
+        raise ValueError(f"Esperadas {len(feature_names)} colunas "
+                         f"({', '.join(feature_names)}), recebidas {features.shape[1]}")
+    return features
+
+def _pack_trees(trees, leaf_values):
+    """Concatena as árvores em arrays únicos; filhos viram índices globais (-1 = folha)"""
+    features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+    offset = 0
+    for tree, value in zip(trees, leaf_values):
+        left = tree.children_left.astype(np.int32)
+        right = tree.children_right.astype(np.int32)
+        leaf = left == -1
+        features.append(np.where(leaf, 0, tree.feature).astype(np.int32))
+        thresholds.append(tree.threshold.astype(np.float64))
+        lefts.append(np.where(leaf, -1, left + offset).astype(np.int32))
+        rights.append(np.where(leaf, -1, right + offset).astype(np.int32))
+        values.append(value)
+        roots.append(offset)
+        offset += tree.node_count
+    return {
+        'feature': np.concatenate(features),
+        'threshold': np.concatenate(thresholds),
+        'left': np.concatenate(lefts),
+        'right': np.concatenate(rights),
+        'value': np.concatenate(values),
+        'roots': np.array(roots, dtype=np.int32),
+        'max_depth': np.int32(max(tree.max_depth for tree in trees))
+    }
+
+def export_compiled_model(model, scaler, feature_names, filepath: str, model_version: str = None) -> str:
+    """Achata floresta/GBM/regressão logística + StandardScaler em arrays NumPy (.npz)
+
+    Usa só atributos já ajustados do modelo; levanta ValueError para tipos sem
+    equivalente compilado (ex.: SVM), para o chamador seguir só com o pickle.
+    """
+    classes = np.asarray(model.classes_)
+    arrays = {'mean': np.asarray(scaler.mean_, dtype=np.float64),
+              'scale': np.asarray(scaler.scale_, dtype=np.float64),
+              'classes': classes}
+
+    if hasattr(model, 'estimators_') and hasattr(model, 'n_classes_') and not hasattr(model, 'learning_rate'):
+        # Floresta: média das distribuições de classe das folhas
+        kind = 'forest'
+        trees = [estimator.tree_ for estimator in model.estimators_]
+        leaf_values = []
+        for tree in trees:
+            value = tree.value[:, 0, :].astype(np.float64)
+            totals = value.sum(axis=1, keepdims=True)
+            leaf_values.append(np.divide(value, totals, out=np.zeros_like(value), where=totals > 0))
+        arrays.update(_pack_trees(trees, leaf_values))
+    elif hasattr(model, 'learning_rate') and hasattr(model, 'estimators_'):
+        # GBM binário: log-odds = init + learning_rate * soma das folhas
+        if len(classes) != 2:
+            raise ValueError("GBM compilado só suporta classificação binária")
+        kind = 'gbm'
+        trees = [estimator.tree_ for estimator in model.estimators_[:, 0]]
+        arrays.update(_pack_trees(trees, [tree.value[:, 0, 0].astype(np.float64) for tree in trees]))
+        arrays['learning_rate'] = np.float64(model.learning_rate)
+        arrays['init'] = np.float64(model._raw_predict_init(np.zeros((1, len(feature_names))))[0, 0])
+    elif hasattr(model, 'coef_') and hasattr(model, 'intercept_') and len(classes) == 2:
+        kind = 'linear'
+        arrays['coef'] = np.asarray(model.coef_[0], dtype=np.float64)
+        arrays['intercept'] = np.float64(model.intercept_[0])
+    else:
+        raise ValueError(f"Modelo sem versão compilada: {type(model).__name__}")
+
+    meta = {'kind': kind, 'model_type': type(model).__name__,
+            'feature_names': list(feature_names),
+            'model_version': model_version or type(model).__name__,
+            'exported_at': datetime.now().isoformat()}
+    target = compiled_path(filepath)
+    np.savez(target, meta=np.array(json.dumps(meta)), **arrays)
+    return target
+
+class CompiledModel:
+    """Avaliador só-NumPy do artefato compilado, com a mesma API de predict_batch
+
+    Todos os pares (linha, árvore) descem a floresta juntos: cada iteração avança
+    um nível com indexação vetorizada, no máximo max_depth iterações.
+    """
+
+    def __init__(self, arrays: dict):
+        meta = json.loads(str(arrays['meta']))
+        self.kind = meta['kind']
+        self.model_type = meta['model_type']
+        self.feature_names = meta['feature_names']
+        self.model_version = meta['model_version']
+        self.arrays = {name: arrays[name] for name in arrays if name != 'meta'}
+        self.classes = self.arrays['classes']
+        self.model_trained = True
+
+    @classmethod
+    def load(cls, filepath: str) -> 'CompiledModel':
+        with np.load(compiled_path(filepath), allow_pickle=False) as data:
+            return cls({name: data[name] for name in data.files})
+
+    def _leaves(self, features: np.ndarray) -> np.ndarray:
+        """Índice da folha alcançada por cada (linha, árvore)
+
+        Os pares (linha, árvore) ficam achatados; a cada nível só os caminhos que
+        ainda não chegaram a uma folha são avançados (o conjunto ativo encolhe).
+        """
+        a = self.arrays
+        n_rows, n_trees = len(features), len(a['roots'])
+        # Árvores do sklearn comparam em float32
+        flat_features = features.astype(np.float32).ravel()
+        node = np.tile(a['roots'], n_rows)
+        base = np.repeat(np.arange(n_rows, dtype=np.int64) * features.shape[1], n_trees)
+        active = np.arange(n_rows * n_trees)
+        while len(active):
+            current = node[active]
+            left = a['left'][current]
+            internal = left != -1
+            active, current, left = active[internal], current[internal], left[internal]
+            go_left = flat_features[base[active] + a['feature'][current]] <= a['threshold'][current]
+            node[active] = np.where(go_left, left, a['right'][current])
+        return node.reshape(n_rows, n_trees)
+
+    def predict_proba(self, X) -> np.ndarray:
+        features = feature_matrix(X, self.feature_names)
+        a = self.arrays
+        scaled = (features - a['mean']) / a['scale']
+
+        if self.kind == 'linear':
+            positive = 1.0 / (1.0 + np.exp(-(scaled @ a['coef'] + a['intercept'])))
+            return np.column_stack([1.0 - positive, positive])
+
+        parts = []
+        for offset in range(0, len(scaled), TRAVERSAL_CHUNK_ROWS):
+            leaves = self._leaves(scaled[offset:offset + TRAVERSAL_CHUNK_ROWS])
+            if self.kind == 'forest':
+                parts.append(a['value'][leaves].mean(axis=1))
+            else:
+                raw = a['init'] + a['learning_rate'] * a['value'][leaves].sum(axis=1)
+                positive = 1.0 / (1.0 + np.exp(-raw))
+                parts.append(np.column_stack([1.0 - positive, positive]))
+        if not parts:
+            return np.empty((0, len(self.classes)))
+        return np.concatenate(parts)
+
+    def predict_batch(self, X, hour=None, temp_avg=25) -> dict:
+        """Mesmo contrato de IrrigationPredictor.predict_batch (arrays NumPy de tamanho N)"""
+        if hasattr(X, 'columns'):
+            X = feature_matrix(X, self.feature_names, hour, temp_avg)
+        probability = self.predict_proba(X)
+        classes = list(self.classes)
+        probability_yes = probability[:, classes.index(1)] if 1 in classes else np.zeros(len(probability))
+        probability_no = probability[:, classes.index(0)] if 0 in classes else 1.0 - probability_yes
+        return {
+            'irrigation_needed': self.classes[probability.argmax(axis=1)].astype(bool)
+                                 if len(probability) else np.empty(0, dtype=bool),
+            'probability_no': probability_no,
+            'probability_yes': probability_yes,
+            'confidence': probability.max(axis=1)
+        }
+
+def compare_with_sklearn(model, scaler, compiled: CompiledModel, X) -> dict:
+    """Maior diferença de probabilidade e concordância de rótulos contra o sklearn"""
+    import time
+
+    started = time.perf_counter()
+    expected = model.predict_proba(scaler.transform(np.asarray(X, dtype=np.float64)))
+    sklearn_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    actual = compiled.predict_proba(X)
+    compiled_seconds = time.perf_counter() - started
+
+    return {'rows': len(X), 'max_abs_diff': float(np.abs(expected - actual).max()),
+            'label_agreement': float((expected.argmax(axis=1) == actual.argmax(axis=1)).mean()),
+            'sklearn_seconds': round(sklearn_seconds, 4),
+            'compiled_seconds': round(compiled_seconds, 4)}
+
+if __name__ == "__main__":
+    import sys
+    import time
+
+    path = sys.argv[1] if len(sys.argv) > 1 else 'farmtech_irrigation_model.pkl'
+    started = time.perf_counter()
+    compiled = CompiledModel.load(path)
+    print(f"⚡ {compiled.model_type} ({compiled.kind}) carregado em "
+          f"{(time.perf_counter() - started) * 1000:.1f} ms sem scikit-learn")
+
+    rng = np.random.default_rng(42)
+    size = 100_000
+    features = np.column_stack([rng.uniform(10, 90, size), rng.normal(6.8, 0.8, size),
+                                rng.integers(0, 2, size), rng.integers(0, 2, size),
+                                rng.integers(0, 24, size), rng.normal(25, 4, size)])
+    started = time.perf_counter()
+    result = compiled.predict_batch(features)
+    elapsed = time.perf_counter() - started
+    print(f"🔮 {size} leituras em {elapsed:.3f}s ({elapsed / size * 1e6:.2f} µs por linha), "
+          f"irrigar: {result['irrigation_needed'].mean():.1%}")
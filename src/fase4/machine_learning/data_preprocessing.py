@@ -10,28 +10,53 @@ import os
 # Adicionar o caminho para importar database_manager
 sys.path.append(os.path.join(os.path.dirname(__file__), '../../../src/fase3/python'))
 from database_manager import FarmTechDatabase
+from config.storage import ArchiveSensorStorage
+
+# Colunas do arquivo colunar usadas no treino (as mesmas do banco da Fase 3)
+ARCHIVE_TRAINING_COLUMNS = ['id', 'timestamp', 'humidity', 'ph_level', 'phosphorus',
+                            'potassium', 'pump_status', 'location']
 
 class DataPreprocessor:
-    def __init__(self):
+    def __init__(self, storage=None):
+        # Qualquer motor do protocolo SensorStorage; padrão: banco SQLite da Fase 3
+        self.storage = storage
         self.scaler = StandardScaler()
         self.imputer = SimpleImputer(strategy='mean')
         self.label_encoder = LabelEncoder()
         
-    def load_sensor_data(self, limit=1000):
-        """Carrega dados dos sensores do banco de dados"""
+    def load_sensor_data(self, limit=1000, archive_dir=None, start=None, end=None):
+        """Carrega dados dos sensores do banco de dados (ou do arquivo colunar)"""
+        if archive_dir:
+            return self.load_archived_sensor_data(archive_dir, start, end)
+        
         print("📊 Carregando dados dos sensores...")
         
-        db = FarmTechDatabase()
-        data = db.get_sensor_data(limit)
+        storage = self.storage or FarmTechDatabase()
+        # Arrays NumPy direto do motor: nenhum dict por linha no caminho até o DataFrame
+        columns = storage.get_sensor_columns(start, end, descending=True, limit=limit, fmt='numpy')
         
-        if not data:
+        if len(columns['id']) == 0:
             print("⚠️ Nenhum dado encontrado! Gerando dados de exemplo...")
             return self.generate_sample_data()
         
-        df = pd.DataFrame(data)
+        df = pd.DataFrame(columns)
         print(f"✅ Carregados {len(df)} registros do banco de dados")
         return df
     
+    def load_archived_sensor_data(self, archive_dir, start=None, end=None):
+        """Histórico longo direto dos .npy (memmap) do arquivo colunar, sem SQLite"""
+        print(f"🧊 Carregando histórico do arquivo colunar: {archive_dir}")
+        
+        data = ArchiveSensorStorage(archive_dir).get_sensor_columns(start, end, fmt='numpy')
+        if len(data['id']) == 0:
+            print("⚠️ Arquivo colunar vazio! Gerando dados de exemplo...")
+            return self.generate_sample_data()
+        
+        # Mesmas colunas da leitura pelo SQLite (o arquivo pode ter as colunas extras do schema aprimorado)
+        df = pd.DataFrame({name: data[name] for name in ARCHIVE_TRAINING_COLUMNS})
+        print(f"✅ Carregados {len(df)} registros do arquivo colunar")
+        return df
+    
     def generate_sample_data(self, n_samples=1000):
         """Gera dados de exemplo para desenvolvimento"""
         print(f"🔄 Gerando {n_samples} amostras de exemplo...")
@@ -226,12 +251,15 @@ class DataPreprocessor:
         
         return stats
     
-    def prepare_complete_dataset(self):
-        """Pipeline completo de preparação de dados"""
+    def prepare_complete_dataset(self, archive_dir=None, start=None, end=None):
+        """Pipeline completo de preparação de dados
+        
+        Com archive_dir, treina sobre o histórico do arquivo colunar em [start, end).
+        """
         print("🔄 Executando pipeline completo de preparação...")
         
         # Carregar dados
-        df = self.load_sensor_data()
+        df = self.load_sensor_data(archive_dir=archive_dir, start=start, end=end)
         
         # Adicionar features
         df = self.add_time_features(df)
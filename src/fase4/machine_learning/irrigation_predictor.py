@@ -10,14 +10,19 @@ import matplotlib.pyplot as plt
 import seaborn as sns
 from datetime import datetime, timedelta
 import warnings
+from compiled_model import feature_matrix, export_compiled_model
 warnings.filterwarnings('ignore')
 
+# Queda de umidade do solo assumida por hora sem irrigação (pontos percentuais)
+HUMIDITY_DECAY_PER_HOUR = 2.0
+
 class IrrigationPredictor:
     def __init__(self):
         self.model = None
         self.scaler = StandardScaler()
         self.feature_names = ['humidity', 'ph_level', 'phosphorus', 'potassium', 'hour', 'temp_avg']
         self.model_trained = False
+        self.model_version = None
         
     def generate_training_data(self, n_samples=2000):
         """Gera dados sintéticos para treinamento baseados em padrões reais"""
@@ -136,59 +141,139 @@ class IrrigationPredictor:
         self.model_trained = True
         return best_score
     
-    def predict_irrigation(self, humidity, ph_level, phosphorus, potassium, hour=None, temp_avg=25):
-        """Prediz se irrigação é necessária"""
+    def predict_batch(self, X, hour=None, temp_avg=25):
+        """Prediz N leituras de uma vez: um transform e um único predict_proba
+        
+        X: DataFrame (colunas de feature_names, ou leituras com timestamp/temperature)
+        ou ndarray N x 6. Os rótulos saem do argmax das probabilidades, sem uma
+        segunda passada pelo modelo. Retorna arrays NumPy de tamanho N.
+        """
         if not self.model_trained:
             print("⚠️ Modelo não treinado! Treinando agora...")
             self.train_model()
         
+        features = feature_matrix(X, self.feature_names, hour, temp_avg)
+        if len(features) == 0:
+            empty = np.empty(0, dtype=np.float64)
+            return {'irrigation_needed': np.empty(0, dtype=bool), 'probability_no': empty,
+                    'probability_yes': empty, 'confidence': empty}
+        
+        probability = self.model.predict_proba(self.scaler.transform(features))
+        classes = list(self.model.classes_)
+        probability_yes = probability[:, classes.index(1)] if 1 in classes else np.zeros(len(features))
+        probability_no = probability[:, classes.index(0)] if 0 in classes else 1.0 - probability_yes
+        labels = self.model.classes_[probability.argmax(axis=1)]
+        
+        return {
+            'irrigation_needed': labels.astype(bool),
+            'probability_no': probability_no,
+            'probability_yes': probability_yes,
+            'confidence': probability.max(axis=1)
+        }
+    
+    def predict_irrigation(self, humidity, ph_level, phosphorus, potassium, hour=None, temp_avg=25):
+        """Prediz se irrigação é necessária (uma leitura, via predict_batch)"""
         if hour is None:
             hour = datetime.now().hour
         
-        # Preparar dados
-        features = np.array([[humidity, ph_level, phosphorus, potassium, hour, temp_avg]])
-        features_scaled = self.scaler.transform(features)
-        
-        # Predição
-        prediction = self.model.predict(features_scaled)[0]
-        probability = self.model.predict_proba(features_scaled)[0]
+        result = self.predict_batch(np.array([[humidity, ph_level, phosphorus, potassium, hour, temp_avg]]))
         
         return {
-            'irrigation_needed': bool(prediction),
-            'probability_no': probability[0],
-            'probability_yes': probability[1],
-            'confidence': max(probability)
+            'irrigation_needed': bool(result['irrigation_needed'][0]),
+            'probability_no': float(result['probability_no'][0]),
+            'probability_yes': float(result['probability_yes'][0]),
+            'confidence': float(result['confidence'][0])
         }
     
+    def forecast_horizon(self, current, hours_ahead=6, temperatures=None, start=None,
+                         humidity_decay=HUMIDITY_DECAY_PER_HOUR):
+        """Previsão de irrigação para vários locais × horas em uma única chamada ao modelo
+        
+        current: DataFrame com a leitura atual de cada local (humidity, ph_level,
+        phosphorus, potassium e, opcionais, location e temperature).
+        temperatures: temperatura por hora do horizonte, (hours_ahead,) comum a todos
+        ou (locais, hours_ahead); NaN/None cai para a temperatura atual do local (ou 25).
+        Retorna um DataFrame com uma linha por (local, hora).
+        """
+        start = start or datetime.now()
+        current = current.reset_index(drop=True)
+        n_locations = len(current)
+        offsets = np.arange(1, hours_ahead + 1)
+        
+        # Grade (local, hora) achatada: local varia devagar, hora varia rápido
+        base_humidity = current['humidity'].to_numpy(dtype=np.float64)
+        humidity = np.maximum(10, base_humidity[:, None] - offsets[None, :] * humidity_decay)
+        
+        fallback = (pd.to_numeric(current['temperature'], errors='coerce').fillna(25).to_numpy()
+                    if 'temperature' in current.columns else np.full(n_locations, 25.0))
+        temp = np.broadcast_to(fallback[:, None], (n_locations, hours_ahead)).copy()
+        if temperatures is not None:
+            forecast = np.broadcast_to(np.asarray(temperatures, dtype=np.float64),
+                                       (n_locations, hours_ahead))
+            temp = np.where(np.isnan(forecast), temp, forecast)
+        
+        future_hours = (start.hour + offsets) % 24
+        grid = np.column_stack([
+            humidity.ravel(),
+            np.repeat(current['ph_level'].to_numpy(dtype=np.float64), hours_ahead),
+            np.repeat(current['phosphorus'].to_numpy(dtype=np.float64), hours_ahead),
+            np.repeat(current['potassium'].to_numpy(dtype=np.float64), hours_ahead),
+            np.tile(future_hours, n_locations),
+            temp.ravel()
+        ])
+        result = self.predict_batch(grid)
+        
+        locations = (current['location'].to_numpy() if 'location' in current.columns
+                     else np.arange(n_locations))
+        return pd.DataFrame({
+            'location': np.repeat(locations, hours_ahead),
+            'hour_offset': np.tile(offsets, n_locations),
+            'future_hour': np.tile(future_hours, n_locations),
+            'predicted_humidity': grid[:, 0],
+            'temp_avg': grid[:, 5],
+            'irrigation_needed': result['irrigation_needed'],
+            'probability_yes': result['probability_yes'],
+            'confidence': result['confidence']
+        })
+    
     def predict_next_hours(self, current_humidity, current_ph, current_phosphorus, 
-                          current_potassium, hours_ahead=6):
-        """Prediz necessidade de irrigação para as próximas horas"""
-        predictions = []
+                          current_potassium, hours_ahead=6, temperatures=None):
+        """Prediz necessidade de irrigação para as próximas horas (um local, via forecast_horizon)"""
+        current = pd.DataFrame({'humidity': [current_humidity], 'ph_level': [current_ph],
+                                'phosphorus': [current_phosphorus], 'potassium': [current_potassium]})
+        horizon = self.forecast_horizon(current, hours_ahead, temperatures)
         
-        for hour_offset in range(1, hours_ahead + 1):
-            future_hour = (datetime.now().hour + hour_offset) % 24
-            
-            # Simular mudanças graduais na umidade
-            humidity_decay = current_humidity - (hour_offset * 2)  # Umidade diminui ~2% por hora
-            humidity_decay = max(10, humidity_decay)
-            
-            pred = self.predict_irrigation(
-                humidity=humidity_decay,
-                ph_level=current_ph,
-                phosphorus=current_phosphorus,
-                potassium=current_potassium,
-                hour=future_hour
-            )
-            
-            predictions.append({
-                'hour_offset': hour_offset,
-                'future_hour': future_hour,
-                'predicted_humidity': humidity_decay,
-                'irrigation_needed': pred['irrigation_needed'],
-                'confidence': pred['confidence']
-            })
-        
-        return predictions
+        return [{
+            'hour_offset': int(row.hour_offset),
+            'future_hour': int(row.future_hour),
+            'predicted_humidity': float(row.predicted_humidity),
+            'irrigation_needed': bool(row.irrigation_needed),
+            'confidence': float(row.confidence)
+        } for row in horizon.itertuples(index=False)]
+    
+    def benchmark_predict_batch(self, sizes=(1, 1_000, 100_000), repeats=3):
+        """Latência por linha de predict_batch para cada tamanho de lote"""
+        import time
+        
+        if not self.model_trained:
+            self.train_model()
+        
+        rng = np.random.default_rng(42)
+        results = []
+        for size in sizes:
+            features = np.column_stack([
+                rng.uniform(10, 90, size), rng.normal(6.8, 0.8, size),
+                rng.integers(0, 2, size), rng.integers(0, 2, size),
+                rng.integers(0, 24, size), rng.normal(25, 4, size)
+            ])
+            best = float('inf')
+            for _ in range(repeats):
+                started = time.perf_counter()
+                self.predict_batch(features)
+                best = min(best, time.perf_counter() - started)
+            results.append({'batch_size': size, 'seconds': round(best, 4),
+                            'us_per_row': round(best / size * 1e6, 2)})
+        return results
     
     def save_model(self, filepath='farmtech_irrigation_model.pkl'):
         """Salva o modelo treinado"""
@@ -201,13 +286,21 @@ class IrrigationPredictor:
             }
             joblib.dump(model_data, filepath)
             print(f"💾 Modelo salvo em: {filepath}")
+            
+            # Artefato só-NumPy para gateways e ingestão (sem importar o sklearn)
+            try:
+                compiled = export_compiled_model(self.model, self.scaler, self.feature_names,
+                                                 filepath, self.model_version)
+                print(f"⚡ Modelo compilado salvo em: {compiled}")
+            except ValueError as e:
+                print(f"⚠️ Exportação compilada ignorada: {e}")
         else:
             print("⚠️ Modelo não treinado ainda!")
     
-    def load_model(self, filepath='farmtech_irrigation_model.pkl'):
-        """Carrega modelo salvo"""
+    def load_model(self, filepath='farmtech_irrigation_model.pkl', mmap_mode=None):
+        """Carrega modelo salvo (mmap_mode='r' mapeia os arrays em vez de copiá-los)"""
         try:
-            model_data = joblib.load(filepath)
+            model_data = joblib.load(filepath, mmap_mode=mmap_mode)
             self.model = model_data['model']
             self.scaler = model_data['scaler']
             self.feature_names = model_data['feature_names']
@@ -265,4 +358,12 @@ if __name__ == "__main__":
     for pred in future_predictions:
         status = "✅ IRRIGAR" if pred['irrigation_needed'] else "⏸️ AGUARDAR"
         print(f"Em {pred['hour_offset']}h (às {pred['future_hour']:02d}:00): {status} "
-              f"(Umidade: {pred['predicted_humidity']:.1f}%, Confiança: {pred['confidence']:.1%})")
\ No newline at end of file
+              f"(Umidade: {pred['predicted_humidity']:.1f}%, Confiança: {pred['confidence']:.1%})")
+    
+    # Latência por linha em lote
+    print("\n⚡ BENCHMARK DE PREDIÇÃO EM LOTE")
+    print("=" * 40)
+    
+    for result in predictor.benchmark_predict_batch():
+        print(f"Lote de {result['batch_size']:>7}: {result['seconds']:.4f}s "
+              f"({result['us_per_row']:.2f} µs por linha)")
\ No newline at end of file
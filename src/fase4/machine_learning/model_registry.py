@@ -0,0 +1,125 @@
+import os
+import sys
+import hashlib
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+# Adicionar a raiz do projeto para importar config/database.py
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..'))
+sys.path.append(ROOT_DIR)
+from config.database import MLConfig
+
+from irrigation_predictor import IrrigationPredictor
+
+logger = logging.getLogger(__name__)
+
+# Como detectar que o arquivo do modelo mudou: 'mtime' (stat, custo ~zero) ou 'hash' (lê o arquivo)
+STALENESS_CHECKS = ('mtime', 'hash')
+
+def resolve_model_path(path: str = None) -> str:
+    """Caminho absoluto do modelo; relativo = relativo à raiz do projeto (padrão: MLConfig.model_path)"""
+    path = path or MLConfig.from_env().model_path
+    return path if os.path.isabs(path) else os.path.join(ROOT_DIR, path)
+
+def file_digest(path: str, chunk_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as handle:
+        for chunk in iter(lambda: handle.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+@dataclass
+class RegistryEntry:
+    predictor: IrrigationPredictor
+    signature: Tuple
+    digest: str
+
+class ModelRegistry:
+    """Cache de processo dos modelos salvos: cada versão é carregada uma única vez
+
+    Os arrays do modelo são mapeados em memória (joblib mmap_mode), então
+    processos que carregam o mesmo arquivo compartilham as páginas. A cada get()
+    só um stat (ou hash) verifica se o arquivo mudou; o registry nunca treina -
+    arquivo ausente devolve None e o treino fica com train_ml_model.py.
+    """
+
+    def __init__(self, check: str = 'mtime', mmap_mode: Optional[str] = 'r'):
+        if check not in STALENESS_CHECKS:
+            raise ValueError(f"Verificação inválida: {check} (use {', '.join(STALENESS_CHECKS)})")
+        self.check = check
+        self.mmap_mode = mmap_mode
+        self._entries: Dict[str, RegistryEntry] = {}
+        self._lock = threading.Lock()
+
+    def _signature(self, path: str) -> Tuple:
+        stat = os.stat(path)
+        if self.check == 'hash':
+            return (file_digest(path),)
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def get(self, path: str = None) -> Optional[IrrigationPredictor]:
+        """Preditor carregado de path (recarrega só se o arquivo mudou); None se não existir"""
+        path = resolve_model_path(path)
+        try:
+            signature = self._signature(path)
+        except FileNotFoundError:
+            logger.warning(f"⚠️ Modelo não encontrado: {path} (execute train_ml_model.py)")
+            return None
+
+        entry = self._entries.get(path)
+        if entry is not None and entry.signature == signature:
+            return entry.predictor
+
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry.signature == signature:
+                return entry.predictor
+
+            digest = signature[0] if self.check == 'hash' else file_digest(path)
+            # Mesmo conteúdo com outro mtime (ex.: cópia): reaproveita a versão carregada
+            if entry is not None and entry.digest == digest:
+                self._entries[path] = RegistryEntry(entry.predictor, signature, digest)
+                return entry.predictor
+
+            predictor = IrrigationPredictor()
+            predictor.load_model(path, mmap_mode=self.mmap_mode)
+            if not predictor.model_trained:
+                return entry.predictor if entry is not None else None
+            predictor.model_version = f"{type(predictor.model).__name__}@{digest[:12]}"
+
+            self._entries[path] = RegistryEntry(predictor, signature, digest)
+            logger.info(f"🧠 Modelo {predictor.model_version} carregado de {path}")
+            return predictor
+
+    def invalidate(self, path: str = None):
+        """Descarta uma entrada (ou todas) para forçar recarga no próximo get()"""
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(resolve_model_path(path), None)
+
+    def loaded(self) -> Dict[str, str]:
+        return {path: entry.predictor.model_version for path, entry in self._entries.items()}
+
+# Registry compartilhado pelo processo (dashboard, ingestão e serviços)
+_registry = ModelRegistry()
+
+def get_predictor(path: str = None) -> Optional[IrrigationPredictor]:
+    return _registry.get(path)
+
+def get_registry() -> ModelRegistry:
+    return _registry
+
+if __name__ == "__main__":
+    import time
+    logging.basicConfig(level=logging.INFO)
+
+    for attempt in ('frio', 'quente'):
+        started = time.perf_counter()
+        predictor = get_predictor()
+        elapsed = time.perf_counter() - started
+        print(f"⏱️ get_predictor ({attempt}): {elapsed * 1000:.2f} ms -> "
+              f"{predictor.model_version if predictor else 'sem modelo'}")
@@ -1,27 +1,60 @@
 import numpy as np
 import pandas as pd
-from sklearn.model_selection import train_test_split, cross_val_score, GridSearchCV
+from sklearn.model_selection import train_test_split, GridSearchCV, StratifiedKFold
+from sklearn.base import clone
 from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
 from sklearn.linear_model import LogisticRegression
 from sklearn.svm import SVC
 from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, confusion_matrix
 from sklearn.preprocessing import StandardScaler
 import joblib
+from joblib import Parallel, delayed
 import matplotlib.pyplot as plt
 import seaborn as sns
 from datetime import datetime
+from contextlib import contextmanager
+import os
+import sys
+import time
 import warnings
 warnings.filterwarnings('ignore')
 
+# Adicionar a raiz do projeto para importar config/database.py
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../..'))
+from config.database import MLConfig
+
 from data_preprocessing import DataPreprocessor
+from compiled_model import export_compiled_model
+
+# Folds da validação cruzada de cada candidato
+CV_FOLDS = 5
+
+def _fit_and_score(name, fold, model, X, y, train_index, test_index):
+    """Tarefa do pool: ajusta um candidato (fold=None = treino completo) e pontua o fold"""
+    started = time.perf_counter()
+    model.fit(X[train_index], y[train_index])
+    score = model.score(X[test_index], y[test_index]) if test_index is not None else None
+    return name, fold, model, score, time.perf_counter() - started
 
 class ModelTrainer:
-    def __init__(self):
+    def __init__(self, n_jobs: int = None):
         self.models = {}
         self.best_model = None
         self.scaler = StandardScaler()
         self.preprocessor = DataPreprocessor()
         self.feature_names = []
+        # Processos para candidatos e folds (padrão: MLConfig.n_jobs / ML_N_JOBS)
+        self.n_jobs = n_jobs if n_jobs is not None else MLConfig.from_env().n_jobs
+        self.stage_times = {}
+    
+    @contextmanager
+    def _stage(self, name):
+        """Registra o tempo de parede de uma etapa do pipeline em stage_times"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stage_times[name] = time.perf_counter() - started
         
     def initialize_models(self):
         """Inicializa diferentes modelos para comparação"""
@@ -55,8 +88,13 @@ class ModelTrainer:
         print(f"🤖 Modelos inicializados: {', '.join(self.models.keys())}")
     
     def train_and_evaluate_models(self, X, y):
-        """Treina e avalia todos os modelos"""
-        print("🎯 Treinando e avaliando modelos...")
+        """Treina e avalia todos os modelos
+        
+        Ajuste no conjunto de treino e os 5 folds da validação cruzada de cada
+        candidato rodam como tarefas independentes em um único pool de processos
+        (n_jobs). O modelo escolhido é o próprio ajuste de treino, sem reajuste.
+        """
+        print(f"🎯 Treinando e avaliando modelos ({self.n_jobs} processo(s))...")
         
         # Dividir dados
         X_train, X_test, y_train, y_test = train_test_split(
@@ -66,14 +104,34 @@ class ModelTrainer:
         # Escalar features
         X_train_scaled = self.scaler.fit_transform(X_train)
         X_test_scaled = self.scaler.transform(X_test)
+        y_train = np.asarray(y_train)
+        
+        # Mesmos folds que cross_val_score(cv=5) usaria para classificação
+        folds = list(StratifiedKFold(n_splits=CV_FOLDS).split(X_train_scaled, y_train))
+        all_rows = np.arange(len(y_train))
+        tasks = [(name, None, all_rows, None) for name in self.models]
+        tasks += [(name, fold, train_index, test_index)
+                  for name in self.models for fold, (train_index, test_index) in enumerate(folds)]
+        
+        outcomes = Parallel(n_jobs=self.n_jobs)(
+            delayed(_fit_and_score)(name, fold, clone(self.models[name]), X_train_scaled, y_train,
+                                    train_index, test_index)
+            for name, fold, train_index, test_index in tasks
+        )
+        
+        fitted, cv_scores, fit_seconds = {}, {name: [] for name in self.models}, {}
+        for name, fold, model, score, seconds in outcomes:
+            fit_seconds[name] = fit_seconds.get(name, 0.0) + seconds
+            if fold is None:
+                fitted[name] = model
+            else:
+                cv_scores[name].append(score)
         
         results = {}
         
-        for name, model in self.models.items():
-            print(f"\n🔄 Treinando {name}...")
-            
-            # Treinar modelo
-            model.fit(X_train_scaled, y_train)
+        for name in self.models:
+            model = self.models[name] = fitted[name]
+            cv = np.array(cv_scores[name])
             
             # Predições
             y_pred = model.predict(X_test_scaled)
@@ -85,26 +143,26 @@ class ModelTrainer:
             recall = recall_score(y_test, y_pred, average='weighted')
             f1 = f1_score(y_test, y_pred, average='weighted')
             
-            # Cross-validation
-            cv_scores = cross_val_score(model, X_train_scaled, y_train, cv=5)
-            
             results[name] = {
                 'Model': model,
                 'Accuracy': accuracy,
                 'Precision': precision,
                 'Recall': recall,
                 'F1-Score': f1,
-                'CV_Mean': cv_scores.mean(),
-                'CV_Std': cv_scores.std(),
+                'CV_Mean': cv.mean(),
+                'CV_Std': cv.std(),
+                'Fit_Seconds': fit_seconds[name],
                 'Predictions': y_pred,
                 'Probabilities': y_pred_proba
             }
             
+            print(f"\n🔄 {name}:")
             print(f"  Acurácia: {accuracy:.3f}")
             print(f"  Precisão: {precision:.3f}")
             print(f"  Recall: {recall:.3f}")
             print(f"  F1-Score: {f1:.3f}")
-            print(f"  CV Score: {cv_scores.mean():.3f} ± {cv_scores.std():.3f}")
+            print(f"  CV Score: {cv.mean():.3f} ± {cv.std():.3f}")
+            print(f"  Tempo de ajuste (soma dos processos): {fit_seconds[name]:.2f}s")
         
         # Encontrar melhor modelo
         best_model_name = max(results.keys(), key=lambda x: results[x]['F1-Score'])
@@ -159,7 +217,7 @@ class ModelTrainer:
             param_grids[model_name],
             cv=5,
             scoring='f1_weighted',
-            n_jobs=-1,
+            n_jobs=self.n_jobs,
             verbose=1
         )
         
@@ -251,15 +309,28 @@ class ModelTrainer:
             
             joblib.dump(model_data, filepath)
             print(f"💾 Melhor modelo salvo em: {filepath}")
+            
+            try:
+                compiled = export_compiled_model(self.best_model, self.scaler,
+                                                 self.feature_names, filepath)
+                print(f"⚡ Modelo compilado salvo em: {compiled}")
+            except ValueError as e:
+                print(f"⚠️ Exportação compilada ignorada: {e}")
         else:
             print("❌ Nenhum modelo foi treinado ainda!")
     
-    def complete_training_pipeline(self):
-        """Pipeline completo de treinamento"""
+    def complete_training_pipeline(self, archive_dir=None, start=None, end=None):
+        """Pipeline completo de treinamento
+        
+        Com archive_dir, treina sobre meses de histórico do arquivo colunar em
+        [start, end). O tempo de parede de cada etapa fica em stage_times.
+        """
         print("🚀 Iniciando pipeline completo de treinamento...")
+        self.stage_times = {}
         
         # Preparar dados
-        data_result = self.preprocessor.prepare_complete_dataset()
+        with self._stage('preparacao'):
+            data_result = self.preprocessor.prepare_complete_dataset(archive_dir, start, end)
         X = data_result['features']
         y = data_result['target']
         self.feature_names = data_result['feature_names']
@@ -272,17 +343,24 @@ class ModelTrainer:
         self.initialize_models()
         
         # Treinar e avaliar
-        results, X_test, y_test = self.train_and_evaluate_models(X, y)
+        with self._stage('comparacao'):
+            results, X_test, y_test = self.train_and_evaluate_models(X, y)
         
         # Gerar relatório
-        comparison_df = self.generate_performance_report(results, X_test, y_test)
+        with self._stage('relatorio'):
+            comparison_df = self.generate_performance_report(results, X_test, y_test)
         
         # Analisar importância das features
-        best_model_name = comparison_df.loc[comparison_df['F1-Score'].idxmax(), 'Modelo']
-        importance_df = self.analyze_feature_importance(self.best_model, self.feature_names)
+        with self._stage('importancia'):
+            importance_df = self.analyze_feature_importance(self.best_model, self.feature_names)
         
         # Salvar modelo
-        self.save_best_model()
+        with self._stage('salvamento'):
+            self.save_best_model()
+        
+        print("\n⏱️ Tempo por etapa:")
+        for stage, seconds in self.stage_times.items():
+            print(f"  {stage:<12}: {seconds:.2f}s")
         
         print("\n🎉 Pipeline de treinamento concluído com sucesso!")
         
@@ -290,7 +368,8 @@ class ModelTrainer:
             'results': results,
             'comparison': comparison_df,
             'feature_importance': importance_df,
-            'best_model': self.best_model
+            'best_model': self.best_model,
+            'stage_times': self.stage_times
         }
 
 # Execução principal
@@ -1,8 +1,9 @@
 import sys
 import os
-sys.path.append('scr/fase4/machine_learning')
+sys.path.append(os.path.join(os.path.dirname(__file__), 'machine_learning'))
 
 from irrigation_predictor import IrrigationPredictor
+from model_registry import resolve_model_path
 
 def train_model():
     print("🤖 Treinando modelo de Machine Learning...")
@@ -11,7 +12,10 @@ def train_model():
     accuracy = predictor.train_model()
     
     if accuracy:
-        predictor.save_model('farmtech_irrigation_model.pkl')
+        # Mesmo caminho lido pelo registry (MLConfig.model_path / ML_MODEL_PATH)
+        model_path = resolve_model_path()
+        os.makedirs(os.path.dirname(model_path), exist_ok=True)
+        predictor.save_model(model_path)
         print(f"✅ Modelo treinado com sucesso! Acurácia: {accuracy:.2%}")
     else:
         print("❌ Erro no treinamento do modelo")
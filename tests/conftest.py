@@ -0,0 +1,9 @@
+import os
+import sys
+
+# Os módulos de cada fase se importam como irmãos e buscam config/ na raiz
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(ROOT_DIR, 'src', 'fase3', 'python'))
+sys.path.insert(0, os.path.join(ROOT_DIR, 'src', 'fase4', 'integration'))
+sys.path.insert(0, os.path.join(ROOT_DIR, 'src', 'fase4', 'machine_learning'))
+sys.path.insert(0, ROOT_DIR)
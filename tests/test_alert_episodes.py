@@ -0,0 +1,81 @@
+import sqlite3
+
+import pytest
+
+from database_enhanced import EnhancedFarmTechDatabase
+
+EPISODES_SQL = '''
+    SELECT location, severity, occurrence_count, resolved_at IS NOT NULL
+    FROM system_alerts WHERE alert_group = 'humidity' ORDER BY id'''
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / 'episodes.db')
+
+@pytest.fixture
+def db(path):
+    database = EnhancedFarmTechDatabase(path)
+    yield database
+    database.close()
+
+def readings(humidity, location='Campo_Principal', start_minute: int = 0) -> list:
+    # Só o grupo de umidade dispara: pH e nutrientes dentro da faixa
+    return [{'humidity': value, 'ph_level': 6.5, 'phosphorus': 1, 'potassium': 1,
+             'pump_status': 0, 'location': location,
+             'timestamp': f'2024-07-01 10:{start_minute + i:02d}:00'}
+            for i, value in enumerate(humidity)]
+
+def episodes(db) -> list:
+    with db._get_connection() as conn:
+        db.alert_manager.flush(conn.cursor())
+        return conn.execute(EPISODES_SQL).fetchall()
+
+def test_repeated_readings_coalesce_into_one_episode(db):
+    db.insert_sensor_batch(readings([24.0, 24.0, 23.0, 50.0, 24.0]))
+
+    assert episodes(db) == [('Campo_Principal', 'WARNING', 3, 1),
+                            ('Campo_Principal', 'WARNING', 1, 0)]
+    counters = db.alert_manager.counters
+    assert (counters['opened'], counters['resolved'], counters['coalesced']) == (2, 1, 2)
+
+def test_escalation_reopens_at_higher_severity(db):
+    db.insert_sensor_batch(readings([24.0, 15.0, 24.0, 50.0]))
+
+    # A queda de CRITICAL para WARNING continua no episódio crítico
+    assert episodes(db) == [('Campo_Principal', 'WARNING', 1, 1),
+                            ('Campo_Principal', 'CRITICAL', 2, 1)]
+    assert db.alert_manager.counters['escalated'] == 1
+
+def test_episode_spans_batches(db):
+    db.insert_sensor_batch(readings([24.0]))
+    db.insert_sensor_batch(readings([24.0, 24.0], start_minute=1))
+    db.insert_enhanced_sensor_data(22.0, 6.5, True, True, False)
+
+    assert episodes(db) == [('Campo_Principal', 'WARNING', 4, 0)]
+
+def test_open_episodes_survive_restart(path):
+    db = EnhancedFarmTechDatabase(path)
+    db.insert_sensor_batch(readings([24.0, 24.0]))
+    db.close()
+
+    db = EnhancedFarmTechDatabase(path)
+    db.insert_sensor_batch(readings([24.0], start_minute=2))
+    assert [episode.count for episode in db.alert_manager.open_episodes()] == [3]
+    db.close()
+
+    conn = sqlite3.connect(path)
+    assert conn.execute(EPISODES_SQL).fetchall() == [('Campo_Principal', 'WARNING', 3, 0)]
+    conn.close()
+
+def test_episodes_are_per_location(db):
+    batch = readings([24.0, 24.0], location='Estufa') + readings([24.0], location='Campo_Norte')
+    db.insert_sensor_batch(batch)
+
+    assert sorted(episodes(db)) == [('Campo_Norte', 'WARNING', 1, 0), ('Estufa', 'WARNING', 2, 0)]
+
+def test_failed_batch_does_not_leave_ghost_episodes(db):
+    with pytest.raises(sqlite3.IntegrityError):
+        db.insert_sensor_batch(readings([24.0]) + [{'humidity': None, 'ph_level': 6.5}])
+
+    db.insert_sensor_batch(readings([24.0]))
+    assert episodes(db) == [('Campo_Principal', 'WARNING', 1, 0)]
@@ -0,0 +1,136 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from config.database import SensorConfig
+from alert_rules import AlertRuleEngine, ALERT_RULES, thresholds_from_sensor_config
+
+def make_engine(hysteresis: float = 0.0, overrides=None) -> AlertRuleEngine:
+    thresholds = thresholds_from_sensor_config(SensorConfig())
+    thresholds.update({'humidity_warning': 40.0, 'humidity_hysteresis': hysteresis})
+    return AlertRuleEngine(thresholds, overrides)
+
+def batch(humidity, location=None, ph=6.5) -> dict:
+    size = len(humidity)
+    data = {'humidity': list(humidity), 'ph_level': [ph] * size,
+            'phosphorus': [1] * size, 'potassium': [1] * size}
+    if location is not None:
+        data['location'] = list(location) if not isinstance(location, str) else [location] * size
+    return data
+
+def test_most_severe_rule_in_group_wins():
+    masks = make_engine().evaluate(batch([10.0, 30.0, 50.0]))
+
+    assert masks['humidity_critical'].tolist() == [True, False, False]
+    assert masks['humidity_low'].tolist() == [False, True, False]
+
+def test_boolean_and_range_rules():
+    data = batch([50.0, 50.0, 50.0])
+    data['ph_level'] = [4.0, 7.9, 6.5]
+    data['potassium'] = [1, 0, None]
+
+    masks = make_engine().evaluate(data)
+    assert masks['ph_critical'].tolist() == [True, False, False]
+    assert masks['ph_out_of_range'].tolist() == [False, True, False]
+    assert masks['potassium_missing'].tolist() == [False, True, False]
+
+def test_hysteresis_holds_alert_until_value_clears_band():
+    humidity = [35.0, 42.0, 44.0, 46.0, 38.0, 41.0]
+
+    assert make_engine(0.0).evaluate(batch(humidity))['humidity_low'].tolist() == \
+        [True, False, False, False, True, False]
+    assert make_engine(5.0).evaluate(batch(humidity))['humidity_low'].tolist() == \
+        [True, True, True, False, True, True]
+
+def test_hysteresis_state_carries_across_batches():
+    engine = make_engine(5.0)
+    engine.evaluate(batch([35.0]))
+
+    assert engine.evaluate(batch([42.0]))['humidity_low'].tolist() == [True]
+    engine.reset_state()
+    assert engine.evaluate(batch([42.0]))['humidity_low'].tolist() == [False]
+
+def test_stateless_evaluation_leaves_state_alone():
+    engine = make_engine(5.0)
+    engine.evaluate(batch([35.0]))
+    engine.evaluate(batch([50.0]), stateful=False)
+
+    assert engine.evaluate(batch([42.0]))['humidity_low'].tolist() == [True]
+
+def test_hysteresis_state_is_per_location():
+    engine = make_engine(5.0)
+    masks = engine.evaluate(batch([35.0, 42.0, 42.0, 50.0, 42.0],
+                                  location=['A', 'B', 'A', 'A', 'B']))
+
+    assert masks['humidity_low'].tolist() == [True, False, True, False, False]
+
+def test_location_overrides():
+    engine = make_engine(overrides={'Estufa': {'humidity_warning': 50.0}})
+    masks = engine.evaluate(batch([45.0, 45.0], location=['Campo_Principal', 'Estufa']))
+
+    assert masks['humidity_low'].tolist() == [False, True]
+    assert engine.threshold('humidity_warning', 'Estufa') == 50.0
+
+def reference_masks(engine: AlertRuleEngine, frame: pd.DataFrame) -> dict:
+    """Avaliação linha a linha, como o motor fazia antes da vetorização"""
+    state = {}
+    masks = {rule.name: [] for rule in engine.rules}
+    for _, row in frame.iterrows():
+        fired_groups = set()
+        for rule in engine.rules:
+            value = row[rule.column]
+            threshold = lambda key: engine.threshold(key, row['location'])
+            band = threshold(rule.hysteresis) if rule.hysteresis else 0.0
+            if rule.when_false:
+                on, off = value == 0, value != 0
+            else:
+                on = (rule.below is not None and value < threshold(rule.below)) or \
+                     (rule.above is not None and value > threshold(rule.above))
+                off = (rule.below is None or value >= threshold(rule.below) + band) and \
+                      (rule.above is None or value <= threshold(rule.above) - band)
+            key = (rule.name, row['location'])
+            if band:
+                state[key] = True if on else False if off else state.get(key, False)
+                active = state[key]
+            else:
+                active = bool(on)
+            active = active and rule.group not in fired_groups
+            if active:
+                fired_groups.add(rule.group)
+            masks[rule.name].append(active)
+    return masks
+
+def test_vectorized_matches_row_by_row_reference():
+    rng = np.random.default_rng(3)
+    size = 400
+    frame = pd.DataFrame({
+        'humidity': rng.uniform(15, 60, size).round(1),
+        'ph_level': rng.uniform(4.5, 9.0, size).round(2),
+        'phosphorus': rng.integers(0, 2, size),
+        'potassium': rng.integers(0, 2, size),
+        'location': rng.choice(['A', 'B', 'C'], size)
+    })
+    overrides = {'B': {'humidity_warning': 45.0, 'ph_hysteresis': 0.3}}
+    engine = make_engine(3.0, overrides)
+
+    masks = engine.evaluate(frame)
+    expected = reference_masks(make_engine(3.0, overrides), frame)
+    for rule in ALERT_RULES:
+        assert masks[rule.name].tolist() == expected[rule.name], rule.name
+
+def test_from_config_reads_system_config_overrides():
+    class ConfigSource:
+        def get_config_values(self):
+            return {'humidity_min_threshold': 35, 'humidity_warning@Estufa': '50',
+                    'humidity_hysteresis': 2.5, 'alerts_enabled': True, 'unrelated': 'x'}
+
+    engine = AlertRuleEngine.from_config(ConfigSource(), SensorConfig())
+
+    assert engine.threshold('humidity_min') == 35.0
+    assert engine.threshold('humidity_hysteresis') == 2.5
+    assert engine.threshold('humidity_warning', 'Estufa') == 50.0
+    assert engine.threshold('humidity_warning') == 25.0
+
+def test_missing_threshold_is_rejected():
+    with pytest.raises(ValueError, match='humidity_critical'):
+        AlertRuleEngine({'humidity_warning': 25.0})
@@ -0,0 +1,76 @@
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from database_manager import FarmTechDatabase
+from database_enhanced import EnhancedFarmTechDatabase
+
+@pytest.fixture(params=['fase3', 'enhanced'])
+def db(request, tmp_path):
+    if request.param == 'fase3':
+        database = FarmTechDatabase(str(tmp_path / 'fase3.db'))
+    else:
+        database = EnhancedFarmTechDatabase(str(tmp_path / 'enhanced.db'))
+    yield database
+    database.close()
+
+def reading(humidity, **extra) -> dict:
+    row = {'humidity': humidity, 'ph_level': 6.5, 'phosphorus': True, 'potassium': False,
+           'pump_status': False}
+    row.update(extra)
+    return row
+
+def test_batch_returns_contiguous_id_range(db):
+    first = db.insert_sensor_batch([reading(40.0 + i) for i in range(5)])
+    second = db.insert_sensor_batch([reading(50.0 + i) for i in range(3)])
+
+    assert first == range(1, 6)
+    assert second == range(6, 9)
+    assert [db.get_sensor_by_id(record_id)['humidity'] for record_id in second] == [50.0, 51.0, 52.0]
+
+def test_empty_batch_inserts_nothing(db):
+    assert db.insert_sensor_batch([]) == range(0)
+    assert db.get_sensor_by_id(1) is None
+
+def test_dataframe_and_tuple_rows(db):
+    frame = pd.DataFrame([reading(41.0, timestamp='2024-03-01 10:00:00'),
+                          reading(42.0, timestamp='2024-03-01 11:00:00')])
+    ids = db.insert_sensor_batch(frame)
+    tuple_ids = db.insert_sensor_batch([(43.0, 7.0, 0, 1, 1)])
+
+    stored = db.get_sensor_by_id(ids[1])
+    assert stored['timestamp'] == '2024-03-01 11:00:00'
+    assert stored['phosphorus'] == 1 and stored['potassium'] == 0
+    assert stored['location'] == 'Campo_Principal'
+
+    from_tuple = db.get_sensor_by_id(tuple_ids[0])
+    assert (from_tuple['humidity'], from_tuple['ph_level'], from_tuple['pump_status']) == (43.0, 7.0, 1)
+
+def test_ph_alias_and_location(db):
+    ids = db.insert_sensor_batch([{'humidity': 45.0, 'ph': 6.1, 'phosphorus': 0, 'potassium': 0,
+                                   'pump_status': 0, 'location': 'Estufa'}])
+
+    stored = db.get_sensor_by_id(ids[0])
+    assert stored['ph_level'] == 6.1
+    assert stored['location'] == 'Estufa'
+
+def test_failed_batch_is_rolled_back(db):
+    db.insert_sensor_batch([reading(40.0)])
+
+    with pytest.raises(sqlite3.IntegrityError):
+        db.insert_sensor_batch([reading(41.0), reading(None)])
+
+    assert db.get_sensor_by_id(2) is None
+    assert db.insert_sensor_batch([reading(42.0)]) == range(2, 3)
+
+def test_enhanced_batch_evaluates_alerts(tmp_path):
+    db = EnhancedFarmTechDatabase(str(tmp_path / 'alerts.db'))
+    db.insert_sensor_batch([reading(5.0, timestamp='2024-03-01 10:00:00'),
+                            reading(50.0, timestamp='2024-03-01 10:01:00')])
+
+    with db._get_connection() as conn:
+        alerts = conn.execute('SELECT sensor_reading_id FROM system_alerts').fetchall()
+    db.close()
+
+    assert alerts and all(row[0] == 1 for row in alerts)
@@ -0,0 +1,94 @@
+import os
+import shutil
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from config.columnar_archive import ColumnarArchive
+from config.database import DatabaseConfig
+from database_enhanced import EnhancedFarmTechDatabase
+
+def month_columns(month: int, locations) -> dict:
+    # Fora de ordem de propósito: a partição é gravada ordenada por timestamp
+    days = list(range(len(locations), 0, -1))
+    return {
+        'id': np.array([month * 100 + day for day in days]),
+        'timestamp': np.array([f'2024-{month:02d}-{day:02d} 12:00:00' for day in days], dtype=object),
+        'humidity': np.array([float(day) for day in days]),
+        'location': np.array(list(locations), dtype=object)
+    }
+
+@pytest.fixture
+def archive(tmp_path):
+    archive = ColumnarArchive(str(tmp_path / 'archive'))
+    archive.write_partition('sensor_readings', '202401', '2024-01-01 00:00:00', '2024-02-01 00:00:00',
+                            month_columns(1, ['A', 'B', None, 'A']))
+    archive.write_partition('sensor_readings', '202402', '2024-02-01 00:00:00', '2024-03-01 00:00:00',
+                            month_columns(2, ['C', 'A', 'C']))
+    return archive
+
+def test_range_inside_one_partition_is_a_memmap_slice(archive):
+    data = archive.read('sensor_readings', '2024-01-02 00:00:00', '2024-01-04 00:00:00', decode=False)
+
+    assert data['humidity'].tolist() == [2.0, 3.0]
+    assert isinstance(data['humidity'], np.memmap)
+    assert data['timestamp'][0] == np.datetime64('2024-01-02T12:00:00')
+
+def test_range_across_partitions_unifies_dictionaries(archive):
+    data = archive.read('sensor_readings', datetime(2024, 1, 2), datetime(2024, 2, 3))
+
+    assert data['id'].tolist() == [102, 103, 104, 201, 202]
+    # Dicionários de janeiro (A, B) e fevereiro (A, C) unificados; NULL preservado
+    assert data['location'].tolist() == [None, 'B', 'A', 'C', 'A']
+
+def test_read_frame_uses_categoricals(archive):
+    frame = archive.read_frame('sensor_readings', columns=['id', 'location'])
+
+    assert len(frame) == 7
+    assert isinstance(frame['location'].dtype, pd.CategoricalDtype)
+    assert frame['location'].isna().sum() == 1
+
+def test_leftover_directories_are_ignored(archive, tmp_path):
+    table_dir = tmp_path / 'archive' / 'sensor_readings'
+    shutil.copytree(table_dir / '202401', table_dir / '202401.old')
+    shutil.copytree(table_dir / '202402', table_dir / '202402.tmp')
+
+    assert [meta['key'] for meta in archive.partitions('sensor_readings')] == ['202401', '202402']
+    assert len(archive.read('sensor_readings')['id']) == 7
+
+def test_rewrite_replaces_partition(archive):
+    archive.write_partition('sensor_readings', '202402', '2024-02-01 00:00:00', '2024-03-01 00:00:00',
+                            month_columns(2, ['C', 'A', 'C', 'D', 'D']))
+
+    assert archive.get_stats()['sensor_readings'] == {
+        'partitions': 2, 'rows': 9, 'archived_until': '2024-03-01 00:00:00'}
+
+def test_invalid_partition_key_rejected(archive):
+    with pytest.raises(ValueError):
+        archive.write_partition('sensor_readings', '2024-01', '2024-01-01 00:00:00',
+                                '2024-02-01 00:00:00', month_columns(1, ['A']))
+
+def test_database_archives_closed_months(tmp_path):
+    config = DatabaseConfig(archive_dir=str(tmp_path / 'db_archive'))
+    db = EnhancedFarmTechDatabase(str(tmp_path / 'archive.db'), config)
+    start = datetime(2024, 3, 20)
+    db.insert_sensor_batch([
+        {'humidity': 30.0 + i % 40, 'ph_level': 6.5, 'phosphorus': 1, 'potassium': 1,
+         'pump_status': i % 2, 'location': ['Estufa', 'Campo_Principal'][i % 2],
+         'timestamp': start + timedelta(hours=6 * i)}
+        for i in range(200)
+    ])
+
+    report = db.archive_closed_partitions(before='2024-05-01')
+    assert report['sensor_readings'] == {'partitions': 2, 'rows': 4 * 12 + 30 * 4}
+    assert db.archive_closed_partitions(before='2024-05-01')['sensor_readings']['partitions'] == 0
+
+    archived = db.get_archived_columns(start='2024-04-10', end='2024-05-01')
+    live = db.get_sensor_columns('2024-04-10', '2024-05-01', fmt='numpy')
+    assert archived['id'].tolist() == live['id'].tolist()
+    assert archived['humidity'].tolist() == live['humidity'].tolist()
+    assert archived['location'].tolist() == live['location'].tolist()
+    assert sorted(os.listdir(tmp_path / 'db_archive' / 'sensor_readings')) == ['202403', '202404']
+    db.close()
@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip('sklearn')  # só a comparação precisa do scikit-learn
+
+from sklearn.ensemble import GradientBoostingClassifier, RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.preprocessing import StandardScaler
+from sklearn.svm import SVC
+
+from compiled_model import (CompiledModel, TRAVERSAL_CHUNK_ROWS, compare_with_sklearn,
+                            compiled_path, export_compiled_model)
+
+FEATURES = ['humidity', 'ph_level', 'phosphorus', 'potassium', 'hour', 'temp_avg']
+
+def sensor_matrix(size: int, seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    # Valores com a resolução dos sensores: muitos empates exatos com os limiares
+    return np.column_stack([rng.uniform(10, 90, size).round(1), rng.normal(6.8, 0.8, size).round(2),
+                            rng.integers(0, 2, size), rng.integers(0, 2, size),
+                            rng.integers(0, 24, size), rng.normal(25, 4, size).round(1)])
+
+def labels(X: np.ndarray, classes: int = 2) -> np.ndarray:
+    y = ((X[:, 0] < 40) | ((X[:, 1] < 6.0) & (X[:, 2] == 0))).astype(int)
+    if classes == 3:
+        y = y + (X[:, 5] > 28)
+    return y
+
+@pytest.fixture(scope='module')
+def data():
+    X = sensor_matrix(1500, 0)
+    scaler = StandardScaler().fit(X)
+    return X, scaler
+
+MODELS = {
+    'forest': lambda: RandomForestClassifier(n_estimators=30, max_depth=8, random_state=0),
+    'gbm': lambda: GradientBoostingClassifier(n_estimators=40, max_depth=3, random_state=0),
+    'linear': lambda: LogisticRegression(max_iter=1000)
+}
+
+@pytest.mark.parametrize('kind', list(MODELS))
+def test_compiled_matches_sklearn(tmp_path, data, kind):
+    X, scaler = data
+    model = MODELS[kind]().fit(scaler.transform(X), labels(X))
+    path = str(tmp_path / 'model.pkl')
+    assert export_compiled_model(model, scaler, FEATURES, path, 'v-test') == compiled_path(path)
+
+    compiled = CompiledModel.load(path)
+    assert (compiled.kind, compiled.model_version) == (kind, 'v-test')
+
+    unseen = sensor_matrix(TRAVERSAL_CHUNK_ROWS * 2 + 37, 1)
+    report = compare_with_sklearn(model, scaler, compiled, unseen)
+    assert report['max_abs_diff'] < 1e-9
+    assert report['label_agreement'] == 1.0
+
+def test_multiclass_forest(tmp_path, data):
+    X, scaler = data
+    model = MODELS['forest']().fit(scaler.transform(X), labels(X, classes=3))
+    export_compiled_model(model, scaler, FEATURES, str(tmp_path / 'multi.pkl'))
+
+    compiled = CompiledModel.load(str(tmp_path / 'multi.pkl'))
+    unseen = sensor_matrix(500, 2)
+    assert np.allclose(compiled.predict_proba(unseen),
+                       model.predict_proba(scaler.transform(unseen)), atol=1e-12)
+
+def test_predict_batch_contract(tmp_path, data):
+    X, scaler = data
+    model = MODELS['forest']().fit(scaler.transform(X), labels(X))
+    export_compiled_model(model, scaler, FEATURES, str(tmp_path / 'model.pkl'))
+    compiled = CompiledModel.load(str(tmp_path / 'model.pkl'))
+
+    frame = pd.DataFrame({'humidity': [25.0, 70.0], 'ph_level': [6.5, 6.8], 'phosphorus': [1, 1],
+                          'potassium': [1, 1], 'timestamp': ['2024-01-01 14:00:00'] * 2,
+                          'temperature': [None, 22.0]})
+    result = compiled.predict_batch(frame)
+    expected = model.predict_proba(scaler.transform([[25.0, 6.5, 1, 1, 14, 25], [70.0, 6.8, 1, 1, 14, 22.0]]))
+
+    assert result['irrigation_needed'].tolist() == [True, False]
+    assert np.allclose(result['probability_yes'], expected[:, 1])
+    assert np.allclose(result['confidence'], expected.max(axis=1))
+
+    empty = compiled.predict_batch(np.empty((0, 6)))
+    assert len(empty['irrigation_needed']) == 0 and len(empty['probability_yes']) == 0
+    with pytest.raises(ValueError):
+        compiled.predict_batch(np.zeros((2, 4)))
+
+def test_unsupported_model_is_rejected(tmp_path, data):
+    X, scaler = data
+    model = SVC().fit(scaler.transform(X[:200]), labels(X[:200]))
+
+    with pytest.raises(ValueError, match='SVC'):
+        export_compiled_model(model, scaler, FEATURES, str(tmp_path / 'svm.pkl'))
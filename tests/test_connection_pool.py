@@ -0,0 +1,105 @@
+import gc
+import threading
+
+import pytest
+
+from connection_pool import SQLiteConnectionPool, PoolExhaustedError
+
+@pytest.fixture
+def pool(tmp_path):
+    pool = SQLiteConnectionPool(str(tmp_path / 'pool.db'), max_connections=2, timeout=1)
+    with pool.connection() as conn:
+        conn.execute('CREATE TABLE t (value INTEGER)')
+    yield pool
+    pool.close_all()
+
+def count_rows(pool) -> int:
+    with pool.connection() as conn:
+        return conn.execute('SELECT COUNT(*) FROM t').fetchone()[0]
+
+def test_released_connection_is_reused(pool):
+    first = pool.acquire()
+    raw = first.raw_connection
+    first.close()
+
+    second = pool.acquire()
+    assert second.raw_connection is raw
+    assert pool.stats()['created'] == 1
+    second.close()
+
+def test_exit_commits_on_success(pool):
+    with pool.acquire() as conn:
+        conn.execute('INSERT INTO t VALUES (1)')
+
+    assert count_rows(pool) == 1
+    assert pool.stats()['in_use'] == 0
+
+def test_exit_rolls_back_on_error(pool):
+    with pytest.raises(RuntimeError):
+        with pool.acquire() as conn:
+            conn.execute('INSERT INTO t VALUES (1)')
+            raise RuntimeError('falha no meio da transação')
+
+    assert count_rows(pool) == 0
+    assert pool.stats()['in_use'] == 0
+
+def test_release_discards_pending_transaction(pool):
+    conn = pool.acquire()
+    conn.execute('INSERT INTO t VALUES (1)')
+    conn.close()
+
+    assert count_rows(pool) == 0
+
+def test_closed_proxy_rejects_use(pool):
+    conn = pool.acquire()
+    conn.close()
+
+    with pytest.raises(Exception, match='devolvida'):
+        conn.execute('SELECT 1')
+
+def test_exhausted_pool_times_out(pool):
+    held = [pool.acquire(), pool.acquire()]
+
+    with pytest.raises(PoolExhaustedError):
+        pool.acquire(timeout=0.05)
+    for conn in held:
+        conn.close()
+
+def test_waiter_gets_connection_released_by_other_thread(pool):
+    held = [pool.acquire(), pool.acquire()]
+    threading.Timer(0.05, held[0].close).start()
+
+    conn = pool.acquire(timeout=5)
+    assert conn.raw_connection is not None
+    conn.close()
+    held[1].close()
+
+def test_forgotten_connection_is_reclaimed(pool):
+    conn = pool.acquire()
+    conn.execute('INSERT INTO t VALUES (1)')
+    assert pool.stats()['in_use'] == 1
+
+    del conn
+    gc.collect()
+
+    stats = pool.stats()
+    assert stats['in_use'] == 0 and stats['idle'] == 1
+    assert count_rows(pool) == 0  # a transação pendente foi descartada
+
+def test_connect_hook_runs_once_per_connection(tmp_path):
+    pool = SQLiteConnectionPool(str(tmp_path / 'hook.db'), max_connections=2)
+    configured = []
+    pool.add_connect_hook(configured.append)
+
+    for _ in range(3):
+        with pool.connection():
+            pass
+
+    assert len(configured) == 1
+    pool.close_all()
+
+def test_acquire_after_close_all_fails(pool):
+    pool.close_all()
+
+    with pytest.raises(Exception, match='encerrado'):
+        pool.acquire()
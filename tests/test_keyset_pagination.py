@@ -0,0 +1,63 @@
+from datetime import datetime
+
+import pytest
+
+from database_manager import FarmTechDatabase
+from database_enhanced import EnhancedFarmTechDatabase
+
+@pytest.fixture(params=['fase3', 'enhanced'])
+def db(request, tmp_path):
+    if request.param == 'fase3':
+        database = FarmTechDatabase(str(tmp_path / 'fase3.db'))
+    else:
+        database = EnhancedFarmTechDatabase(str(tmp_path / 'enhanced.db'))
+    # Timestamps repetidos: o id desempata a ordem entre páginas
+    database.insert_sensor_batch([
+        {'humidity': 30.0 + i, 'ph_level': 6.5, 'phosphorus': 0, 'potassium': 0, 'pump_status': 0,
+         'location': 'Estufa' if i % 3 == 0 else 'Campo_Principal',
+         'timestamp': f'2024-05-{1 + i // 4:02d} 12:00:00'}
+        for i in range(30)
+    ])
+    yield database
+    database.close()
+
+def walk(db, limit, **filters) -> list:
+    rows, after, pages = [], None, 0
+    while True:
+        page, after = db.query_sensor_page(after=after, limit=limit, **filters)
+        rows.extend(page)
+        pages += 1
+        assert pages <= 40
+        if after is None:
+            return rows
+
+def keys(rows) -> list:
+    return [(row['timestamp'], row['id']) for row in rows]
+
+@pytest.mark.parametrize('limit', [1, 4, 7, 30, 100])
+def test_pages_cover_every_row_in_order(db, limit):
+    rows = walk(db, limit)
+
+    assert len(rows) == 30
+    assert keys(rows) == sorted(keys(rows), reverse=True)
+
+def test_ascending_pages(db):
+    rows = walk(db, 8, descending=False)
+
+    assert keys(rows) == sorted(keys(rows))
+    assert rows[0]['id'] == 1
+
+def test_cursor_is_none_on_last_page(db):
+    page, after = db.query_sensor_page(limit=25)
+    assert len(page) == 25 and after == (page[-1]['timestamp'], page[-1]['id'])
+
+    page, after = db.query_sensor_page(after=after, limit=25)
+    assert len(page) == 5 and after is None
+
+def test_filters_by_location_and_window(db):
+    rows = walk(db, 3, location='Estufa', start=datetime(2024, 5, 2), end='2024-05-06 00:00:00')
+
+    expected = [i + 1 for i in range(30)
+                if i % 3 == 0 and '2024-05-02' <= f'2024-05-{1 + i // 4:02d}' < '2024-05-06']
+    assert sorted(row['id'] for row in rows) == expected
+    assert all(row['location'] == 'Estufa' for row in rows)
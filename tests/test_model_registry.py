@@ -0,0 +1,91 @@
+import os
+import shutil
+
+import numpy as np
+import pytest
+
+pytest.importorskip('seaborn')  # irrigation_predictor importa seaborn para os gráficos
+
+from irrigation_predictor import IrrigationPredictor
+from model_registry import ModelRegistry
+
+@pytest.fixture(scope='module')
+def trained():
+    predictor = IrrigationPredictor()
+    predictor.train_model(predictor.generate_training_data(600))
+    return predictor
+
+@pytest.fixture
+def model_path(tmp_path, trained):
+    path = str(tmp_path / 'model.pkl')
+    trained.save_model(path)
+    return path
+
+SAMPLE = np.array([[25.0, 6.5, 1, 1, 14, 30.0], [60.0, 7.0, 1, 1, 9, 20.0], [40.0, 5.0, 0, 0, 22, 25.0]])
+
+def test_missing_model_returns_none(tmp_path):
+    assert ModelRegistry().get(str(tmp_path / 'nenhum.pkl')) is None
+
+def test_model_is_loaded_once(model_path, trained):
+    registry = ModelRegistry()
+    predictor = registry.get(model_path)
+
+    assert registry.get(model_path) is predictor
+    assert predictor.model_version.startswith(type(trained.model).__name__ + '@')
+    assert list(registry.loaded().values()) == [predictor.model_version]
+    expected = trained.predict_batch(SAMPLE)
+    result = predictor.predict_batch(SAMPLE)
+    assert result['irrigation_needed'].tolist() == expected['irrigation_needed'].tolist()
+    assert np.allclose(result['probability_yes'], expected['probability_yes'])
+
+def test_changed_file_is_reloaded(model_path, trained):
+    registry = ModelRegistry()
+    first = registry.get(model_path)
+
+    trained.save_model(model_path)  # novo trained_at: outro conteúdo
+    stat = os.stat(model_path)
+    os.utime(model_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+    second = registry.get(model_path)
+    assert second is not first
+    assert second.model_version != first.model_version
+
+def test_same_content_with_new_mtime_is_reused(model_path):
+    registry = ModelRegistry()
+    first = registry.get(model_path)
+
+    copy = model_path + '.bak'
+    shutil.copy(model_path, copy)
+    os.replace(copy, model_path)
+    stat = os.stat(model_path)
+    os.utime(model_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+    assert registry.get(model_path) is first
+
+def test_hash_check_ignores_mtime(model_path):
+    registry = ModelRegistry(check='hash')
+    first = registry.get(model_path)
+    os.utime(model_path, ns=(1, 1))
+
+    assert registry.get(model_path) is first
+
+def test_invalidate_forces_reload(model_path):
+    registry = ModelRegistry()
+    first = registry.get(model_path)
+    registry.invalidate(model_path)
+
+    assert registry.get(model_path) is not first
+    registry.invalidate()
+    assert registry.loaded() == {}
+
+def test_corrupt_file_keeps_previous_version(model_path):
+    registry = ModelRegistry()
+    first = registry.get(model_path)
+    with open(model_path, 'wb') as handle:
+        handle.write(b'corrompido')
+
+    assert registry.get(model_path) is first
+
+def test_invalid_check_rejected():
+    with pytest.raises(ValueError):
+        ModelRegistry(check='size')
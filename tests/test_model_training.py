@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+
+pytest.importorskip('seaborn')  # model_training importa seaborn para os gráficos
+
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import cross_val_score, train_test_split
+from sklearn.preprocessing import StandardScaler
+
+from model_training import CV_FOLDS, ModelTrainer
+
+@pytest.fixture(scope='module')
+def dataset():
+    rng = np.random.default_rng(3)
+    X = np.column_stack([rng.uniform(10, 90, 400), rng.normal(6.8, 0.8, 400),
+                         rng.integers(0, 2, 400), rng.integers(0, 24, 400)])
+    y = ((X[:, 0] < 40) | (X[:, 1] < 6.0)).astype(int)
+    # Ruído nos rótulos para os folds não empatarem em 1.0
+    flip = rng.random(400) < 0.1
+    y[flip] = 1 - y[flip]
+    return X, y
+
+def candidates():
+    return {'RandomForest': RandomForestClassifier(n_estimators=20, max_depth=5, random_state=42),
+            'LogisticRegression': LogisticRegression(max_iter=1000)}
+
+def train(dataset, n_jobs):
+    trainer = ModelTrainer(n_jobs=n_jobs)
+    trainer.models = candidates()
+    results, _, _ = trainer.train_and_evaluate_models(*dataset)
+    return trainer, results
+
+def sequential_reference(dataset):
+    X, y = dataset
+    X_train, X_test, y_train, _ = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
+    scaler = StandardScaler().fit(X_train)
+    reference = {}
+    for name, model in candidates().items():
+        scores = cross_val_score(model, scaler.transform(X_train), y_train, cv=CV_FOLDS)
+        fitted = model.fit(scaler.transform(X_train), y_train)
+        reference[name] = (scores, fitted.predict(scaler.transform(X_test)))
+    return reference
+
+@pytest.mark.parametrize('n_jobs', [1, 2])
+def test_cv_scores_match_cross_val_score(dataset, n_jobs):
+    _, results = train(dataset, n_jobs)
+
+    for name, (scores, predictions) in sequential_reference(dataset).items():
+        assert results[name]['CV_Mean'] == pytest.approx(scores.mean()), name
+        assert results[name]['CV_Std'] == pytest.approx(scores.std()), name
+        assert results[name]['Predictions'].tolist() == predictions.tolist(), name
+        assert results[name]['Fit_Seconds'] > 0
+
+def test_parallel_and_sequential_runs_agree(dataset):
+    sequential, first = train(dataset, 1)
+    parallel, second = train(dataset, 2)
+
+    for name in first:
+        assert first[name]['CV_Mean'] == second[name]['CV_Mean']
+        assert first[name]['F1-Score'] == second[name]['F1-Score']
+    # O escolhido é o ajuste de treino do pool, já escalado pelo mesmo scaler
+    assert type(parallel.best_model) is type(sequential.best_model)
+    assert np.allclose(parallel.scaler.mean_, sequential.scaler.mean_)
+
+def test_n_jobs_defaults_to_environment(monkeypatch):
+    monkeypatch.setenv('ML_N_JOBS', '3')
+    assert ModelTrainer().n_jobs == 3
+    assert ModelTrainer(n_jobs=1).n_jobs == 1
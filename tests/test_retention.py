@@ -0,0 +1,79 @@
+import sqlite3
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from database_enhanced import EnhancedFarmTechDatabase, RETENTION_TABLES
+from retention_scheduler import RetentionScheduler
+
+def timestamp(days_ago: float) -> str:
+    moment = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(days=days_ago)
+    return moment.strftime('%Y-%m-%d %H:%M:%S')
+
+def readings(count: int, days_ago: float, padding: int = 0) -> list:
+    return [{'humidity': 50.0, 'ph_level': 6.5, 'phosphorus': 1, 'potassium': 0, 'pump_status': 0,
+             'weather_condition': 'x' * padding, 'timestamp': timestamp(days_ago)}
+            for _ in range(count)]
+
+def count_readings(db) -> int:
+    with db._get_connection() as conn:
+        return conn.execute('SELECT COUNT(*) FROM sensor_readings').fetchone()[0]
+
+@pytest.fixture
+def db(tmp_path):
+    database = EnhancedFarmTechDatabase(str(tmp_path / 'retention.db'))
+    yield database
+    database.close()
+
+def test_retention_deletes_in_chunks(db):
+    db.insert_sensor_batch(readings(23, days_ago=40))
+    db.insert_sensor_batch(readings(7, days_ago=1))
+
+    report = db.run_retention(retention_days=30, chunk_size=5, pause_seconds=0)
+
+    assert report['rows_deleted']['sensor_readings'] == 23
+    assert set(report['rows_deleted']) == set(RETENTION_TABLES)
+    # 4 lotes cheios + 1 parcial para as leituras, 1 lote por tabela restante
+    assert report['chunks'] == 5 + len(RETENTION_TABLES) - 1
+    assert count_readings(db) == 7
+
+def test_retention_days_default_from_system_config(db):
+    db.insert_sensor_batch(readings(3, days_ago=100))
+    db.insert_sensor_batch(readings(2, days_ago=60))
+
+    report = db.run_retention(pause_seconds=0)
+
+    assert report['retention_days'] == 90
+    assert report['rows_deleted']['sensor_readings'] == 3
+
+def test_incremental_vacuum_returns_pages(db):
+    db.insert_sensor_batch(readings(2000, days_ago=200, padding=200))
+
+    report = db.run_retention(retention_days=30, chunk_size=500, pause_seconds=0)
+
+    assert report['incremental_vacuum'] == 'incremental'
+    assert report['pages_freed'] > 0
+    assert report['bytes_freed'] == report['pages_freed'] * 4096
+
+def test_legacy_database_needs_conversion(tmp_path):
+    path = str(tmp_path / 'legacy.db')
+    conn = sqlite3.connect(path)
+    conn.execute('CREATE TABLE legado (id INTEGER)')
+    conn.close()
+    db = EnhancedFarmTechDatabase(path)
+
+    assert db.run_retention(retention_days=30, pause_seconds=0)['incremental_vacuum'] == 'off'
+    assert db.convert_to_incremental_vacuum() is True
+    assert db.convert_to_incremental_vacuum() is False
+    assert db.run_retention(retention_days=30, pause_seconds=0)['incremental_vacuum'] == 'incremental'
+    db.close()
+
+def test_scheduler_follows_environment_settings(db):
+    assert RetentionScheduler(db, environment='development').start() is False
+
+    scheduler = RetentionScheduler(db, environment='production', chunk_size=10, pause_seconds=0)
+    db.insert_sensor_batch(readings(4, days_ago=120))
+    report = scheduler.run_once()
+
+    assert report['rows_deleted']['sensor_readings'] == 4
+    assert scheduler.status()['last_report'] is report
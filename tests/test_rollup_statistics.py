@@ -0,0 +1,61 @@
+import random
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from database_enhanced import EnhancedFarmTechDatabase, ROLLUP_BUCKETS
+
+RAW_STATS_SQL = '''
+    SELECT COUNT(*), AVG(humidity), MIN(humidity), MAX(humidity), AVG(ph_level),
+           MIN(ph_level), MAX(ph_level), TOTAL(pump_status = 1), AVG(temperature)
+    FROM sensor_readings WHERE timestamp >= datetime('now', ?)'''
+
+STAT_KEYS = ['total_readings', 'avg_humidity', 'min_humidity', 'max_humidity', 'avg_ph',
+             'min_ph', 'max_ph', 'pump_activations', 'avg_temperature']
+
+@pytest.fixture
+def db(tmp_path):
+    database = EnhancedFarmTechDatabase(str(tmp_path / 'rollups.db'))
+    # datetime('now') do SQLite é UTC; 17 min de folga evitam leituras na borda da janela
+    now = datetime.now(timezone.utc).replace(tzinfo=None, second=0, microsecond=0) - timedelta(minutes=17)
+    rng = random.Random(5)
+    database.insert_sensor_batch([
+        {'humidity': rng.uniform(20, 80), 'ph_level': rng.uniform(5, 8),
+         'phosphorus': 1, 'potassium': 0, 'pump_status': rng.random() < 0.3,
+         'temperature': rng.uniform(15, 35) if hours % 4 else None,
+         'location': rng.choice(['Campo_Principal', 'Estufa']),
+         'timestamp': (now - timedelta(hours=hours)).strftime('%Y-%m-%d %H:%M:%S')}
+        for hours in range(0, 240, 3)
+    ])
+    yield database
+    database.close()
+
+def raw_stats(db, days: int, location: str = None) -> list:
+    sql, params = RAW_STATS_SQL, [f'-{days} days']
+    if location is not None:
+        sql += ' AND location = ?'
+        params.append(location)
+    with db._get_connection() as conn:
+        return list(conn.execute(sql, params).fetchone())
+
+@pytest.mark.parametrize('days', [1, 7, 30])
+@pytest.mark.parametrize('location', [None, 'Estufa'])
+def test_statistics_match_raw_aggregates(db, days, location):
+    stats = db.get_enhanced_statistics(days=days, location=location)['sensor_stats']
+
+    assert [stats[key] for key in STAT_KEYS] == pytest.approx(raw_stats(db, days, location))
+
+def test_rollups_cover_every_reading(db):
+    with db._get_connection() as conn:
+        total = conn.execute('SELECT COUNT(*) FROM sensor_readings').fetchone()[0]
+        for table in ROLLUP_BUCKETS:
+            assert conn.execute(f'SELECT SUM(reading_count) FROM {table}').fetchone()[0] == total
+
+def test_single_insert_updates_rollups(db):
+    before = db.get_enhanced_statistics(days=30)['sensor_stats']
+    db.insert_enhanced_sensor_data(99.0, 6.0, True, False, True, temperature=20.0)
+
+    after = db.get_enhanced_statistics(days=30)['sensor_stats']
+    assert after['total_readings'] == before['total_readings'] + 1
+    assert after['max_humidity'] == 99.0
+    assert after['pump_activations'] == before['pump_activations'] + 1
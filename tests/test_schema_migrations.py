@@ -0,0 +1,77 @@
+import sqlite3
+
+import pytest
+
+from config.sqlite_storage import apply_migrations, find_full_scans
+import database_manager
+import database_enhanced
+from database_manager import FarmTechDatabase
+from database_enhanced import EnhancedFarmTechDatabase
+
+MIGRATIONS = [
+    (2, 'índice', ['CREATE INDEX idx_t_value ON t(value)']),
+    (1, 'tabela', ['CREATE TABLE t (id INTEGER PRIMARY KEY, value INTEGER)'])
+]
+
+def user_version(path) -> int:
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute('PRAGMA user_version').fetchone()[0]
+    finally:
+        conn.close()
+
+def test_migrations_apply_in_version_order_once(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / 'm.db'))
+
+    assert apply_migrations(conn, MIGRATIONS) == [(1, 'tabela'), (2, 'índice')]
+    assert conn.execute('PRAGMA user_version').fetchone()[0] == 2
+    assert apply_migrations(conn, MIGRATIONS) == []
+    conn.close()
+
+def test_only_newer_migrations_run(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / 'm.db'))
+    apply_migrations(conn, MIGRATIONS[1:])
+
+    assert apply_migrations(conn, MIGRATIONS) == [(2, 'índice')]
+    conn.close()
+
+def test_find_full_scans_flags_unindexed_query(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / 'm.db'))
+    apply_migrations(conn, MIGRATIONS)
+    queries = {
+        'by_value': ('SELECT id FROM t WHERE value = ?', (1,)),
+        'by_id': ('SELECT value FROM t WHERE id = ?', (1,))
+    }
+    assert find_full_scans(conn, queries) == {}
+
+    conn.execute('DROP INDEX idx_t_value')
+    offenders = find_full_scans(conn, queries)
+    assert list(offenders) == ['by_value']
+    assert any(detail.startswith('SCAN') for detail in offenders['by_value'])
+    conn.close()
+
+@pytest.mark.parametrize('cls, module', [(FarmTechDatabase, database_manager),
+                                         (EnhancedFarmTechDatabase, database_enhanced)])
+def test_database_reaches_latest_schema_version(tmp_path, cls, module):
+    path = str(tmp_path / 'schema.db')
+    db = cls(path)
+    plans = db.check_query_plans()
+    db.close()
+
+    assert set(plans) == set(module.QUERY_PLAN_CHECKS)
+    assert set(plans.values()) == {'OK'}
+    assert user_version(path) == max(version for version, _, _ in module.SCHEMA_MIGRATIONS)
+
+    # Reabrir não reaplica nada
+    cls(path).close()
+    assert user_version(path) == max(version for version, _, _ in module.SCHEMA_MIGRATIONS)
+
+def test_check_query_plans_fails_without_index(tmp_path):
+    db = FarmTechDatabase(str(tmp_path / 'noindex.db'))
+    with db._connect() as conn:
+        conn.execute('DROP INDEX idx_sensor_location_timestamp')
+        conn.execute('DROP INDEX idx_sensor_timestamp')
+
+    with pytest.raises(RuntimeError, match='location_window'):
+        db.check_query_plans()
+    db.close()
@@ -0,0 +1,107 @@
+import random
+import struct
+
+import numpy as np
+import pytest
+
+from sensor_frames import (SENSOR_DTYPE, SENSOR_STRUCT, FRAME_HEADER, FRAME_MAGIC, FRAME_VERSION,
+                           FrameError, FrameStreamDecoder, encode_frame, encode_frames,
+                           decode_frame, decode_frames, random_records)
+
+SEEDS = range(20)
+
+def random_batch(seed: int):
+    """Lote aleatório reprodutível: (registros, node_id, registros por frame, gerador)"""
+    rnd = random.Random(seed)
+    records = random_records(rnd.randint(0, 700), rnd)
+    return records, rnd.randint(0, 0xFFFF), rnd.randint(1, 300), rnd
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_round_trip_is_bit_exact(seed):
+    records, node_id, per_frame, _ = random_batch(seed)
+    decoded, nodes = decode_frames(encode_frames(records, node_id, records_per_frame=per_frame))
+
+    assert decoded.tobytes() == records.tobytes()
+    assert len(nodes) == len(records)
+    assert (nodes == node_id).all()
+
+def test_empty_buffer_decodes_to_no_records():
+    decoded, nodes = decode_frames(b'')
+
+    assert decoded.dtype == SENSOR_DTYPE
+    assert len(decoded) == len(nodes) == 0
+
+def test_record_layout_matches_firmware_struct():
+    # SensorData de main_optimized.cpp: float, float, bool x3, uint32_t, packed, little-endian
+    firmware = struct.pack('<ffBBBI', 45.5, 6.75, 1, 0, 1, 123456789)
+    frame = encode_frame([(45.5, 6.75, 1, 0, 1, 123456789)], node_id=7, sequence=3)
+
+    assert SENSOR_DTYPE.itemsize == SENSOR_STRUCT.size == len(firmware) == 15
+    assert frame[FRAME_HEADER.size:] == firmware
+    assert frame[:FRAME_HEADER.size] == struct.pack('<2sBBHHI', FRAME_MAGIC, FRAME_VERSION,
+                                                    0, 7, 1, 3)
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_records_match_struct_pack(seed):
+    records, _, _, _ = random_batch(seed)
+
+    packed = b''.join(SENSOR_STRUCT.pack(*record) for record in records.tolist())
+    assert records.tobytes() == packed
+
+def test_decode_frame_returns_view_and_next_offset():
+    data = encode_frames(random_records(10, random.Random(1)), node_id=2, records_per_frame=4)
+
+    header, records, offset = decode_frame(data)
+    assert (header.count, header.sequence) == (4, 0)
+    assert offset == FRAME_HEADER.size + 4 * SENSOR_DTYPE.itemsize
+    assert records.base is not None  # view sobre o buffer, sem cópia
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_stream_decoder_handles_any_fragmentation(seed):
+    records, node_id, per_frame, rnd = random_batch(seed)
+    data = encode_frames(records, node_id, records_per_frame=per_frame)
+
+    decoder = FrameStreamDecoder()
+    pieces = []
+    offset = 0
+    while offset < len(data):
+        step = rnd.randint(1, 64)
+        pieces.extend(r for _, r in decoder.feed(data[offset:offset + step]))
+        offset += step
+
+    streamed = np.concatenate(pieces) if pieces else np.empty(0, dtype=SENSOR_DTYPE)
+    assert decoder.pending_bytes == 0
+    assert streamed.tobytes() == records.tobytes()
+
+def test_stream_decoder_keeps_partial_frame():
+    data = encode_frame(random_records(3, random.Random(2)), node_id=1)
+    decoder = FrameStreamDecoder()
+
+    assert decoder.feed(data[:-1]) == []
+    assert decoder.pending_bytes == len(data) - 1
+    assert len(decoder.feed(data[-1:])) == 1
+    assert decoder.pending_bytes == 0
+
+@pytest.mark.parametrize('seed', SEEDS)
+@pytest.mark.parametrize('position', [0, 1, 2])  # magic (2 bytes) e versão
+def test_corrupted_header_is_rejected(seed, position):
+    records, node_id, per_frame, _ = random_batch(seed)
+    data = bytearray(encode_frames(records, node_id, records_per_frame=per_frame))
+    if not data:
+        pytest.skip('lote vazio não gera frames')
+    data[position] ^= 0xFF
+
+    with pytest.raises(FrameError):
+        decode_frames(bytes(data))
+    with pytest.raises(FrameError):
+        FrameStreamDecoder().feed(bytes(data))
+
+def test_truncated_frame_is_rejected():
+    data = encode_frame(random_records(5, random.Random(3)), node_id=1)
+
+    with pytest.raises(FrameError):
+        decode_frames(data[:-1])
+
+def test_frame_record_limit():
+    with pytest.raises(FrameError):
+        encode_frame(np.zeros(0x10000, dtype=SENSOR_DTYPE), node_id=1)
@@ -0,0 +1,120 @@
+import os
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from config.database import DatabaseConfig
+from database_enhanced import EnhancedFarmTechDatabase
+from sensor_shards import ShardedSensorStore, period_bounds, MAX_ATTACHED_SHARDS
+
+def sharded_config(tmp_path, period: str = 'day') -> DatabaseConfig:
+    return DatabaseConfig(partition_period=period, shard_dir=str(tmp_path / 'shards'))
+
+def readings(timestamps, humidity: float = 50.0) -> list:
+    return [{'humidity': humidity + i, 'ph_level': 6.5, 'phosphorus': 1, 'potassium': 1,
+             'pump_status': 0, 'timestamp': timestamp} for i, timestamp in enumerate(timestamps)]
+
+def catalog(db) -> list:
+    with db._get_connection() as conn:
+        return conn.execute('SELECT shard_key, min_id, max_id, row_count FROM sensor_shards '
+                            'ORDER BY period_start').fetchall()
+
+def main_table_count(db) -> int:
+    with db._get_connection() as conn:
+        return conn.execute('SELECT COUNT(*) FROM sensor_readings').fetchone()[0]
+
+@pytest.mark.parametrize('period, expected', [
+    ('day', (datetime(2024, 2, 29), datetime(2024, 3, 1))),
+    ('week', (datetime(2024, 2, 26), datetime(2024, 3, 4))),
+    ('month', (datetime(2024, 2, 1), datetime(2024, 3, 1)))
+])
+def test_period_bounds(period, expected):
+    assert period_bounds(datetime(2024, 2, 29, 13, 45), period) == expected
+
+def test_batch_is_routed_to_period_shards(tmp_path):
+    db = EnhancedFarmTechDatabase(str(tmp_path / 'main.db'), sharded_config(tmp_path, 'month'))
+    ids = db.insert_sensor_batch(readings(['2024-01-31 23:00:00', '2024-02-01 00:00:00',
+                                           '2024-03-15 12:00:00', '2024-01-02 08:00:00']))
+
+    assert ids == range(1, 5)
+    assert catalog(db) == [('202401', 1, 4, 2), ('202402', 2, 2, 1), ('202403', 3, 3, 1)]
+    assert main_table_count(db) == 0
+    assert {'sensor_202401.db', 'sensor_202402.db', 'sensor_202403.db'} <= \
+        set(os.listdir(tmp_path / 'shards'))
+    assert db.get_sensor_by_id(3)['timestamp'] == '2024-03-15 12:00:00'
+    assert db.insert_sensor_batch(readings(['2024-02-10 00:00:00'])) == range(5, 6)
+    db.close()
+
+def test_batch_spanning_more_shards_than_attach_limit(tmp_path):
+    db = EnhancedFarmTechDatabase(str(tmp_path / 'main.db'), sharded_config(tmp_path))
+    days = MAX_ATTACHED_SHARDS * 2 + 5
+    start = datetime(2024, 4, 1, 9)
+    ids = db.insert_sensor_batch(readings([start + timedelta(days=i) for i in range(days)]))
+
+    assert len(ids) == days and len(catalog(db)) == days
+    rows, after = db.query_sensor_page(limit=days, descending=False)
+    assert [row['id'] for row in rows] == list(ids)
+    assert after == (rows[-1]['timestamp'], rows[-1]['id'])
+    db.close()
+
+def test_pages_follow_time_across_shards(tmp_path):
+    db = EnhancedFarmTechDatabase(str(tmp_path / 'main.db'), sharded_config(tmp_path))
+    db.insert_sensor_batch(readings([f'2024-05-{day:02d} {hour:02d}:00:00'
+                                     for day in (3, 1, 2) for hour in (6, 18)]))
+
+    seen, after = [], None
+    while True:
+        page, after = db.query_sensor_page(start='2024-05-01 12:00:00', end='2024-05-03 12:00:00',
+                                           after=after, limit=2)
+        seen.extend(row['timestamp'] for row in page)
+        if after is None:
+            break
+    assert seen == ['2024-05-03 06:00:00', '2024-05-02 18:00:00', '2024-05-02 06:00:00',
+                    '2024-05-01 18:00:00']
+    db.close()
+
+def test_retention_drops_expired_shard_files(tmp_path):
+    db = EnhancedFarmTechDatabase(str(tmp_path / 'main.db'), sharded_config(tmp_path))
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    db.insert_sensor_batch(readings([now - timedelta(days=120), now - timedelta(days=100),
+                                     now - timedelta(days=3)]))
+    with db._get_connection() as conn:
+        old_paths = [shard.path for shard in db.shards.list_shards(conn)][:2]
+
+    report = db.run_retention(retention_days=90, pause_seconds=0)
+
+    assert report['rows_deleted']['sensor_readings'] == 2
+    assert len(catalog(db)) == 1
+    assert not any(os.path.exists(path) for path in old_paths)
+    db.close()
+
+def test_existing_rows_move_to_shards(tmp_path):
+    path = str(tmp_path / 'main.db')
+    db = EnhancedFarmTechDatabase(path)
+    db.insert_sensor_batch(readings([f'2024-06-{day:02d} 10:00:00' for day in range(1, 15)]))
+    db.close()
+
+    db = EnhancedFarmTechDatabase(path, sharded_config(tmp_path))
+    assert main_table_count(db) == 0
+    assert sum(row[3] for row in catalog(db)) == 14
+    assert db.get_sensor_by_id(14)['timestamp'] == '2024-06-14 10:00:00'
+    assert db.insert_sensor_batch(readings(['2024-06-20 10:00:00'])) == range(15, 16)
+    db.close()
+
+def test_attached_rejects_too_many_shards(tmp_path):
+    db = EnhancedFarmTechDatabase(str(tmp_path / 'main.db'), sharded_config(tmp_path))
+    db.insert_sensor_batch(readings([datetime(2024, 7, 1) + timedelta(days=i)
+                                     for i in range(MAX_ATTACHED_SHARDS + 1)]))
+
+    with db._get_connection() as conn:
+        shards = db.shards.list_shards(conn)
+        with pytest.raises(ValueError, match='each_attached'):
+            with db.shards.attached(conn, shards):
+                pass
+        assert [shard.key for shard in db.shards.each_attached(conn, shards)] == \
+            [shard.key for shard in shards]
+    db.close()
+
+def test_store_rejects_unknown_period(tmp_path):
+    with pytest.raises(ValueError):
+        ShardedSensorStore(str(tmp_path / 'shards'), 'year')
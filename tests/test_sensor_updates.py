@@ -0,0 +1,71 @@
+import pytest
+
+from config.sqlite_storage import build_update_sql
+from database_manager import FarmTechDatabase, SENSOR_UPDATABLE_COLUMNS
+
+@pytest.fixture
+def db(tmp_path):
+    database = FarmTechDatabase(str(tmp_path / 'updates.db'))
+    database.insert_sensor_batch([
+        {'humidity': 40.0 + i, 'ph_level': 6.0, 'phosphorus': 0, 'potassium': 0, 'pump_status': 0,
+         'location': 'Estufa' if i % 2 else 'Campo_Principal',
+         'timestamp': f'2024-06-{1 + i:02d} 08:00:00'}
+        for i in range(6)
+    ])
+    yield database
+    database.close()
+
+def test_update_sql_order_follows_whitelist():
+    first = build_update_sql('sensor_readings', ['ph_level', 'humidity'], SENSOR_UPDATABLE_COLUMNS)
+    second = build_update_sql('sensor_readings', {'humidity': 1, 'ph_level': 2}, SENSOR_UPDATABLE_COLUMNS)
+
+    assert first == second
+    assert first[0] == 'UPDATE sensor_readings SET humidity = ?, ph_level = ? WHERE id = ?'
+
+@pytest.mark.parametrize('columns', [['id'], ['humidity', 'created_at'], ['humidity = 0 --']])
+def test_update_sql_rejects_columns_outside_whitelist(columns):
+    with pytest.raises(ValueError, match='não atualizáveis'):
+        build_update_sql('sensor_readings', columns, SENSOR_UPDATABLE_COLUMNS)
+
+def test_update_sql_requires_columns():
+    with pytest.raises(ValueError):
+        build_update_sql('sensor_readings', [], SENSOR_UPDATABLE_COLUMNS)
+
+def test_update_rejects_unknown_column(db):
+    with pytest.raises(ValueError):
+        db.update_sensor_data(1, humidity=10.0, id=99)
+
+    assert db.get_sensor_by_id(1)['humidity'] == 40.0
+    assert db.get_sensor_by_id(99) is None
+
+def test_update_binds_values(db):
+    assert db.update_sensor_data(2, location="x'; DROP TABLE sensor_readings; --", ph_level='7.1') is True
+
+    stored = db.get_sensor_by_id(2)
+    assert stored['location'] == "x'; DROP TABLE sensor_readings; --"
+    assert stored['ph_level'] == 7.1
+    assert db.update_sensor_data(999, humidity=1.0) is False
+
+def test_update_batch_groups_by_columns(db):
+    changed = db.update_sensor_batch([{'id': 1, 'humidity': 11.0},
+                                      {'id': 2, 'humidity': 12.0, 'pump_status': True},
+                                      {'id': 3, 'humidity': 13.0}])
+
+    assert changed == 3
+    assert [db.get_sensor_by_id(i)['humidity'] for i in (1, 2, 3)] == [11.0, 12.0, 13.0]
+    assert db.get_sensor_by_id(2)['pump_status'] == 1
+
+def test_update_batch_is_all_or_nothing(db):
+    with pytest.raises(ValueError):
+        db.update_sensor_batch([{'id': 1, 'humidity': 11.0}, {'id': 2, 'location; --': 'x'}])
+
+    assert db.get_sensor_by_id(1)['humidity'] == 40.0
+
+def test_recalibrate_range(db):
+    changed = db.recalibrate_sensor_range('ph_level', offset=-0.5, start='2024-06-03',
+                                          location='Estufa')
+
+    assert changed == 2  # dias 4 e 6
+    assert [db.get_sensor_by_id(i)['ph_level'] for i in range(1, 7)] == [6.0, 6.0, 6.0, 5.5, 6.0, 5.5]
+    with pytest.raises(ValueError):
+        db.recalibrate_sensor_range('location')
@@ -0,0 +1,113 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from serial_ingest import (FakeSerialSource, StreamSource, DeviceClock, LineParseError,
+                           SerialIngestDaemon, parse_line, open_source)
+from database_enhanced import EnhancedFarmTechDatabase
+
+@pytest.fixture
+def db(tmp_path):
+    database = EnhancedFarmTechDatabase(str(tmp_path / 'ingest.db'))
+    yield database
+    database.close()
+
+def run_daemon(db, source, **kwargs) -> dict:
+    daemon = SerialIngestDaemon(db, source, flush_interval=0.05, **kwargs)
+    daemon.start()
+    assert daemon.wait(timeout=30)
+    return daemon.stop()
+
+def test_parse_csv_line():
+    assert parse_line(b'CSV: 1234567,45.20,6.80,1,0,1\r\n') == (1234567, 45.2, 6.8, True, False, True)
+
+def test_parse_plotter_line_unscales_ph():
+    reading = parse_line(b'Humidity:45.2,pH:68.0,Pump:100,Phosphorus:20,Potassium:0\n')
+
+    assert reading == (None, 45.2, 6.8, True, False, True)
+
+@pytest.mark.parametrize('line', [b'--- LEITURA DE SENSORES ---\n', b'Memoria livre: 245000 bytes\n', b''])
+def test_non_reading_lines_are_ignored(line):
+    assert parse_line(line) is None
+
+@pytest.mark.parametrize('line', [b'CSV: 1,2,3\n', b'CSV: 1,abc,6.8,1,0,1\n', b'Humidity:45.2,pH:68\n'])
+def test_malformed_readings_raise(line):
+    with pytest.raises(LineParseError):
+        parse_line(line)
+
+def test_fake_source_lines_all_parse():
+    source = FakeSerialSource(count=300, plotter_ratio=0.3)
+    readings = [parse_line(line) for line in source.lines()]
+
+    parsed = [reading for reading in readings if reading is not None]
+    assert len(parsed) == 300
+    assert any(reading[0] is None for reading in parsed)  # linhas do Serial Plotter
+    assert all(10.0 <= reading[1] <= 90.0 and 4.0 <= reading[2] <= 9.0 for reading in parsed)
+
+def test_fake_source_is_reproducible():
+    assert list(FakeSerialSource(count=50).lines()) == list(FakeSerialSource(count=50).lines())
+
+def test_device_clock_reanchors_on_reboot():
+    clock = DeviceClock()
+    received = datetime(2024, 1, 1, 12, 0, 0)
+
+    assert clock.to_utc(10_000, received) == received
+    assert clock.to_utc(15_000, received + timedelta(hours=1)) == received + timedelta(seconds=5)
+    assert clock.to_utc(1_000, received + timedelta(hours=2)) == received + timedelta(hours=2)
+    assert clock.to_utc(None, received) == received
+
+def test_daemon_ingests_fake_source(db):
+    stats = run_daemon(db, FakeSerialSource(count=1200), batch_size=250)
+
+    assert stats['readings_parsed'] == 1200
+    assert stats['rows_flushed'] == 1200
+    assert stats['ignored_lines'] == 1200  # um cabeçalho por leitura
+    assert stats['flush_failures'] == 0
+    assert len(db.get_sensor_columns()['id']) == 1200
+
+def test_daemon_counts_garbage_lines(db):
+    stats = run_daemon(db, FakeSerialSource(count=500, garbage_ratio=0.2))
+
+    assert stats['parse_failures'] > 0
+    assert stats['readings_parsed'] + stats['parse_failures'] == 500
+    assert stats['rows_flushed'] == stats['readings_parsed']
+
+def test_daemon_backpressure_keeps_every_reading(db):
+    stats = run_daemon(db, FakeSerialSource(count=400), batch_size=20, max_pending=10)
+
+    assert stats['rows_flushed'] == 400
+    assert stats['pending'] == 0
+
+def test_daemon_reads_binary_stream(db, tmp_path):
+    path = tmp_path / 'serial.log'
+    path.write_bytes(b''.join(FakeSerialSource(count=100).lines()))
+
+    with open(path, 'rb') as stream:
+        stats = run_daemon(db, StreamSource(stream, 'file'))
+    assert stats['rows_flushed'] == 100
+
+def test_open_source_fake_spec():
+    source = open_source('fake:25')
+
+    assert isinstance(source, FakeSerialSource)
+    assert source.count == 25
+    with pytest.raises(ValueError):
+        open_source('modbus:1')
+
+def test_daemon_counts_readings_lost_in_failed_flush(db, monkeypatch):
+    insert = db.insert_sensor_batch
+    calls = []
+
+    def flaky_insert(batch):
+        calls.append(len(batch))
+        if len(calls) == 1:
+            raise RuntimeError('disk full')
+        return insert(batch)
+
+    monkeypatch.setattr(db, 'insert_sensor_batch', flaky_insert)
+    stats = run_daemon(db, FakeSerialSource(count=300), batch_size=100)
+
+    assert stats['flush_failures'] == 1
+    assert stats['readings_dropped'] == calls[0]
+    assert stats['last_error'] == 'disk full'
+    assert stats['rows_flushed'] + stats['readings_dropped'] == 300
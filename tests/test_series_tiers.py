@@ -0,0 +1,115 @@
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+
+from config.storage import downsample_series, lttb_indices
+from database_enhanced import EnhancedFarmTechDatabase, ROLLUP_BUCKETS
+from series_tiers import choose_tier
+
+@pytest.mark.parametrize('span, skip, expected', [
+    (timedelta(hours=1), (), 'raw'),
+    (timedelta(days=2), (), '1m'),
+    (timedelta(days=2), ('sensor_rollup_minute',), '15m'),
+    (timedelta(days=30), (), '15m'),
+    (timedelta(days=120), (), '1h'),
+    (timedelta(days=800), (), '1d')
+])
+def test_choose_tier(span, skip, expected):
+    end = datetime(2024, 8, 1)
+    assert choose_tier(end - span, end, pixels=1000, skip=skip).name == expected
+
+def test_lttb_keeps_endpoints_and_spike():
+    x = np.arange(1000, dtype=float)
+    y = np.sin(x / 50)
+    y[637] = 25.0
+
+    indices = lttb_indices(x, y, 50)
+    assert len(indices) == 50
+    assert indices[0] == 0 and indices[-1] == 999
+    assert 637 in indices
+    assert (np.diff(indices) > 0).all()
+
+def test_downsample_keeps_envelope_and_counts():
+    size = 5000
+    rng = np.random.default_rng(1)
+    average = rng.normal(50, 5, size)
+    series = {'timestamp': np.datetime64('2024-01-01') + np.arange(size).astype('timedelta64[m]'),
+              'avg': average, 'min': average - rng.uniform(0, 3, size),
+              'max': average + rng.uniform(0, 3, size), 'count': np.full(size, 3)}
+
+    reduced = downsample_series(series, 300)
+    assert len(reduced['timestamp']) == 300
+    assert reduced['min'].min() == series['min'].min()
+    assert reduced['max'].max() == series['max'].max()
+    assert reduced['count'].sum() == 3 * size
+    assert downsample_series(series, 10_000) is series
+
+@pytest.fixture
+def db(tmp_path):
+    database = EnhancedFarmTechDatabase(str(tmp_path / 'series.db'))
+    now = datetime.now(timezone.utc).replace(tzinfo=None, second=0, microsecond=0)
+    rng = np.random.default_rng(7)
+    timestamps = [now - timedelta(minutes=int(m)) for m in sorted(rng.choice(2880, 1500, replace=False))]
+    humidity = rng.uniform(30, 70, len(timestamps)).round(2)
+    humidity[400] = 99.5
+    rows = [{'humidity': float(h), 'ph_level': 6.5, 'phosphorus': 1, 'potassium': 1,
+             'pump_status': 0, 'temperature': 20.0 + i % 5,
+             'location': 'Estufa' if i % 2 else 'Campo_Principal', 'timestamp': ts}
+            for i, (h, ts) in enumerate(zip(humidity, timestamps))]
+    # Vários lotes: os rollups são somados lote a lote
+    for start in range(0, len(rows), 200):
+        database.insert_sensor_batch(rows[start:start + 200])
+    # Janela alinhada ao dia: todo bucket de rollup das leituras cai dentro dela
+    first_day = (now - timedelta(days=2)).replace(hour=0, minute=0)
+    database.window = (first_day, now + timedelta(minutes=1))
+    database.humidity = humidity
+    yield database
+    database.close()
+
+def test_batch_rollups_match_full_recomputation(db):
+    with db._get_connection() as conn:
+        for table, bucket in ROLLUP_BUCKETS.items():
+            expected = conn.execute(f'''
+                SELECT {bucket.format(ts='timestamp')}, location, COUNT(*), TOTAL(humidity),
+                       MIN(humidity), MAX(humidity), TOTAL(temperature), COUNT(temperature)
+                FROM sensor_readings GROUP BY 1, 2 ORDER BY 1, 2''').fetchall()
+            actual = conn.execute(f'''
+                SELECT bucket, location, reading_count, humidity_sum, humidity_min, humidity_max,
+                       temperature_sum, temperature_count
+                FROM {table} ORDER BY 1, 2''').fetchall()
+            assert len(actual) == len(expected), table
+            for got, want in zip(actual, expected):
+                assert got[:3] == want[:3] and got[3:] == pytest.approx(want[3:]), table
+        triggers = conn.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'").fetchall()
+    assert triggers == []
+
+@pytest.mark.parametrize('pixels, tier', [(2000, '1m'), (500, '15m'), (40, '1h')])
+def test_series_tier_keeps_totals_and_peak(db, pixels, tier):
+    start, end = db.window
+    series = db.get_sensor_series('humidity', start, end, pixels=pixels)
+
+    assert series['tier'] == tier
+    assert len(series['timestamp']) <= pixels
+    assert series['count'].sum() == len(db.humidity)
+    assert series['max'].max() == 99.5
+    assert series['min'].min() == db.humidity.min()
+
+def test_rollup_series_average_matches_raw(db):
+    start, end = db.window
+    series = db.get_sensor_series('humidity', start, end, pixels=500)
+
+    assert series['tier'] == '15m'
+    weighted = (series['avg'] * series['count']).sum() / series['count'].sum()
+    assert weighted == pytest.approx(db.humidity.mean())
+
+def test_raw_tier_for_short_window(db):
+    end = db.window[1]
+    series = db.get_sensor_series('humidity', end - timedelta(minutes=90), end, pixels=1000)
+
+    assert series['tier'] == 'raw'
+    assert (series['min'] == series['avg']).all() and (series['count'] == 1).all()
+
+def test_unknown_metric_rejected(db):
+    with pytest.raises(ValueError):
+        db.get_sensor_series('potassium')
@@ -0,0 +1,99 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from config.database import DatabaseConfig
+from config.storage import (ArchiveSensorStorage, InMemorySensorStorage, SensorStorage,
+                            SensorStorageReader, SensorStorageWriter, open_storage)
+from database_manager import FarmTechDatabase
+from database_enhanced import EnhancedFarmTechDatabase
+
+COMPARED_COLUMNS = ['id', 'timestamp', 'humidity', 'ph_level', 'pump_status', 'location',
+                    'temperature']
+
+WINDOWS = [(None, None), ('2024-01-20', '2024-02-10 06:00:00'),
+           (datetime(2024, 3, 1), datetime(2024, 4, 1))]
+
+@pytest.fixture(scope='module')
+def engines(tmp_path_factory):
+    tmp_path = tmp_path_factory.mktemp('engines')
+    rows = [{'humidity': 30.0 + i % 50, 'ph_level': 5.5 + (i % 7) * 0.3, 'phosphorus': i % 2,
+             'potassium': 1, 'pump_status': i % 3 == 0, 'temperature': 18.0 + i % 9,
+             'location': ['Estufa', 'Campo_Principal', 'Campo_Norte'][i % 3],
+             # Timestamps repetidos a cada par de leituras: o id desempata
+             'timestamp': datetime(2024, 1, 5) + timedelta(hours=5 * (i // 2))}
+            for i in range(800)]
+
+    sqlite = EnhancedFarmTechDatabase(str(tmp_path / 'engines.db'),
+                                      DatabaseConfig(archive_dir=str(tmp_path / 'archive')))
+    memory = InMemorySensorStorage()
+    for start in range(0, len(rows), 300):
+        assert sqlite.insert_sensor_batch(rows[start:start + 300]) == \
+            memory.insert_sensor_batch(rows[start:start + 300])
+    sqlite.archive_closed_partitions(before='2024-05-01')
+    archive = ArchiveSensorStorage(str(tmp_path / 'archive'))
+
+    yield {'sqlite': sqlite, 'memory': memory, 'archive': archive}
+    sqlite.close()
+
+@pytest.mark.parametrize('start, end', WINDOWS)
+@pytest.mark.parametrize('location', [None, 'Estufa'])
+def test_column_windows_match(engines, start, end, location):
+    results = {name: engine.get_sensor_columns(start, end, location)
+               for name, engine in engines.items()}
+
+    expected = {column: results['sqlite'][column] for column in COMPARED_COLUMNS}
+    assert len(expected['id']) > 0
+    for name in ('memory', 'archive'):
+        assert {column: results[name][column] for column in COMPARED_COLUMNS} == expected, name
+
+@pytest.mark.parametrize('descending', [True, False])
+def test_keyset_pages_match(engines, descending):
+    walked = {}
+    for name, engine in engines.items():
+        rows = list(engine.iter_sensor_data('2024-02-01', '2024-03-15', descending=descending,
+                                            page_size=37))
+        walked[name] = [(row['timestamp'], row['id'], row['humidity']) for row in rows]
+
+    assert walked['sqlite'] and walked['memory'] == walked['sqlite'] == walked['archive']
+
+def test_latest_readings_match(engines):
+    latest = {name: [row['id'] for row in engine.get_sensor_data(5)]
+              for name, engine in engines.items()}
+
+    assert latest['sqlite'] == latest['memory'] == latest['archive'] == [800, 799, 798, 797, 796]
+
+def test_numpy_and_arrow_formats(engines):
+    for name, engine in engines.items():
+        columns = engine.get_sensor_columns('2024-02-01', '2024-02-08', fmt='numpy')
+        table = engine.get_sensor_columns('2024-02-01', '2024-02-08', fmt='arrow')
+        assert table.num_rows == len(columns['id']) > 0, name
+
+def test_raw_series_match(engines):
+    series = {name: engine.get_sensor_series('humidity', '2024-01-10', '2024-01-12', pixels=1000)
+              for name, engine in engines.items() if name != 'sqlite'}
+
+    assert series['memory']['avg'].tolist() == series['archive']['avg'].tolist()
+    assert len(series['memory']['avg']) > 0
+
+def test_protocol_conformance(engines, tmp_path):
+    fase3 = FarmTechDatabase(str(tmp_path / 'fase3.db'))
+    for storage in (engines['sqlite'], engines['memory'], fase3):
+        assert isinstance(storage, SensorStorage)
+    assert isinstance(engines['archive'], SensorStorageReader)
+    assert not isinstance(engines['archive'], SensorStorageWriter)
+    fase3.close()
+
+def test_open_storage_selects_engine(tmp_path):
+    assert isinstance(open_storage('memory'), InMemorySensorStorage)
+    assert isinstance(open_storage('archive', archive_dir=str(tmp_path)), ArchiveSensorStorage)
+
+    db = open_storage(db_config=DatabaseConfig(storage_engine='sqlite'),
+                      db_path=str(tmp_path / 'open.db'))
+    assert isinstance(db, EnhancedFarmTechDatabase)
+    db.close()
+
+    with pytest.raises(ValueError):
+        open_storage('cassandra')
+    with pytest.raises(ValueError, match='archive_dir'):
+        open_storage('archive', db_config=DatabaseConfig(archive_dir=''))
@@ -0,0 +1,112 @@
+import threading
+
+import pytest
+
+from write_behind import WriteBehindQueue
+from database_enhanced import EnhancedFarmTechDatabase
+
+class RecordingDB:
+    """insert_sensor_batch falso: registra os lotes e pode segurar a gravação"""
+
+    def __init__(self, fail: bool = False):
+        self.batches = []
+        self.fail = fail
+        self.release = threading.Event()
+        self.release.set()
+        self.writing = threading.Event()
+        self._next_id = 1
+
+    def insert_sensor_batch(self, rows):
+        self.writing.set()
+        self.release.wait(5)
+        if self.fail:
+            raise RuntimeError('disco cheio')
+        self.batches.append(list(rows))
+        ids = range(self._next_id, self._next_id + len(rows))
+        self._next_id += len(rows)
+        return ids
+
+def row(humidity: float) -> tuple:
+    return (humidity, 6.5, True, False, False)
+
+def test_futures_resolve_to_record_ids():
+    db = RecordingDB()
+    with WriteBehindQueue(db, flush_rows=3, flush_ms=10_000) as queue:
+        futures = queue.submit_many(row(h) for h in range(7))
+        queue.flush(timeout=5)
+
+        assert [future.result(timeout=5) for future in futures] == list(range(1, 8))
+    assert [len(batch) for batch in db.batches] == [3, 3, 1]
+
+def test_flush_ms_writes_without_explicit_flush():
+    db = RecordingDB()
+    with WriteBehindQueue(db, flush_rows=100, flush_ms=20) as queue:
+        assert queue.submit(row(50.0)).result(timeout=5) == 1
+        assert queue.get_stats()['rows_flushed'] == 1
+
+def test_submit_stamps_enqueue_time():
+    db = RecordingDB()
+    with WriteBehindQueue(db, flush_rows=1) as queue:
+        queue.submit({'humidity': 1.0, 'ph_level': 7.0}).result(timeout=5)
+        queue.submit(row(2.0)).result(timeout=5)
+
+    stamped_dict, stamped_tuple = db.batches[0][0], db.batches[1][0]
+    assert stamped_dict['timestamp'] is not None
+    assert len(stamped_tuple) == 11 and stamped_tuple[10] is not None
+
+def test_full_queue_blocks_submitters():
+    db = RecordingDB()
+    db.release.clear()
+    queue = WriteBehindQueue(db, flush_rows=1, flush_ms=0, max_pending=2)
+    queue.submit(row(0.0))
+    assert db.writing.wait(5)  # gravadora presa no primeiro lote
+    queue.submit(row(1.0))
+    queue.submit(row(2.0))
+
+    blocked = threading.Thread(target=queue.submit, args=(row(3.0),))
+    blocked.start()
+    blocked.join(0.3)
+    assert blocked.is_alive()
+
+    db.release.set()
+    blocked.join(5)
+    assert not blocked.is_alive()
+    queue.close()
+    assert sum(len(batch) for batch in db.batches) == 4
+
+def test_failed_flush_fails_its_futures():
+    db = RecordingDB(fail=True)
+    with WriteBehindQueue(db, flush_rows=2, flush_ms=10_000) as queue:
+        futures = queue.submit_many([row(1.0), row(2.0)])
+
+        for future in futures:
+            with pytest.raises(RuntimeError, match='disco cheio'):
+                future.result(timeout=5)
+        stats = queue.get_stats()
+    assert stats['flush_failures'] == 1 and stats['last_error'] == 'disco cheio'
+
+def test_close_writes_pending_and_rejects_new_rows():
+    db = RecordingDB()
+    queue = WriteBehindQueue(db, flush_rows=1000, flush_ms=60_000)
+    futures = queue.submit_many(row(h) for h in range(5))
+    queue.close(timeout=5)
+
+    assert all(future.done() for future in futures)
+    assert sum(len(batch) for batch in db.batches) == 5
+    with pytest.raises(RuntimeError):
+        queue.submit(row(6.0))
+
+def test_database_submit_sensor_data(tmp_path):
+    db = EnhancedFarmTechDatabase(str(tmp_path / 'write_behind.db'))
+    db.start_write_behind(flush_rows=50, flush_ms=10_000)
+    futures = [db.submit_sensor_data(40.0 + i, 6.5, True, False, False, location='Estufa')
+               for i in range(10)]
+
+    db.write_behind.flush(timeout=5)
+    ids = [future.result(timeout=5) for future in futures]
+    assert ids == list(range(1, 11))
+    assert db.get_sensor_by_id(ids[-1])['humidity'] == 49.0
+
+    pending = db.submit_sensor_data(60.0, 6.5, True, False, False)
+    db.close()
+    assert pending.result(timeout=0) == 11